@@ -1,5 +1,5 @@
 # app.py - Enhanced Flask application with About page and AI Module
-from flask import Flask, render_template, request, send_file, jsonify, redirect, url_for, Response, stream_with_context, send_from_directory
+from flask import Flask, render_template, request, send_file, jsonify, redirect, url_for, Response, stream_with_context, send_from_directory, has_request_context
 import os
 import json
 import time
@@ -10,14 +10,22 @@ import uuid
 import re
 from datetime import datetime
 from werkzeug.utils import secure_filename, safe_join
-from utils.extractor_v4 import DMPExtractor, SkipTermsManager
+from utils.extractor_v4 import (
+    ConverterSettings, DMPExtractor, ExtractionRules, SkipTermsManager, available_extractors,
+)
+from utils.extraction_cache import ExtractionIndex, OCRPageCache, save_stream_with_hash
+from utils.admission import AdmissionController
+from utils.jobs import ExtractionJobQueue, QueueFullError, STATE_DONE, STATE_FAILED
+from utils.ocr import available_ocr_engines
+from utils.progress import SSE_CONNECTED, ProgressBus, SharedProgressBus, sse_message
+from utils.server import SERVER_MODES, run_server
+from utils.sessions import (
+    active_session_paths, cache_path, ensure_active_session, find_session_source_upload,
+    load_cache_data, load_json_file, safe_join_session_path, write_json_file,
+)
 from utils.ai_module import AIReviewAssistant
 # Comments are now managed through JSON files in config/ directory
 
-# Global progress state for real-time SSE updates
-progress_state = {}
-progress_lock = threading.Lock()
-
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['OUTPUT_FOLDER'] = 'outputs'
@@ -32,10 +40,6 @@ app.config['FEEDBACK_TEMPLATES_PATH'] = os.path.join('config', 'feedback_templat
 app.config['ALLOWED_EXTENSIONS'] = {'pdf', 'docx'}
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB default; overridden by config/settings.json
 
-SECTION_IDS = ['1.1', '1.2', '2.1', '2.2', '3.1', '3.2',
-               '4.1', '4.2', '5.1', '5.2', '5.3', '5.4', '6.1', '6.2']
-SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
-
 CATEGORY_SYSTEM_FILES = {
     'dmp_structure.json', 'quick_comments.json', 'category_comments.json',
     'ai_config.json', 'knowledge_base.json', 'extraction_rules.json',
@@ -46,9 +50,29 @@ CATEGORY_VARIANT_SUFFIXES = ('_pl_stare', '_en_stare', '_pl', '_en')
 
 # Load persisted general settings
 _GENERAL_SETTINGS_PATH = os.path.join('config', 'settings.json')
-# Extractor selection — currently only 'v4' is available.
-# To add a new extractor: import it above, add its key here, and handle it in the upload route.
+# Extractor selection — 'v4' (indexed LinearMatcher) or 'v4-matrix' (NumPy/SciPy
+# score matrix, same anchors); see available_extractors() in utils/extractor_v4.py.
 EXTRACTOR_NAME = 'v4'  # active extractor identifier
+# Background extraction: worker count, max waiting jobs (HTTP 429 beyond that),
+# and pool type ('process' or 'thread')
+EXTRACTION_WORKERS = 2
+EXTRACTION_QUEUE_SIZE = 16
+EXTRACTION_EXECUTOR = 'process'
+# Upload progress entries: seconds kept after the last update (while processing /
+# once finished) and the most kept at once (oldest evicted first)
+PROGRESS_TTL = 3600
+PROGRESS_FINISHED_TTL = 600
+PROGRESS_MAX_ENTRIES = 1000
+# Serving: 'dev' (Flask server, one process), 'production' (gunicorn with
+# SERVER_WORKERS processes x SERVER_THREADS threads; 0 workers = CPU cores)
+# or 'async' (uvicorn + asgi.py: progress streams on an event loop).
+# DMP_ART_SERVER_MODE / DMP_ART_SERVER_THREADS (set by launcher.py --mode /
+# --threads) override settings.json.
+SERVER_MODE = 'dev'
+SERVER_WORKERS = 0
+SERVER_THREADS = 8
+# Progress shared by the worker processes in production and async mode
+PROGRESS_STORE_PATH = os.path.join('outputs', 'state', 'progress.sqlite3')
 try:
     if os.path.exists(_GENERAL_SETTINGS_PATH):
         with open(_GENERAL_SETTINGS_PATH, 'r', encoding='utf-8') as _f:
@@ -57,8 +81,38 @@ try:
             app.config['MAX_CONTENT_LENGTH'] = int(_saved['max_upload_mb']) * 1024 * 1024
         if 'extractor_name' in _saved:
             EXTRACTOR_NAME = _saved['extractor_name']
+        if 'extraction_workers' in _saved:
+            EXTRACTION_WORKERS = int(_saved['extraction_workers'])
+        if 'extraction_queue_size' in _saved:
+            EXTRACTION_QUEUE_SIZE = int(_saved['extraction_queue_size'])
+        if 'extraction_executor' in _saved:
+            EXTRACTION_EXECUTOR = _saved['extraction_executor']
+        if 'progress_ttl_s' in _saved:
+            PROGRESS_TTL = int(_saved['progress_ttl_s'])
+        if 'progress_finished_ttl_s' in _saved:
+            PROGRESS_FINISHED_TTL = int(_saved['progress_finished_ttl_s'])
+        if 'progress_max_entries' in _saved:
+            PROGRESS_MAX_ENTRIES = int(_saved['progress_max_entries'])
+        if 'server_mode' in _saved:
+            SERVER_MODE = _saved['server_mode']
+        if 'server_workers' in _saved:
+            SERVER_WORKERS = int(_saved['server_workers'])
+        if 'server_threads' in _saved:
+            SERVER_THREADS = int(_saved['server_threads'])
 except Exception:
     pass  # Fall back to default if file is corrupt
+SERVER_MODE = os.environ.get('DMP_ART_SERVER_MODE', SERVER_MODE)
+SERVER_THREADS = int(os.environ.get('DMP_ART_SERVER_THREADS', SERVER_THREADS))
+if SERVER_MODE not in SERVER_MODES:
+    SERVER_MODE = 'dev'
+
+# Upload progress per session, pushed to /progress SSE streams as it changes
+# (in a SQLite file when several server processes must see it)
+_progress_limits = dict(ttl=PROGRESS_TTL, finished_ttl=PROGRESS_FINISHED_TTL, max_entries=PROGRESS_MAX_ENTRIES)
+if SERVER_MODE != 'dev':
+    progress_bus = SharedProgressBus(PROGRESS_STORE_PATH, **_progress_limits)
+else:
+    progress_bus = ProgressBus(**_progress_limits)
 
 # Create necessary directories
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -92,200 +146,28 @@ DEFAULT_FEEDBACK_TEMPLATES = {
 }
 
 
-def _load_json_file(file_path, default=None):
-    if not os.path.exists(file_path):
-        return {} if default is None else default
-
-    with open(file_path, 'r', encoding='utf-8') as file_handle:
-        return json.load(file_handle)
-
-
-def _write_json_file(file_path, data):
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
-    with open(file_path, 'w', encoding='utf-8') as file_handle:
-        json.dump(data, file_handle, ensure_ascii=False, indent=2)
-
-
 def _get_feedback_templates_path():
     return app.config.get('FEEDBACK_TEMPLATES_PATH', os.path.join('config', 'feedback_templates.json'))
 
 
 def _get_cache_path(cache_id):
-    safe_cache_id = _sanitize_session_identifier(cache_id)
-    cache_path = safe_join(app.config['CACHE_FOLDER'], f"cache_{safe_cache_id}.json")
-    if not cache_path:
-        raise ValueError('Invalid session identifier')
-    return cache_path
-
-
-def _sanitize_session_identifier(identifier):
-    normalized_identifier = str(identifier or '').strip()
-    if not SESSION_ID_PATTERN.fullmatch(normalized_identifier):
-        raise ValueError('Invalid session identifier')
-    return normalized_identifier
-
-
-def _safe_join_session_path(root, identifier):
-    safe_identifier = _sanitize_session_identifier(identifier)
-    root_path = os.path.abspath(root)
-    candidate_path = safe_join(root_path, safe_identifier)
-    if not candidate_path:
-        raise ValueError('Invalid session identifier')
-    candidate_path = os.path.abspath(candidate_path)
-    if os.path.commonpath([candidate_path, root_path]) != root_path:
-        raise ValueError('Invalid session identifier')
-    return candidate_path
+    return cache_path(app.config['CACHE_FOLDER'], cache_id)
 
 
 def _get_active_session_paths(cache_id):
-    session_dir = _safe_join_session_path(app.config['ACTIVE_SESSIONS_FOLDER'], cache_id)
-
-    return {
-        'session_dir': session_dir,
-        'dmp_path': os.path.join(session_dir, 'dmp_plan.json'),
-        'feedback_path': os.path.join(session_dir, 'feedback.json'),
-        'metadata_path': os.path.join(session_dir, 'metadata.json'),
-        'review_export_path': os.path.join(session_dir, 'review_export.json')
-    }
-
-
-def _find_session_source_upload(session_dir):
-    if not os.path.isdir(session_dir):
-        return None, None
-
-    for entry in os.listdir(session_dir):
-        if not entry.startswith('source_upload'):
-            continue
-
-        source_path = os.path.join(session_dir, entry)
-        if os.path.isfile(source_path):
-            return source_path, entry
-
-    return None, None
-
-
-def _store_session_source_upload(session_dir, source_file_path, original_filename=''):
-    if not source_file_path or not os.path.exists(source_file_path):
-        return None
-
-    _, previous_name = _find_session_source_upload(session_dir)
-    if previous_name:
-        previous_path = os.path.join(session_dir, previous_name)
-        if os.path.abspath(previous_path) != os.path.abspath(source_file_path):
-            os.remove(previous_path)
-
-    extension = os.path.splitext(original_filename or source_file_path)[1].lower()
-    stored_filename = f"source_upload{extension}" if extension else 'source_upload'
-    stored_path = os.path.join(session_dir, stored_filename)
-
-    if os.path.abspath(source_file_path) != os.path.abspath(stored_path):
-        shutil.copy2(source_file_path, stored_path)
-
-    return stored_filename
+    return active_session_paths(app.config['ACTIVE_SESSIONS_FOLDER'], cache_id)
 
 
 def _load_cache_data(cache_id):
-    cache_path = _get_cache_path(cache_id)
-    if not os.path.exists(cache_path):
-        raise FileNotFoundError('Cache file not found')
-
-    return _load_json_file(cache_path), cache_path
-
-
-def _build_dmp_plan(cache_id, cache_data):
-    dmp_plan = {
-        'cache_id': cache_id,
-        'sections': {}
-    }
-
-    for section_id in SECTION_IDS:
-        if section_id in cache_data:
-            section_info = cache_data[section_id]
-            dmp_plan['sections'][section_id] = {
-                'section': section_info.get('section', ''),
-                'question': section_info.get('question', ''),
-                'content': '\n'.join(section_info.get('paragraphs', [])),
-                'tagged_paragraphs': section_info.get('tagged_paragraphs', [])
-            }
-
-    return dmp_plan
-
-
-def _build_session_metadata(cache_id, extracted_metadata, session_created_at, status='active', existing_session_name=''):
-    return {
-        'cache_id': cache_id,
-        'status': status,
-        'session_created_at': session_created_at,
-        'last_updated': datetime.now().isoformat(),
-        'session_name': existing_session_name,
-        'researcher_surname': extracted_metadata.get('researcher_surname', ''),
-        'researcher_firstname': extracted_metadata.get('researcher_firstname', ''),
-        'competition_name': extracted_metadata.get('competition_name', ''),
-        'competition_edition': extracted_metadata.get('competition_edition', ''),
-        'creation_date': extracted_metadata.get('creation_date', ''),
-        'filename_original': extracted_metadata.get('filename_original', ''),
-        'source_cache_file': f"cache_{cache_id}.json",
-        'dmp_file': 'dmp_plan.json',
-        'feedback_file': 'feedback.json',
-        'review_export_file': 'review_export.json'
-    }
+    return load_cache_data(app.config['CACHE_FOLDER'], cache_id)
 
 
 def _ensure_active_session(cache_id, feedback_data=None, compiled_feedback=None, source_file_path=None, original_filename=''):
-    cache_data, cache_path = _load_cache_data(cache_id)
-    paths = _get_active_session_paths(cache_id)
-
-    os.makedirs(paths['session_dir'], exist_ok=True)
-
-    dmp_plan = _build_dmp_plan(cache_id, cache_data)
-    _write_json_file(paths['dmp_path'], dmp_plan)
-
-    existing_metadata = _load_json_file(paths['metadata_path'], {})
-    session_created_at = existing_metadata.get('session_created_at', datetime.now().isoformat())
-    existing_session_name = existing_metadata.get('session_name', '')
-    extracted_metadata = cache_data.get('_metadata', {})
-    metadata_json = _build_session_metadata(cache_id, extracted_metadata, session_created_at, existing_session_name=existing_session_name)
-    metadata_json['session_folder'] = paths['session_dir']
-    metadata_json['source_cache_path'] = cache_path
-
-    existing_source_path, existing_source_file = _find_session_source_upload(paths['session_dir'])
-    if existing_source_path and existing_source_file:
-        metadata_json['source_upload_file'] = existing_source_file
-        metadata_json['source_upload_name'] = existing_metadata.get('source_upload_name') or existing_metadata.get('filename_original', '')
-
-    stored_source_file = _store_session_source_upload(paths['session_dir'], source_file_path, original_filename)
-    if stored_source_file:
-        metadata_json['source_upload_file'] = stored_source_file
-        metadata_json['source_upload_name'] = original_filename or os.path.basename(source_file_path)
-
-    _write_json_file(paths['metadata_path'], metadata_json)
-
-    feedback_json = _load_json_file(paths['feedback_path'], {
-        'cache_id': cache_id,
-        'sections': {},
-        'compiled_feedback': '',
-        'last_saved': None
-    })
-
-    if feedback_data is not None:
-        feedback_json['sections'] = feedback_data
-        feedback_json['last_saved'] = datetime.now().isoformat()
-
-    if compiled_feedback is not None:
-        feedback_json['compiled_feedback'] = compiled_feedback
-        feedback_json['last_saved'] = datetime.now().isoformat()
-
-    feedback_json['cache_id'] = cache_id
-    _write_json_file(paths['feedback_path'], feedback_json)
-
-    return {
-        'paths': paths,
-        'cache_data': cache_data,
-        'dmp_plan': dmp_plan,
-        'feedback': feedback_json,
-        'metadata': metadata_json
-    }
+    return ensure_active_session(
+        app.config['CACHE_FOLDER'], app.config['ACTIVE_SESSIONS_FOLDER'], cache_id,
+        feedback_data=feedback_data, compiled_feedback=compiled_feedback,
+        source_file_path=source_file_path, original_filename=original_filename,
+    )
 
 
 def _iter_archive_roots():
@@ -302,7 +184,7 @@ def _iter_archive_roots():
 
 def _find_archive_path(archive_id):
     for root in _iter_archive_roots():
-        archive_path = _safe_join_session_path(root, archive_id)
+        archive_path = safe_join_session_path(root, archive_id)
         if os.path.exists(archive_path):
             return archive_path
     return None
@@ -337,7 +219,7 @@ def load_dmp_templates():
                 'template': template
             }
 
-    template_overrides = _load_json_file(_get_feedback_templates_path(), {})
+    template_overrides = load_json_file(_get_feedback_templates_path(), {})
     if isinstance(template_overrides, dict):
         for section_id, template_text in template_overrides.items():
             if section_id in templates and isinstance(template_text, str):
@@ -520,6 +402,113 @@ def documentation():
     """Documentation page with features and technical information"""
     return render_template('documentation.html')
 
+def _update_job_progress(session_id, fields):
+    """Job-queue progress hook: publish fields for the session unless already finished."""
+    if not progress_bus.update(session_id, fields, if_active=True):
+        return
+
+    timestamp = datetime.now().strftime('%H:%M:%S')
+    print(f"[{timestamp}] Processing {session_id[:8]}: {fields.get('progress', 0)}% - {fields.get('message', '')}")
+
+
+def _review_url(filename, cache_id):
+    """url_for() for the review page that also works from job-queue threads."""
+    if has_request_context():
+        return url_for('review_dmp', filename=filename, cache_id=cache_id)
+    with app.test_request_context():
+        return url_for('review_dmp', filename=filename, cache_id=cache_id)
+
+
+def _upload_path(session_id, filename):
+    """Per-session upload location, so uploads with the same name never share a file."""
+    upload_dir = os.path.join(app.config['UPLOAD_FOLDER'], session_id)
+    os.makedirs(upload_dir, exist_ok=True)
+    return os.path.join(upload_dir, filename)
+
+
+def _remove_upload(file_path):
+    """Delete an upload saved by _upload_path() together with its session directory."""
+    if not file_path:
+        return
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    upload_dir = os.path.dirname(file_path)
+    if os.path.abspath(upload_dir) != os.path.abspath(app.config['UPLOAD_FOLDER']):
+        try:
+            os.rmdir(upload_dir)
+        except OSError:
+            pass
+
+
+def _finish_extraction(session_id, result, context):
+    """
+    Publish the outcome of DMPExtractor.process_file for an upload session:
+    build the active session bundle, drop the temporary upload and mark
+    progress complete/error. Returns the review redirect URL on success.
+    """
+    file_path = context.get('file_path')
+    filename = context.get('filename', '')
+    redirect_url = None
+
+    if result.get('success'):
+        cache_id = result.get('cache_id', '')
+        if cache_id:
+            try:
+                _ensure_active_session(cache_id, source_file_path=file_path, original_filename=filename)
+            except Exception as e:
+                print(f"Warning: Could not initialize active session history: {str(e)}")
+        redirect_url = _review_url(result['filename'], cache_id)
+        final_state = {
+            'message': 'Processing complete!',
+            'progress': 100,
+            'status': 'complete',
+            'job_state': STATE_DONE,
+            'queue_position': 0,
+            'redirect': redirect_url
+        }
+    else:
+        final_state = {
+            'message': result.get('message', 'Processing failed'),
+            'progress': 0,
+            'status': 'error',
+            'job_state': STATE_FAILED,
+            'queue_position': 0
+        }
+
+    # Clean up the uploaded file after preserving the original in the session bundle.
+    try:
+        _remove_upload(file_path)
+    except Exception as e:
+        print(f"Warning: Could not remove uploaded file: {str(e)}")
+
+    progress_bus.update(session_id, final_state)
+
+    return redirect_url
+
+
+# Background extraction workers — sized from config/settings.json
+extraction_jobs = ExtractionJobQueue(
+    max_workers=EXTRACTION_WORKERS,
+    max_queue=EXTRACTION_QUEUE_SIZE,
+    executor=EXTRACTION_EXECUTOR,
+    on_update=_update_job_progress,
+    on_finish=_finish_extraction,
+    max_wait=ConverterSettings().load()['admission_max_wait_s']
+)
+
+# OCR page cache reported by /health; kept so its directory scan is reused
+_ocr_page_cache = None
+
+
+def _health_ocr_cache(max_mb) -> OCRPageCache:
+    global _ocr_page_cache
+    cache_dir = os.path.join(app.config['CACHE_FOLDER'], 'ocr')
+    if _ocr_page_cache is None or _ocr_page_cache.cache_dir != cache_dir:
+        _ocr_page_cache = OCRPageCache(cache_dir)
+    _ocr_page_cache.max_bytes = max_mb * 1024 * 1024
+    return _ocr_page_cache
+
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     if 'file' not in request.files:
@@ -540,64 +529,66 @@ def upload_file():
     session_id = str(uuid.uuid4())
 
     # Initialize progress state
-    with progress_lock:
-        progress_state[session_id] = {
-            'message': 'Starting upload...',
-            'progress': 0,
-            'status': 'processing'
-        }
+    progress_bus.open(session_id, {
+        'message': 'Starting upload...',
+        'progress': 0,
+        'status': 'processing'
+    })
 
     file_path = None  # Ensure file_path is always defined
     if file and allowed_file(file.filename):
         try:
             filename = secure_filename(file.filename or "")
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
+            file_path = _upload_path(session_id, filename)
+            # Hash while saving so identical re-uploads can skip extraction
+            content_hash = save_stream_with_hash(file.stream, file_path)
 
             # Update progress: File saved
-            with progress_lock:
-                progress_state[session_id].update({
-                    'message': 'File uploaded, validating...',
-                    'progress': 5
-                })
+            progress_bus.update(session_id, {
+                'message': 'File uploaded, validating...',
+                'progress': 5
+            })
+
+            extractor = DMPExtractor(EXTRACTOR_NAME)
 
-            # Enhanced file validation based on type
-            if filename.lower().endswith('.docx'):
+            # Byte-identical document already extracted → clone its cache, no validation/conversion
+            result = extractor.lookup_cached(file_path, app.config['OUTPUT_FOLDER'], content_hash)
+
+            # Enhanced file validation based on type (already validated on a cache hit)
+            if result is None and filename.lower().endswith('.docx'):
                 is_valid, validation_message = validate_docx_file(file_path)
                 if not is_valid:
                     try:
-                        os.remove(file_path)
+                        _remove_upload(file_path)
                     except:
                         pass
 
                     # Mark progress as error
-                    with progress_lock:
-                        progress_state[session_id].update({
-                            'message': f'Validation failed: {validation_message}',
-                            'progress': 0,
-                            'status': 'error'
-                        })
+                    progress_bus.update(session_id, {
+                        'message': f'Validation failed: {validation_message}',
+                        'progress': 0,
+                        'status': 'error'
+                    })
 
                     return jsonify({
                         'success': False,
                         'message': f'DOCX validation failed: {validation_message}',
                         'session_id': session_id
                     })
-            elif filename.lower().endswith('.pdf'):
+            elif result is None and filename.lower().endswith('.pdf'):
                 is_valid, validation_message = validate_pdf_file(file_path)
                 if not is_valid:
                     try:
-                        os.remove(file_path)
+                        _remove_upload(file_path)
                     except:
                         pass
 
                     # Mark progress as error
-                    with progress_lock:
-                        progress_state[session_id].update({
-                            'message': f'Validation failed: {validation_message}',
-                            'progress': 0,
-                            'status': 'error'
-                        })
+                    progress_bus.update(session_id, {
+                        'message': f'Validation failed: {validation_message}',
+                        'progress': 0,
+                        'status': 'error'
+                    })
 
                     return jsonify({
                         'success': False,
@@ -605,77 +596,48 @@ def upload_file():
                         'session_id': session_id
                     })
 
-            # Process the file with real-time progress callback
-            def progress_callback(message, progress):
-                """Update global progress state for SSE streaming"""
-                timestamp = datetime.now().strftime('%H:%M:%S')
-                print(f"[{timestamp}] Processing: {progress}% - {message}")
-
-                with progress_lock:
-                    if session_id in progress_state:
-                        progress_state[session_id].update({
-                            'message': message,
-                            'progress': progress,
-                            'status': 'processing'
-                        })
-
-            # Extractor selection — extend EXTRACTOR_NAME handling here when adding new extractors
-            extractor = DMPExtractor()
-
-            result = extractor.process_file(
-                file_path,
-                app.config['OUTPUT_FOLDER'],
-                progress_callback=progress_callback
-            )
-
-            if result['success']:
-                # Mark progress as complete
-                cache_id = result.get('cache_id', '')
-                if cache_id:
-                    try:
-                        _ensure_active_session(cache_id, source_file_path=file_path, original_filename=filename)
-                    except Exception as e:
-                        print(f"Warning: Could not initialize active session history: {str(e)}")
-                redirect_url = url_for('review_dmp', filename=result['filename'], cache_id=cache_id)
-
-                # Clean up the uploaded file after preserving the original in the session bundle.
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    print(f"Warning: Could not remove uploaded file: {str(e)}")
-
-                with progress_lock:
-                    progress_state[session_id].update({
-                        'message': 'Processing complete!',
-                        'progress': 100,
-                        'status': 'complete',
-                        'redirect': redirect_url
-                    })
-
+            if result is not None:
+                # Cache hit — finish synchronously, the redirect is ready now
+                redirect_url = _finish_extraction(
+                    session_id, result, {'file_path': file_path, 'filename': filename}
+                )
                 return jsonify({
                     'success': True,
                     'redirect': redirect_url,
                     'message': result.get('message', 'File processed successfully'),
                     'session_id': session_id
                 })
-            else:
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    print(f"Warning: Could not remove uploaded file: {str(e)}")
-
-                # Mark progress as error
-                with progress_lock:
-                    progress_state[session_id].update({
-                        'message': result.get('message', 'Processing failed'),
-                        'progress': 0,
-                        'status': 'error'
-                    })
 
-                return jsonify({
-                    **result,
-                    'session_id': session_id
+            try:
+                queue_position = extraction_jobs.submit(
+                    session_id,
+                    file_path,
+                    app.config['OUTPUT_FOLDER'],
+                    content_hash=content_hash,
+                    context={'file_path': file_path, 'filename': filename},
+                    extractor_name=EXTRACTOR_NAME
+                )
+            except QueueFullError as e:
+                try:
+                    _remove_upload(file_path)
+                except Exception:
+                    pass
+                progress_bus.discard(session_id)
+                response = jsonify({
+                    'success': False,
+                    'message': str(e),
+                    'retry_after': e.retry_after
                 })
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response, 429
+
+            return jsonify({
+                'success': True,
+                'queued': True,
+                'queue_position': queue_position,
+                'message': 'File queued for extraction',
+                'session_id': session_id
+            })
 
         except Exception as e:
             import traceback
@@ -684,18 +646,15 @@ def upload_file():
             print(traceback_str)
 
             # Mark progress as error
-            with progress_lock:
-                if session_id in progress_state:
-                    progress_state[session_id].update({
-                        'message': f'Error: {str(e)}',
-                        'progress': 0,
-                        'status': 'error'
-                    })
+            progress_bus.update(session_id, {
+                'message': f'Error: {str(e)}',
+                'progress': 0,
+                'status': 'error'
+            })
 
             # Clean up uploaded file in case of error
             try:
-                if file_path is not None:
-                    os.remove(file_path)
+                _remove_upload(file_path)
             except Exception:
                 pass
 
@@ -706,12 +665,11 @@ def upload_file():
             })
 
     # Invalid file format
-    with progress_lock:
-        progress_state[session_id].update({
-            'message': 'Invalid file format',
-            'progress': 0,
-            'status': 'error'
-        })
+    progress_bus.update(session_id, {
+        'message': 'Invalid file format',
+        'progress': 0,
+        'status': 'error'
+    })
 
     return jsonify({
         'success': False,
@@ -737,11 +695,11 @@ def download_file(filename):
 def download_original_file(cache_id):
     try:
         session_dir = os.path.join(app.config['ACTIVE_SESSIONS_FOLDER'], cache_id)
-        source_path, stored_name = _find_session_source_upload(session_dir)
+        source_path, stored_name = find_session_source_upload(session_dir)
         if not source_path:
             return "Original source file not found", 404
 
-        metadata = _load_json_file(os.path.join(session_dir, 'metadata.json'), {})
+        metadata = load_json_file(os.path.join(session_dir, 'metadata.json'), {})
         download_name = metadata.get('source_upload_name') or metadata.get('filename_original') or stored_name
 
         return send_file(
@@ -777,7 +735,7 @@ def review_dmp(filename):
     
     if cache_id:
         cache_path = os.path.join(app.config['CACHE_FOLDER'], f"cache_{cache_id}.json")
-        source_path, _ = _find_session_source_upload(os.path.join(app.config['ACTIVE_SESSIONS_FOLDER'], cache_id))
+        source_path, _ = find_session_source_upload(os.path.join(app.config['ACTIVE_SESSIONS_FOLDER'], cache_id))
         has_original_source = source_path is not None
         if os.path.exists(cache_path):
             try:
@@ -825,7 +783,7 @@ def save_templates():
                 DMP_TEMPLATES[key]['template'] = value
                 updated_count += 1
 
-        _write_json_file(
+        write_json_file(
             _get_feedback_templates_path(),
             {section_id: template_data.get('template', '') for section_id, template_data in DMP_TEMPLATES.items()}
         )
@@ -1015,7 +973,7 @@ def export_json():
         with open(json_path, 'w', encoding='utf-8') as f:
             json.dump(export_data, f, ensure_ascii=False, indent=2)
 
-        _write_json_file(session_bundle['paths']['review_export_path'], export_data)
+        write_json_file(session_bundle['paths']['review_export_path'], export_data)
 
         return jsonify({
             'success': True,
@@ -1105,17 +1063,17 @@ def archive_session():
         if os.path.exists(active_paths['review_export_path']):
             shutil.copy2(active_paths['review_export_path'], os.path.join(archive_folder, 'review_export.json'))
 
-        source_upload_path, source_upload_name = _find_session_source_upload(active_paths['session_dir'])
+        source_upload_path, source_upload_name = find_session_source_upload(active_paths['session_dir'])
         if source_upload_path and source_upload_name:
             shutil.copy2(source_upload_path, os.path.join(archive_folder, source_upload_name))
 
-        _write_json_file(os.path.join(archive_folder, 'metadata.json'), metadata_json)
+        write_json_file(os.path.join(archive_folder, 'metadata.json'), metadata_json)
 
         preserved_metadata = dict(session_bundle['metadata'])
         preserved_metadata['last_archived_at'] = metadata_json['archived_date']
         preserved_metadata['last_archive_id'] = archive_id
         preserved_metadata['preserved_after_archive'] = True
-        _write_json_file(active_paths['metadata_path'], preserved_metadata)
+        write_json_file(active_paths['metadata_path'], preserved_metadata)
 
         return jsonify({
             'success': True,
@@ -1151,7 +1109,7 @@ def get_archived_sessions():
                 metadata_path = os.path.join(archive_path, 'metadata.json')
 
                 if os.path.exists(metadata_path):
-                    metadata = _load_json_file(metadata_path, {})
+                    metadata = load_json_file(metadata_path, {})
                     metadata.setdefault('archive_id', archive_id)
                     metadata.setdefault('archive_folder', archive_path)
                     archives.append(metadata)
@@ -1325,10 +1283,10 @@ def rename_session():
         if not os.path.exists(metadata_path):
             return jsonify({'success': False, 'message': 'Metadata not found'})
 
-        metadata = _load_json_file(metadata_path, {})
+        metadata = load_json_file(metadata_path, {})
         metadata['session_name'] = session_name
         metadata['last_updated'] = datetime.now().isoformat()
-        _write_json_file(metadata_path, metadata)
+        write_json_file(metadata_path, metadata)
 
         return jsonify({'success': True, 'message': 'Session renamed successfully'})
 
@@ -1740,61 +1698,25 @@ def progress_stream(session_id):
     """
     Server-Sent Events (SSE) endpoint for real-time progress updates
 
-    Client connects to this endpoint and receives progress updates as they occur.
-    Format: data: {"message": "...", "progress": 0-100, "status": "processing|complete|error"}
+    Events are pushed by progress_bus as soon as the upload's state changes.
+    Format: data: {"message": "...", "progress": 0-100, "status": "processing|complete|error",
+                   "job_state": "queued|running|done|failed", "queue_position": N}
+    Each event has an id; a reconnecting client's Last-Event-ID header resumes
+    after it.  Comment lines keep idle connections open through proxies.
     """
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+
     def generate():
         """Generator function that yields SSE-formatted progress updates"""
-        # Initial connection message
-        yield f"data: {json.dumps({'message': 'Connected', 'progress': 0, 'status': 'connected'})}\n\n"
-
-        last_progress = -1
-        timeout_count = 0
-        max_timeout = 300  # 5 minutes max wait (300 * 1 second checks)
-
-        while timeout_count < max_timeout:
-            with progress_lock:
-                if session_id in progress_state:
-                    state = progress_state[session_id]
-                    current_progress = state.get('progress', 0)
-
-                    # Only send update if progress changed
-                    if current_progress != last_progress:
-                        message_data = {
-                            'message': state.get('message', ''),
-                            'progress': current_progress,
-                            'status': state.get('status', 'processing')
-                        }
-                        yield f"data: {json.dumps(message_data)}\n\n"
-                        last_progress = current_progress
-
-                    # Check if processing is complete
-                    if state.get('status') in ['complete', 'error']:
-                        # Send final message
-                        final_data = {
-                            'message': state.get('message', ''),
-                            'progress': 100 if state.get('status') == 'complete' else current_progress,
-                            'status': state.get('status'),
-                            'redirect': state.get('redirect')
-                        }
-                        yield f"data: {json.dumps(final_data)}\n\n"
-
-                        # Cleanup state after short delay
-                        time.sleep(1)
-                        if session_id in progress_state:
-                            del progress_state[session_id]
-                        break
+        if last_event_id is None:
+            # Initial connection message
+            yield SSE_CONNECTED
 
-            # Check for updates every second
-            time.sleep(1)
-            timeout_count += 1
-
-        # Timeout reached without completion
-        if timeout_count >= max_timeout:
-            yield f"data: {json.dumps({'message': 'Processing timeout', 'progress': 0, 'status': 'error'})}\n\n"
-            with progress_lock:
-                if session_id in progress_state:
-                    del progress_state[session_id]
+        for event_id, data in progress_bus.subscribe(session_id, last_event_id):
+            yield sse_message(event_id, data)
 
     return Response(
         stream_with_context(generate()),
@@ -1809,6 +1731,7 @@ def progress_stream(session_id):
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
+    settings = ConverterSettings().load()
     return jsonify({
         'status': 'healthy',
         'upload_folder': app.config['UPLOAD_FOLDER'],
@@ -1817,7 +1740,15 @@ def health_check():
         'dmp_folder': app.config['DMP_FOLDER'],
         'reviews_folder': app.config['REVIEWS_FOLDER'],
         'allowed_extensions': list(app.config['ALLOWED_EXTENSIONS']),
-        'max_content_length': app.config['MAX_CONTENT_LENGTH']
+        'max_content_length': app.config['MAX_CONTENT_LENGTH'],
+        'extraction_jobs': extraction_jobs.stats(),
+        'admission': AdmissionController.from_settings(
+            os.path.join(app.config['OUTPUT_FOLDER'], 'state', 'admission'), settings
+        ).stats(),
+        'server_mode': SERVER_MODE,
+        'progress': progress_bus.stats(),
+        'ocr_engines': available_ocr_engines(),
+        'ocr_cache': _health_ocr_cache(settings['ocr_cache_max_mb']).stats()
     })
 
 # ============================================================
@@ -1862,6 +1793,32 @@ def delete_skip_term():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+@app.route('/api/extraction/rules', methods=['GET'])
+def get_extraction_rules():
+    """Return config/extraction_rules.json skip rules with lines removed per rule."""
+    try:
+        stats = ExtractionRules.load_hits(app.config['CACHE_FOLDER'])
+        rules = [
+            {
+                'id': rule['id'],
+                'category': rule['category'],
+                'pattern': rule['pattern'],
+                'description': rule['description'],
+                'enabled': rule['enabled'],
+                'hits': stats['hits'].get(rule['id'], 0),
+            }
+            for rule in ExtractionRules().rules()
+        ]
+        return jsonify({
+            'success': True,
+            'rules': rules,
+            'documents': stats['documents'],
+            'updated_at': stats['updated_at'],
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
 # ============================================================
 # Extractor Debug Mode API
 # ============================================================
@@ -1872,17 +1829,17 @@ def get_extractor():
     return jsonify({
         'success': True,
         'extractor_name': EXTRACTOR_NAME,
-        'available': ['v4'],
+        'available': available_extractors(),
     })
 
 @app.route('/api/settings/extractor', methods=['POST'])
 def update_extractor():
-    """Switch the active extractor. Extend 'available' list when adding new extractors."""
+    """Switch the active extractor (one of available_extractors())."""
     global EXTRACTOR_NAME
     try:
         data = request.json or {}
         name = data.get('extractor_name')
-        available = ['v4']
+        available = available_extractors()
         if name not in available:
             return jsonify({'success': False, 'message': f'Unknown extractor. Available: {available}'}), 400
 
@@ -1972,21 +1929,26 @@ def get_cache_count():
     cache_dir = app.config['CACHE_FOLDER']
     count = 0
     if os.path.exists(cache_dir):
-        count = len([f for f in os.listdir(cache_dir) if f.endswith('.json')])
+        count = len([f for f in os.listdir(cache_dir) if f.startswith('cache_') and f.endswith('.json')])
     return jsonify({'success': True, 'count': count})
 
 @app.route('/api/settings/clear-cache', methods=['POST'])
 def clear_cache():
-    """Clear all cached extraction results"""
+    """
+    Clear all cached extraction results (cache_<id>.json) and reset the
+    content index that points at them.  Rule-hit statistics (rule_hits.json)
+    and the OCR page cache are kept.
+    """
     try:
         cache_dir = app.config['CACHE_FOLDER']
         deleted = 0
         if os.path.exists(cache_dir):
             for f in os.listdir(cache_dir):
-                if f.endswith('.json'):
+                if f.startswith('cache_') and f.endswith('.json'):
                     os.remove(os.path.join(cache_dir, f))
                     deleted += 1
-        return jsonify({'success': True, 'deleted': deleted})
+        ExtractionIndex(cache_dir).clear()
+        return jsonify({'success': True, 'deleted': deleted, 'index_reset': True, 'rule_stats_reset': False})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -2264,4 +2226,6 @@ def favicon():
     return send_from_directory(os.path.join(app.root_path, 'static', 'images'), 'dmp-art-favicon (Niestandardowe).png', mimetype='image/png')
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    run_server(app, SERVER_MODE, host='0.0.0.0', port=5000,
+               workers=SERVER_WORKERS, threads=SERVER_THREADS, debug=True,
+               progress_bus=progress_bus)
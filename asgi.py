@@ -0,0 +1,15 @@
+"""
+asgi.py — async entry point of DMP-ART
+
+    python launcher.py --mode async
+    uvicorn asgi:application --port 5000
+
+/progress streams are served from the event loop and AI suggestions from a
+separate thread pool; every other request goes to the Flask app in app.py
+(utils/asgi.py).  Extraction runs in the background job pool as usual.
+"""
+
+from app import SERVER_THREADS, app, progress_bus
+from utils.asgi import AsyncApp
+
+application = AsyncApp(app, progress_bus, threads=SERVER_THREADS)
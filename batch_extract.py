@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch DMP extraction for whole folders of submissions.
+
+Runs utils/extractor_v4.DMPExtractor over every PDF/DOCX found in the given
+directories, files or glob patterns, using a process pool.  Each document
+produces the same outputs as a web upload:
+
+- outputs/cache/cache_<id>.json
+- outputs/sessions/active/<id>/  (session bundle, incl. the original file)
+
+One JSON line per document is written to stdout as soon as it finishes:
+
+    {"file": "...", "status": "extracted|skipped|failed", "cache_id": "...",
+     "pages": 12, "seconds": 0.41, "message": "..."}
+
+Documents whose content hash is already in the extraction index (same bytes,
+same extractor fingerprint) and whose session bundle exists are reported as
+"skipped", so an interrupted run can simply be started again.  Each worker
+writes the bundle right after its extraction; a document indexed before a
+crash but without a bundle gets its bundle from the cached extraction on the
+next run.  Overall throughput goes to stderr at the end.
+
+Usage:
+    python batch_extract.py submissions/ --jobs 8
+    python batch_extract.py "call_2026/**/*.pdf" --output-dir outputs
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx')
+
+
+def collect_documents(inputs, recursive=False):
+    """Expand directories, files and glob patterns into a sorted list of documents."""
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, '**', '*') if recursive else os.path.join(item, '*')
+            candidates = glob.glob(pattern, recursive=recursive)
+        elif os.path.isfile(item):
+            candidates = [item]
+        else:
+            candidates = glob.glob(item, recursive=True)
+
+        for path in candidates:
+            if os.path.isfile(path) and path.lower().endswith(SUPPORTED_EXTENSIONS):
+                found.add(os.path.abspath(path))
+    return sorted(found)
+
+
+def extract_document(file_path, output_dir, extractor_name='v4', sessions=True):
+    """Worker: extract one document unless an identical one was already extracted."""
+    from utils.extraction_cache import ExtractionIndex, hash_file
+    from utils.extractor_v4 import DMPExtractor
+    from utils.sessions import ensure_active_session, has_active_session
+
+    started = time.perf_counter()
+    record = {'file': file_path, 'status': 'failed', 'cache_id': None, 'pages': 0}
+    cache_dir = os.path.join(output_dir, 'cache')
+    active_dir = os.path.join(output_dir, 'sessions', 'active')
+    try:
+        extractor = DMPExtractor(extractor_name)
+        content_hash = hash_file(file_path)
+        index = ExtractionIndex(cache_dir)
+        existing = index.lookup(content_hash, extractor.fingerprint())
+        if existing and (not sessions or has_active_session(active_dir, existing)):
+            record.update(status='skipped', cache_id=existing,
+                          message='Already extracted (matched by content hash)')
+        elif existing:
+            # Indexed by an earlier run that stopped before writing the bundle
+            record.update(status='extracted', cache_id=existing,
+                          message='Session bundle created from the existing extraction')
+        else:
+            result = extractor.process_file(file_path, output_dir, content_hash=content_hash)
+            record.update(
+                status='extracted' if result.get('success') else 'failed',
+                cache_id=result.get('cache_id'),
+                pages=result.get('pages', 0),
+                message=result.get('message', ''),
+            )
+        if sessions and record['status'] == 'extracted':
+            try:
+                ensure_active_session(cache_dir, active_dir, record['cache_id'], source_file_path=file_path,
+                                      original_filename=os.path.basename(file_path))
+            except Exception as e:
+                record['message'] += f' (session bundle failed: {e})'
+    except Exception as e:
+        record['message'] = str(e)
+    record['seconds'] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def parse_args(argv=None):
+    from utils.extractor_v4 import available_extractors
+
+    parser = argparse.ArgumentParser(description='Extract DMPs from a folder of PDF/DOCX proposals.')
+    parser.add_argument('inputs', nargs='+', help='Directories, files or glob patterns')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes (default: CPU count)')
+    parser.add_argument('--output-dir', default='outputs',
+                        help='Output root holding cache/ and sessions/ (default: outputs)')
+    parser.add_argument('--recursive', '-r', action='store_true',
+                        help='Descend into sub-directories of directory inputs')
+    parser.add_argument('--extractor', default='v4', choices=available_extractors(),
+                        help="Anchor matcher: 'v4' or 'v4-matrix' (needs numpy/scipy; same output)")
+    parser.add_argument('--no-sessions', action='store_true',
+                        help='Only write cache files, do not create active-session bundles')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Resolve user paths before switching to the app root (the extractor reads relative config/ paths)
+    documents = collect_documents(args.inputs, args.recursive)
+    output_dir = os.path.abspath(args.output_dir)
+    os.chdir(ROOT_DIR)
+    sys.path.insert(0, ROOT_DIR)
+
+    if not documents:
+        print('No PDF/DOCX documents found.', file=sys.stderr)
+        return 1
+
+    counts = {'extracted': 0, 'skipped': 0, 'failed': 0}
+    total_pages = 0
+    started = time.perf_counter()
+    executor = ProcessPoolExecutor(max_workers=max(1, args.jobs))
+    try:
+        futures = {
+            executor.submit(extract_document, path, output_dir, args.extractor, not args.no_sessions): path
+            for path in documents
+        }
+        for future in as_completed(futures):
+            record = future.result()
+            if record['status'] == 'extracted':
+                total_pages += record['pages']
+            counts[record['status']] += 1
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+    except KeyboardInterrupt:
+        executor.shutdown(wait=False, cancel_futures=True)
+        print('Interrupted — run again to resume; finished documents will be skipped.', file=sys.stderr)
+        return 130
+    finally:
+        executor.shutdown(wait=True)
+
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    processed = counts['extracted'] + counts['failed']
+    print(
+        f"{len(documents)} documents in {elapsed:.1f}s — "
+        f"extracted {counts['extracted']}, skipped {counts['skipped']}, failed {counts['failed']} | "
+        f"{processed / elapsed:.2f} docs/s, {total_pages / elapsed:.2f} pages/s",
+        file=sys.stderr,
+    )
+    return 0 if counts['failed'] == 0 else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
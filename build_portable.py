@@ -32,6 +32,7 @@ OUTPUT_ARCHIVE = DIST_DIR / 'DMP-ART-Portable.zip'
 APP_FILES = [
     'app.py',
     'launcher.py',
+    'batch_extract.py',
     'requirements.txt',
     'README.md',
     'START_HERE.md',
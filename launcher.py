@@ -9,6 +9,8 @@ Obsługuje tryb bundled (PyInstaller) i tryb development.
 
 import sys
 import os
+import argparse
+import multiprocessing
 import webbrowser
 import time
 from threading import Thread
@@ -112,9 +114,26 @@ def print_startup_banner(work_dir):
     print(f"   - Naciśnij Ctrl+C")
     print("="*60 + "\n")
 
+def parse_args(argv=None):
+    """
+    Opcje serwera. Domyślnie server_mode / server_workers / server_threads
+    z config/settings.json.
+    """
+    parser = argparse.ArgumentParser(description='DMP-ART launcher')
+    parser.add_argument('--mode', choices=('dev', 'production', 'async'),
+                        help="'production': gunicorn, kilka procesów (Linux); "
+                             "'async': uvicorn, strumienie postępu w pętli zdarzeń; 'dev': serwer Flask")
+    parser.add_argument('--workers', type=int, help='procesy serwera w trybie production (0 = liczba rdzeni) / async (0 = jeden)')
+    parser.add_argument('--threads', type=int, help='wątki na proces w trybie production / async')
+    parser.add_argument('--no-browser', action='store_true', help='nie otwieraj przeglądarki')
+    args, _ = parser.parse_known_args(argv)
+    return args
+
 def main():
     """Główna funkcja uruchamiająca aplikację."""
     try:
+        args = parse_args()
+
         # 1. Konfiguracja środowiska bundled
         base_dir = setup_bundled_environment()
 
@@ -122,8 +141,15 @@ def main():
         work_dir = setup_working_directories()
 
         # 3. Import aplikacji Flask (po konfiguracji środowiska!)
+        # Tryb serwera musi być znany przed importem (wspólny stan postępu)
+        if args.mode:
+            os.environ['DMP_ART_SERVER_MODE'] = args.mode
+        if args.threads is not None:
+            os.environ['DMP_ART_SERVER_THREADS'] = str(args.threads)
         logger.info("Importing Flask application...")
+        import app as dmp_app
         from app import app
+        from utils.server import run_server
 
         # 4. Konfiguracja Flask dla trybu standalone
         app.config['UPLOAD_FOLDER'] = 'uploads'
@@ -136,21 +162,25 @@ def main():
         print_startup_banner(work_dir)
 
         # 6. Uruchomienie przeglądarki w osobnym wątku
-        browser_thread = Thread(
-            target=open_browser_delayed,
-            args=('http://localhost:5000', 3),
-            daemon=True
-        )
-        browser_thread.start()
-
-        # 7. Uruchomienie Flask servera
-        logger.info("Starting Flask server...")
-        app.run(
+        if not args.no_browser:
+            browser_thread = Thread(
+                target=open_browser_delayed,
+                args=('http://localhost:5000', 3),
+                daemon=True
+            )
+            browser_thread.start()
+
+        # 7. Uruchomienie serwera (dev: Flask, production: gunicorn, async: uvicorn)
+        logger.info(f"Starting server ({dmp_app.SERVER_MODE} mode)...")
+        run_server(
+            app,
+            dmp_app.SERVER_MODE,
             host='0.0.0.0',
             port=5000,
-            debug=False,
-            use_reloader=False,  # Ważne dla bundled apps!
-            threaded=True
+            workers=dmp_app.SERVER_WORKERS if args.workers is None else args.workers,
+            threads=dmp_app.SERVER_THREADS if args.threads is None else args.threads,
+            debug=False,  # bez reloadera — ważne dla bundled apps!
+            progress_bus=dmp_app.progress_bus
         )
 
     except KeyboardInterrupt:
@@ -167,4 +197,6 @@ def main():
         sys.exit(1)
 
 if __name__ == '__main__':
+    # Required for the extraction process pool in PyInstaller-frozen builds
+    multiprocessing.freeze_support()
     main()
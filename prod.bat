@@ -29,6 +29,8 @@ if errorlevel 1 (
 REM Set production environment variables
 echo [3/4] Setting production environment...
 set FLASK_ENV=production
+REM Progress is shared between worker processes (SQLite)
+set DMP_ART_SERVER_MODE=production
 
 REM Generate secret key if not set
 if not defined SECRET_KEY (
@@ -50,4 +52,4 @@ echo.
 echo Press Ctrl+C to stop
 echo.
 
-gunicorn -w 4 -b 0.0.0.0:5000 app:app
+gunicorn -w 4 -k gthread --threads 8 -b 0.0.0.0:5000 app:app
@@ -35,6 +35,8 @@ if (-not $gunicornCheck) {
 # Set production environment variables
 Write-Host "[3/4] Setting production environment..." -ForegroundColor Yellow
 $env:FLASK_ENV = "production"
+# Progress is shared between worker processes (SQLite)
+$env:DMP_ART_SERVER_MODE = "production"
 
 # Generate secret key if not set
 if (-not $env:SECRET_KEY) {
@@ -56,4 +58,4 @@ Write-Host ""
 Write-Host "Press Ctrl+C to stop" -ForegroundColor Gray
 Write-Host ""
 
-gunicorn -w $Workers -b "${Host}:${Port}" app:app
+gunicorn -w $Workers -k gthread --threads 8 -b "${Host}:${Port}" app:app
@@ -664,8 +664,13 @@ function updateButtonStates(elements, state) {
  */
 function connectProgressStream(sessionId, onComplete, onError) {
     const eventSource = new EventSource(`/progress/${sessionId}`);
+    // The browser reconnects on its own (resuming via Last-Event-ID);
+    // give up after a few consecutive failures
+    const maxReconnects = 5;
+    let reconnects = 0;
 
     eventSource.onmessage = function(event) {
+        reconnects = 0;
         try {
             const data = JSON.parse(event.data);
             console.log('Processing update:', data);
@@ -683,6 +688,10 @@ function connectProgressStream(sessionId, onComplete, onError) {
     };
 
     eventSource.onerror = function(error) {
+        if (eventSource.readyState === EventSource.CONNECTING && ++reconnects <= maxReconnects) {
+            console.warn(`SSE connection interrupted, reconnecting (${reconnects}/${maxReconnects})`);
+            return;
+        }
         console.error('SSE connection error:', error);
         eventSource.close();
         onError({ message: 'Connection lost', status: 'error' });
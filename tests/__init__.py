@@ -6,7 +6,15 @@ import unittest
 
 DISCOVERABLE_MODULES = (
     'tests.test_session_history',
-    'tests.test_extractor_optimization',
+    'tests.test_extractor',
+    'tests.test_matchers',
+    'tests.test_extraction_cache',
+    'tests.test_pdf_backends',
+    'tests.test_ocr',
+    'tests.test_progress',
+    'tests.test_asgi',
+    'tests.test_admission',
+    'tests.test_jobs',
     'tests.test_placeholder_functionality',
 )
 
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Extraction micro-benchmarks (not collected by pytest).
+
+Builds a long synthetic proposal around the DMP pages of
+tests/fixtures/test_dmp_long.pdf and times pipeline stages on it.
+
+Usage:
+    python tests/benchmark_extraction.py                 # all benchmarks
+    python tests/benchmark_extraction.py matcher --pages 600
+"""
+
+import argparse
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+
+from utils.extractor_v4 import (
+    HAS_PDFPLUMBER, DMPExtractor, DMPTrimmer, DocConverter, ExtractionProfile, FingerprintFilter, LinearMatcher,
+    SkipTermsManager, TermMatcher, VariantsLoader, strip_formatting,
+)
+from utils.matrix_matcher import HAS_MATRIX_MATCHER, MatrixMatcher
+from utils.ocr import StreamingOCR, available_ocr_engines, get_ocr_engine
+from utils.pdf_backends import HAS_PDFIUM, available_pdf_backends, get_pdf_backend
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURE_PDF = os.path.join(FIXTURES, 'test_dmp_long.pdf')
+
+# Proposal-body vocabulary that deliberately shares tokens with DMP subsection
+# names, so the matcher sees many plausible-but-wrong candidates.
+_VOCABULARY = (
+    'projekt badania dane danych metadane przechowywanie kopii zapasowych '
+    'dokumentacja jakosc kontroli bezpieczenstwo ochrona prawne wlasnosci '
+    'udostepnianie repozytorium zasoby zarzadzanie opiekun analiza wyniki '
+    'publikacja harmonogram zespol metodologia respondenci wywiady ankiety '
+    'sadow prezesow dyrektorow porownanie zrodlowych dokumentow etap zadanie'
+).split()
+
+
+def synthetic_pages(filler_pages: int, seed: int = 7) -> list:
+    """Fixture DMP pages preceded by `filler_pages` pages of random proposal text."""
+    rng = random.Random(seed)
+    dmp_pages = DocConverter({'pdf_workers': 1, 'pdf_backend': 'pypdf2'})._read_pdf_pages(FIXTURE_PDF)[40:47]
+    filler = []
+    for _ in range(filler_pages):
+        lines = [' '.join(rng.choice(_VOCABULARY) for _ in range(rng.randint(6, 14)))
+                 for _ in range(12)]
+        filler.append('\n'.join(lines))
+    return filler + dmp_pages
+
+
+def body_text_pages(filler_pages: int) -> list:
+    """Fixture DMP pages preceded by `filler_pages` copies of its proposal-body pages."""
+    pages = DocConverter({'pdf_workers': 1, 'pdf_backend': 'pypdf2'})._read_pdf_pages(FIXTURE_PDF)
+    body = pages[:40]
+    return [body[i % len(body)] for i in range(filler_pages)] + pages[40:47]
+
+
+class _NoPrefilter(FingerprintFilter):
+    """Every block is a candidate (matching without the fingerprint pass)."""
+
+    def candidates(self, blocks, names):
+        return [i for i, blk in enumerate(blocks) if not blk.is_hf]
+
+
+def _time(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench_matcher(pages: int, repeat: int) -> None:
+    page_texts = synthetic_pages(pages)
+    subsection_variants, section_variants = VariantsLoader().load()
+
+    def run(matcher):
+        # Fresh blocks each run: per-block normalisation is part of the cost
+        blocks = DocConverter._pages_to_blocks(page_texts, set())
+        return matcher.find_all(blocks, subsection_variants, section_variants)
+
+    matchers = [('full scan', LinearMatcher(use_index=False)),
+                ('indexed', LinearMatcher(use_index=True))]
+    if HAS_MATRIX_MATCHER:
+        matchers.append(('matrix', MatrixMatcher()))
+
+    # Same blocks every run: normalisation is cached, only scoring is timed
+    warm_blocks = DocConverter._pages_to_blocks(page_texts, set())
+
+    results = {}
+    timings = {}
+    warm = {}
+    for label, matcher in matchers:
+        results[label] = run(matcher)
+        timings[label] = _time(lambda m=matcher: run(m), repeat)
+        warm[label] = _time(
+            lambda m=matcher: m.find_all(warm_blocks, subsection_variants, section_variants), repeat)
+
+    print(f"LinearMatcher.find_all — {len(warm_blocks)} blocks ({pages} filler pages), best of {repeat}")
+    print(f"  {'':<10} {'fresh blocks':>12} {'normalised':>18}")
+    for label, seconds in timings.items():
+        same = results[label] == results['full scan']
+        print(f"  {label:<10} {seconds * 1000:9.1f} ms {timings['full scan'] / seconds:4.1f}x"
+              f" {warm[label] * 1000:9.1f} ms {warm['full scan'] / warm[label]:4.1f}x"
+              f"   identical to full scan: {same}")
+
+
+def bench_prefilter(pages: int, repeat: int) -> None:
+    page_texts = body_text_pages(pages)
+    subsection_variants, section_variants = VariantsLoader().load()
+    start_names = section_variants['1'] + subsection_variants['1.1']
+
+    def run(prefilter):
+        # Fresh blocks each run: skipping normalisation is the point of the filter
+        blocks = DocConverter._pages_to_blocks(page_texts, set())
+        trimmed = DMPTrimmer(prefilter).trim(blocks, section_variants['1'], subsection_variants['1.1'])
+        return trimmed[0].text, LinearMatcher(prefilter=prefilter).find_all(
+            blocks, subsection_variants, section_variants)
+
+    blocks = DocConverter._pages_to_blocks(page_texts, set())
+    kept = len(FingerprintFilter().candidates(blocks, start_names))
+    results = {}
+    timings = {}
+    for label, prefilter in (('all blocks', _NoPrefilter()), ('prefilter', FingerprintFilter())):
+        results[label] = run(prefilter)
+        timings[label] = _time(lambda f=prefilter: run(f), repeat)
+
+    print(f"Trim + match — {len(blocks)} blocks ({pages} body-text pages), best of {repeat}; "
+          f"{kept} blocks pass the DMP-start fingerprint filter")
+    for label, seconds in timings.items():
+        same = results[label] == results['all blocks']
+        print(f"  {label:<10} {seconds * 1000:9.1f} ms   {timings['all blocks'] / seconds:5.1f}x"
+              f"   identical results: {same}")
+
+
+def synthetic_skip_terms(count: int, seed: int = 11) -> list:
+    """The configured skip terms plus `count` random phrases (every tenth one a regex)."""
+    rng = random.Random(seed)
+    terms = SkipTermsManager().load()
+    for n in range(count):
+        phrase = ' '.join(rng.choice(_VOCABULARY) for _ in range(rng.randint(2, 4)))
+        terms.append(rf'^{phrase}\s+\d+' if n % 10 == 0 else phrase)
+    return terms
+
+
+def bench_skip_terms(pages: int, repeat: int) -> None:
+    lines = [strip_formatting(blk.text)
+             for blk in DocConverter._pages_to_blocks(synthetic_pages(pages), set())]
+    for count in (10, 300):
+        terms = synthetic_skip_terms(count)
+        per_pattern = [re.compile(t, re.IGNORECASE) for t in terms]
+        combined = TermMatcher.from_terms(terms)
+
+        def loop():
+            return [any(p.search(line) for p in per_pattern) for line in lines]
+
+        def single():
+            return [combined.search(line) is not None for line in lines]
+
+        same = loop() == single()
+        t_loop = _time(loop, repeat)
+        t_single = _time(single, repeat)
+        print(f"Skip-term matching — {len(lines)} lines, {len(terms)} terms, best of {repeat}")
+        print(f"  per pattern  {t_loop * 1000:9.1f} ms")
+        print(f"  TermMatcher  {t_single * 1000:9.1f} ms   {t_loop / t_single:5.1f}x   identical: {same}")
+
+
+def synthetic_docx(path: str, pages: int, seed: int = 5) -> None:
+    """A proposal-like DOCX: per page a heading, ~10 paragraphs and a 12×4 table."""
+    rng = random.Random(seed)
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = 'Wniosek OPUS-27'
+    for n in range(pages):
+        doc.add_heading(f'{n + 1}. ' + ' '.join(rng.choice(_VOCABULARY) for _ in range(4)), level=2)
+        for _ in range(10):
+            para = doc.add_paragraph()
+            para.add_run(rng.choice(_VOCABULARY).capitalize() + ': ').bold = True
+            para.add_run(' '.join(rng.choice(_VOCABULARY) for _ in range(rng.randint(20, 60))))
+        table = doc.add_table(rows=12, cols=4)
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = ' '.join(rng.choice(_VOCABULARY) for _ in range(rng.randint(1, 6)))
+    doc.save(path)
+
+
+def bench_docx(pages: int, repeat: int) -> None:
+    pages = min(pages, 120)  # building the file with python-docx dominates beyond that
+    tmp = tempfile.mkdtemp(prefix='dmp_art_bench_')
+    try:
+        path = os.path.join(tmp, 'proposal.docx')
+        synthetic_docx(path, pages)
+        readers = {'python-docx': DocConverter({'docx_stream': 0}),
+                   'iterparse': DocConverter({'docx_stream': 1})}
+        results = {}
+        timings = {}
+        peaks = {}
+        for label, converter in readers.items():
+            results[label] = [(b.text, b.is_bold, b.is_heading, b.source, b.is_hf)
+                              for b in converter.convert(path)]
+            timings[label] = _time(lambda c=converter: c.convert(path), repeat)
+            tracemalloc.start()
+            converter.convert(path)
+            peaks[label] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"DocConverter DOCX — {pages} pages, {len(results['iterparse'])} blocks, "
+              f"{size_mb:.1f} MB, best of {repeat}")
+        for label, seconds in timings.items():
+            same = results[label] == results['python-docx']
+            print(f"  {label:<12} {seconds * 1000:9.1f} ms {timings['python-docx'] / seconds:5.1f}x"
+                  f"   Python heap peak {peaks[label] / 1024 / 1024:5.1f} MB   identical: {same}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def bench_pdfplumber(pages: int, repeat: int) -> None:
+    if not HAS_PDFPLUMBER:
+        print('pdfplumber not installed — skipped')
+        return
+    converter = DocConverter({'pdf_workers': 1, 'pdf_backend': 'pypdf2'})
+    total = len(converter._extract_pages(FIXTURE_PDF, 'pypdf2'))
+    print(f"pdfplumber re-read of malformed pages — fixture PDF, {total} pages, best of {repeat}")
+    whole = _time(lambda: converter._extract_pages(FIXTURE_PDF, 'pdfplumber'), repeat)
+    print(f"  whole document   {whole * 1000:9.1f} ms")
+    for count in (3, 10, 30):
+        numbers = list(range(0, total, max(1, total // count)))[:count]
+        for workers in (1, 4):
+            selective = DocConverter({'pdf_workers': workers})
+            seconds = _time(lambda c=selective: c._read_selected_pages(FIXTURE_PDF, numbers, 'pdfplumber'),
+                            repeat)
+            print(f"  {count:>2} pages, {workers} worker{'s' if workers > 1 else ' '} {seconds * 1000:9.1f} ms"
+                  f"   {whole / seconds:5.1f}x")
+
+
+def bench_pdf_backends(pages: int, repeat: int) -> None:
+    pdfs = sorted(name for name in os.listdir(FIXTURES) if name.lower().endswith('.pdf'))
+    for name in pdfs:
+        path = os.path.join(FIXTURES, name)
+        total = get_pdf_backend('pypdf2').page_count(path)
+        print(f"PDF text layer — {name}, {total} pages, best of {repeat}")
+        for backend_name in available_pdf_backends():
+            backend = get_pdf_backend(backend_name)
+            texts = list(backend.iter_pages(path))
+            seconds = _time(lambda b=backend: list(b.iter_pages(path)), repeat)
+            malformed = sum(DocConverter._is_text_malformed(text) for text in texts)
+            print(f"  {backend_name:<11} {seconds * 1000:9.1f} ms {total / seconds:8.0f} pages/s"
+                  f"   {sum(len(t) for t in texts):7d} chars   {malformed} malformed pages")
+        auto = DocConverter({'pdf_backend': 'auto'})
+        seconds = _time(lambda: auto._select_pdf_backend(path), repeat)
+        print(f"  auto picks {auto._select_pdf_backend(path)} (selection {seconds * 1000:.1f} ms)")
+
+
+def bench_ocr(pages: int, repeat: int) -> None:
+    engines = available_ocr_engines()
+    if not engines or not HAS_PDFIUM:
+        print('OCR benchmark needs an OCR engine (tesserocr / pytesseract) and pypdfium2 — skipped')
+        return
+    import pypdfium2
+    count = min(pages, 12)
+    doc = pypdfium2.PdfDocument(FIXTURE_PDF)
+    try:
+        # Fixture DMP pages rendered once at 200 DPI, so only recognition is timed
+        images = [doc[n].render(scale=200 / 72).to_pil() for n in range(40, 40 + count)]
+    finally:
+        doc.close()
+
+    def rasterise(path, first, last):
+        return [images[n - 1].copy() for n in range(first, last + 1)]
+
+    print(f"OCR — {count} fixture pages rendered at 200 DPI")
+    for name in engines:
+        for workers in (1, 4):
+            ocr = StreamingOCR(workers=workers, engine=get_ocr_engine(name), rasterise=rasterise)
+            ocr.run(FIXTURE_PDF, count)  # warm-up: engine start-up / model loading
+            ocr.run(FIXTURE_PDF, count)
+            stats = ocr.stats
+            print(f"  {name:<12} {workers} worker{'s' if workers > 1 else ' '}"
+                  f" {stats['latency_ms']['mean']:8.1f} ms/page (p95 {stats['latency_ms']['p95']:.1f})"
+                  f" {stats['pages_per_second']:6.2f} pages/s")
+
+
+def bench_profile(pages: int, repeat: int) -> None:
+    uploads = 50
+
+    def per_upload(fresh):
+        def run():
+            for _ in range(uploads):
+                # What every upload did before the shared snapshot: read and compile all config
+                extractor = DMPExtractor(profile=ExtractionProfile() if fresh else None)
+                extractor.refresh()
+                extractor.fingerprint()
+                extractor.skip_matcher('pdf')
+        return run
+
+    t_fresh = _time(per_upload(True), repeat) / uploads
+    t_shared = _time(per_upload(False), repeat) / uploads
+    print(f"Per-upload config overhead — DMPExtractor() + fingerprint + skip matcher, best of {repeat}")
+    print(f"  config re-read   {t_fresh * 1000:8.3f} ms")
+    print(f"  shared profile   {t_shared * 1000:8.3f} ms   {t_fresh / t_shared:6.1f}x")
+
+
+BENCHMARKS = {
+    'docx': bench_docx,
+    'ocr': bench_ocr,
+    'pdfbackends': bench_pdf_backends,
+    'pdfplumber': bench_pdfplumber,
+    'profile': bench_profile,
+    'skipterms': bench_skip_terms,
+    'matcher': bench_matcher,
+    'prefilter': bench_prefilter,
+}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Extraction micro-benchmarks')
+    parser.add_argument('names', nargs='*',
+                        help=f"Benchmarks to run: {', '.join(sorted(BENCHMARKS))} (default: all)")
+    parser.add_argument('--pages', type=int, default=300, help='Synthetic filler pages')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is kept)')
+    args = parser.parse_args(argv)
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    for name in args.names or sorted(BENCHMARKS):
+        BENCHMARKS[name](args.pages, args.repeat)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
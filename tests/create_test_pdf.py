@@ -0,0 +1,149 @@
+"""Create a multi-page text-layer test PDF (proposal with a DMP near the end)
+
+The PDF is written by hand (uncompressed content streams, Helvetica) so no
+PDF library is needed. Text is ASCII-only; the extractor matches names
+diacritic-insensitively.
+
+Layout (60 pages):
+    1-40   proposal body (filler)
+    41-46  DMP, sections 1-6 with all 14 subsections
+    47     "Oswiadczenia administracyjne" (end of DMP)
+    48-60  trailing annexes (filler)
+Every page carries the same header line, so header/footer detection is exercised.
+"""
+
+import os
+
+HEADER = 'Wniosek OPUS-29 ID: 123456'
+
+DMP_PAGES = [
+    [
+        'PLAN ZARZADZANIA DANYMI',
+        '1. Opis danych oraz pozyskiwanie lub ponowne wykorzystanie dostepnych danych',
+        '1.1 Sposob pozyskiwania i opracowywania nowych danych i/lub ponownego',
+        'wykorzystania dostepnych danych',
+        'Dane zostana zebrane w trakcie wywiadow poglebionych z respondentami.',
+        '1.2 Pozyskiwane lub opracowywane dane (np. rodzaj, format, ilosc)',
+        'Nagrania audio w formacie WAV oraz transkrypcje w formacie DOCX, okolo 30 GB.',
+    ],
+    [
+        '2. Dokumentacja i jakosc danych',
+        '2.1 Metadane i dokumenty (np. metodologia lub pozyskiwanie danych oraz sposob',
+        'porzadkowania danych) towarzyszace danym',
+        'Kazdy wywiad zostanie opisany metadanymi zgodnymi ze standardem DDI.',
+        '2.2 Stosowane srodki kontroli jakosci danych',
+        'Transkrypcje beda weryfikowane przez dwoch niezaleznych badaczy.',
+    ],
+    [
+        '3. Przechowywanie i tworzenie kopii zapasowych podczas badan',
+        '3.1 Przechowywanie i tworzenie kopii zapasowych danych i metadanych podczas badan',
+        'Dane beda przechowywane na serwerze uczelni z codzienna kopia zapasowa.',
+        '3.2 Bezpieczenstwo danych oraz ochrona danych wrazliwych podczas badan',
+        'Dostep do danych osobowych bedzie mial wylacznie kierownik projektu.',
+    ],
+    [
+        '4. Wymogi prawne, kodeks postepowania',
+        '4.1 Zgodnosc z przepisami dotyczacymi danych osobowych oraz bezpieczenstwa danych',
+        'Respondenci podpisza formularz swiadomej zgody zgodny z RODO.',
+        '4.2 Inne kwestie prawne, takie jak prawa wlasnosci intelektualnej lub wlasnosc',
+        'Prawa do danych naleza do uczelni zgodnie z regulaminem.',
+    ],
+    [
+        '5. Udostepnianie i dlugotrwale przechowywanie danych',
+        '5.1 Sposob i termin udostepnienia danych oraz ewentualne ograniczenia',
+        'Dane zostana udostepnione w repozytorium RepOD po zakonczeniu projektu.',
+        '5.2 Sposob wyboru danych przeznaczonych do przechowywania i miejsce ich',
+        'dlugotrwalego przechowywania',
+        'Zanonimizowane transkrypcje beda przechowywane przez 10 lat.',
+        '5.3 Metody lub oprogramowanie potrzebne do uzyskania dostepu do danych',
+        'Do otwarcia plikow wystarczy edytor tekstu.',
+        '5.4 Sposob zapewnienia stosowania unikalnego i trwalego identyfikatora',
+        'dla kazdego zbioru danych',
+        'Repozytorium nada kazdemu zbiorowi identyfikator DOI.',
+    ],
+    [
+        '6. Zadania zwiazane z zarzadzaniem danymi oraz zasoby',
+        '6.1 Osoba odpowiedzialna za zarzadzanie danymi lub opiekun danych',
+        'Za zarzadzanie danymi odpowiada kierownik projektu.',
+        '6.2 Zasoby przeznaczone na zarzadzanie danymi i zapewnienie mozliwosci',
+        'odnalezienia, dostepu, interoperacyjnosci i ponownego wykorzystania danych',
+        'Na zarzadzanie danymi przeznaczono 2 procent budzetu projektu.',
+    ],
+]
+
+
+def filler_page(number):
+    return [
+        f'Opis projektu badawczego, czesc {number}.',
+        'Celem projektu jest analiza funkcjonowania sadow powszechnych w Polsce',
+        'ze szczegolnym uwzglednieniem roli prezesow i dyrektorow sadow.',
+        'Badanie obejmie rowniez porownanie z rozwiazaniami stosowanymi w innych krajach.',
+        f'Harmonogram zadan na etap {number} przewiduje analize dokumentow zrodlowych.',
+    ]
+
+
+def build_pages():
+    pages = [filler_page(i) for i in range(1, 41)]
+    pages += DMP_PAGES
+    pages.append(['Oswiadczenia administracyjne', 'Oswiadczam, ze zapoznalem sie z regulaminem.'])
+    pages += [filler_page(i) for i in range(48, 61)]
+    return [[HEADER] + lines for lines in pages]
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_pdf(path, pages):
+    """Write a minimal PDF with one text line per list entry."""
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(None)
+    pages_id = add(None)
+    font_id = add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+
+    page_ids = []
+    for lines in pages:
+        ops = ['BT', '/F1 10 Tf', '14 TL', '50 800 Td']
+        for line in lines:
+            ops.append(f'({_escape(line)}) Tj T*')
+        ops.append('ET')
+        stream = '\n'.join(ops).encode('latin-1')
+        content_id = add(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        page_ids.append(add(
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] '
+            b'/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>'
+            % (pages_id, font_id, content_id)
+        ))
+
+    objects[catalog_id - 1] = b'<< /Type /Catalog /Pages %d 0 R >>' % pages_id
+    kids = b' '.join(b'%d 0 R' % pid for pid in page_ids)
+    objects[pages_id - 1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(page_ids))
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref_at = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        out += b'%010d 00000 n \n' % offset
+    out += b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+        len(objects) + 1, catalog_id, xref_at
+    )
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+if __name__ == '__main__':
+    output_path = os.path.join('tests', 'fixtures', 'test_dmp_long.pdf')
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    write_pdf(output_path, build_pages())
+
+    print(f"Created test PDF: {output_path}")
+    print(f"File size: {os.path.getsize(output_path)} bytes")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Focused tests for cross-process admission control."""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from utils.admission import AdmissionController, AdmissionTimeout
+from utils.extractor_v4 import DMPExtractor
+
+FIXTURE_DOCX = os.path.join(os.path.dirname(__file__), 'fixtures', 'test_dmp_simple.docx')
+
+
+class AdmissionControllerTests(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp(prefix='dmp_art_admission_')
+        self.addCleanup(shutil.rmtree, self.state_dir, ignore_errors=True)
+
+    def _admission(self, **kwargs):
+        kwargs.setdefault('max_wait', 5)
+        return AdmissionController(self.state_dir, {'extract': 2, 'ocr': 1}, poll_interval=0.01, **kwargs)
+
+    def test_limits_concurrent_holders(self):
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def work(kind):
+            with self._admission().slot(kind):
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                time.sleep(0.05)
+                with lock:
+                    active[0] -= 1
+
+        for kind, limit in (('extract', 2), ('ocr', 1)):
+            peak[0] = 0
+            threads = [threading.Thread(target=work, args=(kind,)) for _ in range(5)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(peak[0], limit)
+
+    def test_waiters_are_admitted_in_order_with_positions(self):
+        admission = self._admission()
+        order, positions = [], {'a': [], 'b': []}
+        release = threading.Event()
+
+        def hold():
+            with admission.slot('ocr'):
+                release.wait(5)
+
+        def wait(name):
+            with self._admission().slot('ocr', on_wait=positions[name].append):
+                order.append(name)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        time.sleep(0.05)
+        waiters = [threading.Thread(target=wait, args=(name,)) for name in ('a', 'b')]
+        for t in waiters:
+            t.start()
+            time.sleep(0.05)
+        self.assertEqual(admission.stats()['ocr'], {'limit': 1, 'running': 1, 'waiting': 2})
+        release.set()
+        for t in [holder] + waiters:
+            t.join()
+        self.assertEqual(order, ['a', 'b'])
+        self.assertEqual(positions['a'], [1])
+        self.assertEqual(positions['b'][0], 2)
+        self.assertEqual(admission.stats()['ocr'], {'limit': 1, 'running': 0, 'waiting': 0})
+
+    def test_deadline_rejects_instead_of_waiting(self):
+        with self._admission().slot('ocr'):
+            late = self._admission(max_wait=10, since=time.time() - 9.9)
+            with self.assertRaises(AdmissionTimeout) as ctx:
+                with late.slot('ocr'):
+                    pass
+        self.assertIn('Server busy: no free OCR slot within 10 s', str(ctx.exception))
+        self.assertEqual(os.listdir(self.state_dir), ['ocr.0.slot'])  # no waiter left behind
+
+    def test_slots_taken_after_admission_ignore_the_deadline(self):
+        late = self._admission(max_wait=0.1, since=time.time() - 60)
+        admitted = threading.Event()
+
+        def run_ocr():
+            with late.slot('ocr', bounded=False):
+                admitted.set()
+
+        with self._admission().slot('ocr'):
+            with self.assertRaises(AdmissionTimeout):
+                with late.slot('ocr'):
+                    pass
+            waiter = threading.Thread(target=run_ocr)
+            waiter.start()
+            self.assertFalse(admitted.wait(0.3))  # still waiting, past the deadline
+        self.assertTrue(admitted.wait(5))
+        waiter.join()
+
+    def test_stats_never_lock_or_create_slot_files(self):
+        admission = self._admission()
+        with mock.patch('utils.admission._try_lock', side_effect=AssertionError('stats took a lock')):
+            self.assertEqual(admission.stats()['extract'], {'limit': 2, 'running': 0, 'waiting': 0})
+        self.assertEqual(os.listdir(self.state_dir), [])
+        with admission.slot('extract'):
+            with mock.patch('utils.admission._try_lock', side_effect=AssertionError('stats took a lock')):
+                self.assertEqual(admission.stats()['extract']['running'], 1)
+        self.assertEqual(admission.stats()['extract']['running'], 0)
+
+    def test_slots_are_shared_with_other_processes_and_freed_when_they_die(self):
+        # A waiter file left by a crashed process does not block the queue
+        open(os.path.join(self.state_dir, 'extract.00000000000000000001.1.1.wait'), 'w').close()
+        holder = subprocess.Popen(
+            [sys.executable, '-c',
+             'import sys, time; from utils.admission import AdmissionController\n'
+             'with AdmissionController(sys.argv[1], {"ocr": 1}).slot("ocr"):\n'
+             '    print("held", flush=True); time.sleep(30)',
+             self.state_dir],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stdout=subprocess.PIPE, text=True,
+        )
+        self.addCleanup(holder.kill)
+        self.assertEqual(holder.stdout.readline().strip(), 'held')
+        self.assertEqual(self._admission().stats()['ocr']['running'], 1)
+        with self.assertRaises(AdmissionTimeout):
+            with self._admission(max_wait=0.1).slot('ocr'):
+                pass
+        holder.kill()
+        holder.wait()
+        self.assertEqual(self._admission().stats()['ocr']['running'], 0)
+        with self._admission(max_wait=1).slot('ocr'):
+            with self._admission(max_wait=0.1).slot('extract'):
+                pass
+        self.assertNotIn('extract.00000000000000000001.1.1.wait', os.listdir(self.state_dir))
+
+    def test_process_file_waits_for_an_extraction_slot_until_the_deadline(self):
+        out = tempfile.mkdtemp(prefix='dmp_art_out_')
+        self.addCleanup(shutil.rmtree, out, ignore_errors=True)
+        state_dir = os.path.join(out, 'state', 'admission')
+        messages = []
+        holders = AdmissionController(state_dir, {'extract': 2})
+        with holders.slot('extract'), holders.slot('extract'):
+            result = DMPExtractor().process_file(
+                FIXTURE_DOCX, out, progress_callback=lambda msg, pct: messages.append(msg),
+                admission_dir=state_dir, queued_at=time.time() - 599.7,
+            )
+        self.assertFalse(result['success'])
+        self.assertIn('Server busy: no free extraction slot', result['message'])
+        self.assertIn('Waiting for a free extraction slot (position 1)…', messages)
+        result = DMPExtractor().process_file(FIXTURE_DOCX, out, admission_dir=state_dir)
+        self.assertTrue(result['success'])
+
+
+if __name__ == '__main__':
+    unittest.main()
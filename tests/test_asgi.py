@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""Focused tests for the ASGI wrapper and async serving."""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from utils import server
+from utils.asgi import AsyncApp
+from utils.progress import SSE_CONNECTED, ProgressBus, sse_message
+
+
+class _AsgiClient:
+    """Drives one ASGI request; `disconnect` (an asyncio.Event) ends the client side."""
+
+    def __init__(self, app, method, path, body=b'', headers=()):
+        self.app = app
+        self.scope = {
+            'type': 'http', 'method': method, 'path': path, 'query_string': b'x=1',
+            'http_version': '1.1', 'scheme': 'http', 'server': ('testserver', 80),
+            'client': ('127.0.0.1', 5000), 'root_path': '', 'headers': list(headers),
+        }
+        self.body = body
+        self.sent = []
+        self.disconnect = asyncio.Event()
+
+    async def run(self):
+        chunks = self.body if isinstance(self.body, list) else [self.body]
+        requests = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1}
+                    for i, chunk in enumerate(chunks)][::-1]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await self.disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            self.sent.append(message)
+
+        await self.app(self.scope, receive, send)
+        return self
+
+    @property
+    def status(self):
+        return self.sent[0]['status']
+
+    @property
+    def text(self):
+        return b''.join(m.get('body', b'') for m in self.sent[1:]).decode('utf-8')
+
+
+class AsyncAppTests(unittest.TestCase):
+    @staticmethod
+    def _echo(environ, start_response):
+        body = environ['wsgi.input'].read(int(environ['CONTENT_LENGTH']))
+        start_response('201 Created', [('Content-Type', 'text/plain'), ('X-Path', environ['PATH_INFO'])])
+        return [threading.current_thread().name.encode(), b'|', body, b'|', environ['QUERY_STRING'].encode()]
+
+    def _app(self, bus, **kwargs):
+        app = AsyncApp(self._echo, bus, **kwargs)
+        self.addCleanup(app.close)
+        return app
+
+    def test_async_stream_sends_the_same_messages_as_the_sync_stream(self):
+        buses = ProgressBus(), ProgressBus()
+        for bus in buses:
+            bus.open('s1', {'message': 'Starting', 'progress': 0, 'status': 'processing'})
+            bus.update('s1', {'progress': 30})
+            bus.update('s1', {'message': 'Done', 'status': 'complete', 'redirect': '/review/x'})
+        expected = SSE_CONNECTED + ''.join(sse_message(eid, data) for eid, data in buses[0].subscribe('s1'))
+
+        client = asyncio.run(_AsgiClient(self._app(buses[1]), 'GET', '/progress/s1').run())
+        self.assertEqual(client.status, 200)
+        self.assertIn((b'content-type', b'text/event-stream; charset=utf-8'), client.sent[0]['headers'])
+        self.assertEqual(client.text, expected)
+        self.assertIsNone(buses[1].get('s1'))
+
+        resumed = asyncio.run(_AsgiClient(
+            self._app(ProgressBus()), 'GET', '/progress/s1', headers=[(b'last-event-id', b'7')]
+        ).run())
+        self.assertEqual(resumed.text, sse_message(None, {
+            'message': 'Unknown or expired progress session', 'progress': 0, 'status': 'error'}))
+
+    def test_many_streams_share_one_event_loop_thread(self):
+        bus = ProgressBus(heartbeat=5)
+        self.addCleanup(bus.close)
+        app = self._app(bus)
+        sessions = [f's{n}' for n in range(200)]
+        for session_id in sessions:
+            bus.open(session_id, {'message': 'Queued', 'status': 'processing'})
+
+        async def main():
+            clients = [_AsgiClient(app, 'GET', f'/progress/{sid}') for sid in sessions]
+            tasks = [asyncio.ensure_future(c.run()) for c in clients]
+            await asyncio.sleep(0.05)
+            threads = threading.active_count()
+            publisher = threading.Thread(target=lambda: [
+                bus.update(sid, {'message': 'Done', 'status': 'complete', 'redirect': f'/review/{sid}'})
+                for sid in sessions
+            ])
+            publisher.start()
+            await asyncio.wait_for(asyncio.gather(*tasks), 10)
+            publisher.join()
+            return clients, threads
+
+        clients, threads = asyncio.run(main())
+        self.assertLess(threads, 10)  # no thread per open stream
+        for sid, client in zip(sessions, clients):
+            self.assertIn(f'"redirect": "/review/{sid}"', client.text)
+        self.assertEqual(len(bus), 0)
+
+    def test_client_disconnect_ends_the_stream(self):
+        bus = ProgressBus(heartbeat=5)
+        self.addCleanup(bus.close)
+        bus.open('s1', {'message': 'Queued', 'status': 'processing'})
+        app = self._app(bus)
+
+        async def main():
+            client = _AsgiClient(app, 'GET', '/progress/s1')
+            task = asyncio.ensure_future(client.run())
+            await asyncio.sleep(0.02)
+            self.assertEqual(app.open_streams, 1)
+            client.disconnect.set()
+            await asyncio.wait_for(task, 5)
+            return client
+
+        client = asyncio.run(main())
+        self.assertEqual(app.open_streams, 0)
+        self.assertEqual(bus._listeners, set())
+        self.assertIn('"message": "Queued"', client.text)
+
+    def test_other_requests_run_in_the_wsgi_thread_pools(self):
+        app = self._app(ProgressBus())
+        page = asyncio.run(_AsgiClient(app, 'POST', '/upload', body=b'payload').run())
+        self.assertEqual(page.status, 201)
+        self.assertIn((b'x-path', b'/upload'), page.sent[0]['headers'])
+        self.assertRegex(page.text, r'^asgi-wsgi_\d+\|payload\|x=1$')
+        ai = asyncio.run(_AsgiClient(app, 'POST', '/api/ai/suggest', body=b'{}').run())
+        self.assertTrue(ai.text.startswith('asgi-offload_'))
+
+    def test_bodies_over_max_content_length_are_refused(self):
+        calls = []
+
+        def wsgi(environ, start_response):
+            calls.append(environ['PATH_INFO'])
+            return self._echo(environ, start_response)
+
+        wsgi.config = {'MAX_CONTENT_LENGTH': 8}
+        app = AsyncApp(wsgi, ProgressBus())
+        self.addCleanup(app.close)
+        declared = asyncio.run(_AsgiClient(app, 'POST', '/upload', body=b'x', headers=[(b'content-length', b'9')]).run())
+        self.assertEqual(declared.status, 413)
+        self.assertFalse(json.loads(declared.text)['success'])
+        streamed = asyncio.run(_AsgiClient(app, 'POST', '/upload', body=[b'12345', b'6789', b'0']).run())
+        self.assertEqual(streamed.status, 413)
+        self.assertEqual(calls, [])
+        ok = asyncio.run(_AsgiClient(app, 'POST', '/upload', body=[b'1234', b'5678']).run())
+        self.assertEqual(ok.status, 201)
+        self.assertIn('|12345678|', ok.text)
+
+    @unittest.skipUnless(server.HAS_UVICORN, 'uvicorn not installed')
+    def test_one_async_worker_serves_the_given_app_object(self):
+        bus = ProgressBus()
+        with mock.patch.object(server.uvicorn, 'run') as run:
+            server.run_server(self._echo, 'async', workers=0, threads=2, progress_bus=bus)
+            server.run_server(self._echo, 'async', workers=2, progress_bus=bus)
+        single, multi = (call.args[0] for call in run.call_args_list)
+        self.addCleanup(single.close)
+        self.assertIsInstance(single, AsyncApp)
+        self.assertIs(single.wsgi_app, self._echo)
+        self.assertIs(single.progress_bus, bus)
+        self.assertEqual(multi, 'asgi:application')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Focused tests for the content-addressed extraction cache."""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from utils.extraction_cache import ExtractionIndex, hash_file
+from utils.extractor_v4 import DMPExtractor
+
+FIXTURE_DOCX = os.path.join(os.path.dirname(__file__), 'fixtures', 'test_dmp_simple.docx')
+
+
+class ExtractionCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp(prefix='dmp_art_extract_')
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def _load_cache(self, cache_id):
+        path = os.path.join(self.output_dir, 'cache', f'cache_{cache_id}.json')
+        with open(path, 'r', encoding='utf-8') as file_handle:
+            return json.load(file_handle)
+
+    def test_identical_upload_is_served_from_cache(self):
+        extractor = DMPExtractor()
+        first = extractor.process_file(FIXTURE_DOCX, self.output_dir)
+        self.assertTrue(first['success'])
+        self.assertFalse(first.get('cache_hit', False))
+
+        second = DMPExtractor().process_file(FIXTURE_DOCX, self.output_dir)
+        self.assertTrue(second['success'])
+        self.assertTrue(second['cache_hit'])
+        self.assertNotEqual(first['cache_id'], second['cache_id'])
+        self.assertEqual(self._load_cache(first['cache_id']), self._load_cache(second['cache_id']))
+
+    def test_lookup_misses_when_fingerprint_or_cache_file_changes(self):
+        extractor = DMPExtractor()
+        result = extractor.process_file(FIXTURE_DOCX, self.output_dir)
+        index = ExtractionIndex(os.path.join(self.output_dir, 'cache'))
+        content_hash = hash_file(FIXTURE_DOCX)
+
+        self.assertEqual(index.lookup(content_hash, extractor.fingerprint()), result['cache_id'])
+        self.assertIsNone(index.lookup(content_hash, 'other-fingerprint'))
+
+        os.remove(os.path.join(self.output_dir, 'cache', result['cache_file']))
+        self.assertIsNone(index.lookup(content_hash, extractor.fingerprint()))
+        self.assertIsNone(extractor.lookup_cached(FIXTURE_DOCX, self.output_dir))
+
+    def test_batch_resume_skips_only_documents_with_a_session_bundle(self):
+        from batch_extract import extract_document
+
+        first = extract_document(FIXTURE_DOCX, self.output_dir)
+        self.assertEqual(first['status'], 'extracted')
+        session_dir = os.path.join(self.output_dir, 'sessions', 'active', first['cache_id'])
+        self.assertTrue(os.path.exists(os.path.join(session_dir, 'feedback.json')))
+        self.assertEqual(extract_document(FIXTURE_DOCX, self.output_dir)['status'], 'skipped')
+
+        # A run that stopped after indexing but before writing the bundle
+        shutil.rmtree(session_dir)
+        resumed = extract_document(FIXTURE_DOCX, self.output_dir)
+        self.assertEqual((resumed['status'], resumed['cache_id']), ('extracted', first['cache_id']))
+        self.assertTrue(os.path.exists(os.path.join(session_dir, 'feedback.json')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Focused tests for DOCX streaming, extraction rules and extraction profiles."""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+from utils.extractor_v4 import (
+    DMPExtractor, DocConverter, ExtractionProfile, ExtractionRules, SkipTermsManager, TermMatcher, VariantsLoader,
+)
+
+FIXTURE_DOCX = os.path.join(os.path.dirname(__file__), 'fixtures', 'test_dmp_simple.docx')
+
+
+class DocxStreamTests(unittest.TestCase):
+    @staticmethod
+    def _blocks(path, stream):
+        return [(b.text, b.is_bold, b.is_heading, b.source, b.page, b.is_hf)
+                for b in DocConverter({'docx_stream': stream}).convert(path)]
+
+    def _build(self, path):
+        doc = Document()
+        doc.sections[0].header.paragraphs[0].text = 'Wniosek OPUS-27'
+        doc.add_heading('Rozdział 1', level=1)
+        doc.add_paragraph().add_run('Bold title').bold = True
+        para = doc.add_paragraph()
+        para.add_run('not bold').bold = False
+        para.add_run(' plain\tTab')
+        para.add_run().add_break()
+        para._p.append(parse_xml(
+            f'<w:hyperlink {nsdecls("w", "r")} r:id="rId99"><w:r><w:t>link</w:t></w:r></w:hyperlink>'))
+        para._p.append(parse_xml(
+            f'<w:r {nsdecls("w")}><w:t>x</w:t><w:noBreakHyphen/><w:t>y</w:t><w:br w:type="page"/></w:r>'))
+        doc.add_paragraph('Wniosek OPUS-27')
+        doc.add_paragraph('Title style', style='Title')
+        table = doc.add_table(rows=3, cols=3)
+        for i, row in enumerate(table.rows):
+            for j, cell in enumerate(row.cells):
+                cell.text = f'cell {i}.{j}'
+        table.cell(2, 0).merge(table.cell(2, 1))
+        table.cell(1, 2).add_table(rows=1, cols=2).cell(0, 0).text = 'nested'
+        doc.save(path)
+
+    def test_stream_gives_same_blocks_as_python_docx(self):
+        tmp = tempfile.mkdtemp(prefix='dmp_art_docx_')
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        built = os.path.join(tmp, 'built.docx')
+        self._build(built)
+        for path in (FIXTURE_DOCX, built):
+            with self.subTest(path=os.path.basename(path)):
+                self.assertEqual(self._blocks(path, 1), self._blocks(path, 0))
+        blocks = self._blocks(built, 1)
+        self.assertIn(('not bold plain\tTab\nlinkx-y', False, False, 'paragraph', 2, False), blocks)
+        self.assertTrue(blocks[3][5])  # header text repeated in the body
+        self.assertIn('nested', [b[0] for b in blocks if b[3] == 'table'])
+
+
+class ExtractionRulesTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='dmp_art_rules_')
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.path = os.path.join(self.tmp, 'extraction_rules.json')
+        self._write({
+            'general': [{'id': 'page', 'pattern': r'^Strona \d+$', 'enabled': True},
+                        {'id': 'off', 'pattern': 'Wydruk', 'enabled': False}],
+            'pdf_specific': [{'id': 'form', 'pattern': '^Początek formularza$', 'enabled': True}],
+            'docx_specific': [{'id': 'toc', 'pattern': '^Spis treści$', 'enabled': True}],
+        }, custom=[{'id': 'mine', 'pattern': 'INTERNAL', 'enabled': True}])
+
+    def _write(self, categories, custom=()):
+        data = {
+            'skip_patterns': {
+                name: {'enabled': True, 'patterns': patterns} for name, patterns in categories.items()
+            },
+            'user_custom_rules': {'enabled': True, 'rules': list(custom)},
+        }
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    def _ids(self, doc_type):
+        return [rule_id for rule_id, _ in ExtractionRules(self.path).patterns(doc_type)]
+
+    def test_enabled_rules_are_selected_per_document_type(self):
+        self.assertEqual(self._ids('pdf'), ['page', 'form', 'mine'])
+        self.assertEqual(self._ids('docx'), ['page', 'toc', 'mine'])
+
+    def test_rules_reload_when_the_file_changes(self):
+        rules = ExtractionRules(self.path)
+        self.assertIs(rules.rules(), ExtractionRules(self.path).rules())
+        self._write({'general': [{'id': 'page', 'pattern': r'^Page \d+$', 'enabled': True},
+                                 {'id': 'bad', 'pattern': '(unbalanced', 'enabled': True}]})
+        self.assertEqual(self._ids('pdf'), ['page'])
+        self.assertEqual(rules.rules()[0]['pattern'], r'^Page \d+$')
+
+    def test_combined_matcher_attributes_lines_to_rules(self):
+        matcher = TermMatcher(['skip me'], ExtractionRules(self.path).patterns('pdf'))
+        self.assertEqual(matcher.search('Strona 4'), 'page')
+        self.assertEqual(matcher.search('Początek formularza'), 'form')
+        self.assertIsNone(matcher.search('strona 4'))  # rule patterns are case-sensitive
+        self.assertEqual(matcher.search('please SKIP ME'), 'skip me')
+
+    def test_rules_match_whole_lines_only(self):
+        matcher = TermMatcher((), ExtractionRules().patterns('pdf'))
+        for noise in ('OSF,', 'OSF, OPUS-29 Strona 3 ID: 612345, 2026-03-02 10:15:00',
+                      'Page 4', 'Strona 4 z 12', 'ID: 612345', '2026-03-02 10:15:00'):
+            self.assertIsNotNone(matcher.search(noise), noise)
+        for sentence in (
+            'Data will be deposited in OSF, Zenodo and the institutional repository.',
+            'See Page 12 of the data policy for the retention schedule.',
+            'Each sample keeps its ID: 1042 in the laboratory information system.',
+            'Sensor readings are logged as 2026-03-02 10:15:00 timestamps in UTC.',
+        ):
+            self.assertIsNone(matcher.search(sentence), sentence)
+
+    def test_hit_counters_accumulate_across_extractions(self):
+        ExtractionRules.record_hits(self.tmp, {'page': 3, 'form': 1})
+        ExtractionRules.record_hits(self.tmp, {'page': 2})
+        stats = ExtractionRules.load_hits(self.tmp)
+        self.assertEqual(stats['hits'], {'page': 5, 'form': 1})
+        self.assertEqual(stats['documents'], 2)
+
+    def test_extraction_records_rule_hits(self):
+        output_dir = os.path.join(self.tmp, 'out')
+        self.assertTrue(DMPExtractor().process_file(FIXTURE_DOCX, output_dir)['success'])
+        self.assertEqual(ExtractionRules.load_hits(os.path.join(output_dir, 'cache'))['documents'], 1)
+
+
+class ExtractionProfileTests(unittest.TestCase):
+    CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config')
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='dmp_art_profile_')
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.paths = {}
+        for key, name in (('variants_path', 'dmp_variants.json'), ('skip_terms_path', 'extraction_skip_terms.json'),
+                          ('rules_path', 'extraction_rules.json'), ('anchors_path', 'dmp_anchors.json')):
+            self.paths[key] = os.path.join(self.tmp, name)
+            shutil.copy(os.path.join(self.CONFIG, name), self.paths[key])
+        self.paths['settings_path'] = os.path.join(self.tmp, 'settings.json')
+
+    def test_profile_is_shared_until_a_config_file_changes(self):
+        profile = ExtractionProfile.current(**self.paths)
+        self.assertIs(ExtractionProfile.current(**self.paths), profile)
+        self.assertIs(DMPExtractor().profile, ExtractionProfile.current())
+        self.assertEqual(profile.settings['pdf_backend'], 'auto')  # settings.json missing → defaults
+
+        SkipTermsManager(self.paths['skip_terms_path']).save(['Profile Test Term'])
+        reloaded = ExtractionProfile.current(**self.paths)
+        self.assertIsNot(reloaded, profile)
+        self.assertEqual(reloaded.skip_matcher('pdf').search('a profile test term'), 'Profile Test Term')
+        # The old snapshot is unchanged for extractions still using it
+        self.assertIsNone(profile.skip_matcher('pdf').search('a profile test term'))
+
+    def test_extractor_follows_config_changes_unless_pinned(self):
+        extractor = DMPExtractor(profile=ExtractionProfile.current(**self.paths))
+        following = DMPExtractor()
+        following._use_profile(ExtractionProfile.current(**self.paths))
+        before = following.fingerprint()
+
+        SkipTermsManager(self.paths['skip_terms_path']).add('another term')
+        self.assertIs(extractor.refresh(), extractor.profile)
+        self.assertIsNot(following.refresh(), extractor.profile)
+        self.assertNotEqual(following.fingerprint(), before)
+        self.assertEqual(extractor.fingerprint(), before)
+
+    def test_fingerprint_covers_page_and_ocr_settings(self):
+        extractor = DMPExtractor(profile=ExtractionProfile.current(**self.paths))
+        before = extractor.fingerprint()
+        for key in ('ocr_two_pass', 'ocr_dpi', 'ocr_page_min_chars', 'early_exit'):
+            with self.subTest(setting=key):
+                changed = DMPExtractor(profile=extractor.profile)
+                changed._converter.settings[key] = int(changed._converter.settings[key]) + 1
+                self.assertNotEqual(changed.fingerprint(), before)
+        self.assertEqual(DMPExtractor(profile=extractor.profile).fingerprint(), before)
+
+    def test_variants_are_immutable_tuples(self):
+        profile = ExtractionProfile.current(**self.paths)
+        subsection_variants, _ = VariantsLoader(self.paths['variants_path']).load()
+        self.assertEqual({sid: list(names) for sid, names in profile.subsection_variants.items()},
+                         subsection_variants)
+        with self.assertRaises(TypeError):
+            profile.subsection_variants['1.1'] = ()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Focused tests for the background extraction job queue."""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from utils.jobs import ExtractionJobQueue, QueueFullError
+
+
+class ExtractionJobQueueTests(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.finished = {}
+        self.all_done = threading.Event()
+        self.updates = []
+
+    def _blocking_job(self, job_id, file_path, output_dir, content_hash=None, extractor_name='v4',
+                      queued_at=None, events=None):
+        events.put((job_id, 'Working…', 50))
+        self.release.wait(5)
+        return {'success': True, 'cache_id': job_id}
+
+    def _on_finish(self, job_id, result, context):
+        self.finished[job_id] = result
+        if len(self.finished) == 2:
+            self.all_done.set()
+
+    def test_queue_reports_positions_and_rejects_when_full(self):
+        jobs = ExtractionJobQueue(
+            max_workers=1, max_queue=1, executor='thread',
+            on_update=lambda job_id, fields: self.updates.append((job_id, fields)),
+            on_finish=self._on_finish, job_fn=self._blocking_job,
+        )
+        try:
+            self.assertEqual(jobs.submit('a', 'a.pdf', 'out'), 0)
+            self.assertEqual(jobs.submit('b', 'b.pdf', 'out'), 1)
+            with self.assertRaises(QueueFullError) as ctx:
+                jobs.submit('c', 'c.pdf', 'out')
+            self.assertGreater(ctx.exception.retry_after, 0)
+
+            self.release.set()
+            self.assertTrue(self.all_done.wait(5))
+            self.assertTrue(self.finished['a']['success'])
+            self.assertTrue(self.finished['b']['success'])
+
+            states = [fields['job_state'] for job_id, fields in self.updates if job_id == 'b']
+            self.assertEqual(states[0], 'queued')
+            self.assertIn('running', states)
+            self.assertEqual(jobs.stats()['completed'], 2)
+        finally:
+            self.release.set()
+            jobs.shutdown()
+
+    def test_jobs_waiting_past_max_wait_are_rejected(self):
+        jobs = ExtractionJobQueue(
+            max_workers=1, max_queue=2, executor='thread', max_wait=60,
+            on_update=lambda job_id, fields: self.updates.append((job_id, fields)),
+            on_finish=self._on_finish, job_fn=self._blocking_job,
+        )
+        try:
+            jobs.submit('a', 'a.pdf', 'out')
+            jobs.submit('b', 'b.pdf', 'out')
+            self.assertEqual(jobs.expire(), 0)
+            self.assertEqual(jobs.expire(time.monotonic() + 61), 1)
+            self.assertFalse(self.finished['b']['success'])
+            self.assertIn('Server busy: no free extraction slot within 60 s', self.finished['b']['message'])
+            self.assertEqual((jobs.stats()['queued'], jobs.stats()['rejected']), (0, 1))
+            self.release.set()
+            self.assertTrue(self.all_done.wait(5))
+            self.assertTrue(self.finished['a']['success'])
+        finally:
+            self.release.set()
+            jobs.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
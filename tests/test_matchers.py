@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Focused tests for heading matchers and term matching."""
+
+import os
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from utils.extractor_v4 import (
+    _BUILTIN_NOISE, _NOISE_MATCHER, DMPTrimmer, DocConverter, FingerprintFilter, LinearMatcher, SkipTermsManager,
+    TermMatcher, TextBlock, VariantsLoader, _name_token_sets, _norm_for_match, _window_tokens, strip_formatting,
+)
+from utils.matrix_matcher import HAS_MATRIX_MATCHER, MatrixMatcher
+
+FIXTURE_PDF = os.path.join(os.path.dirname(__file__), 'fixtures', 'test_dmp_long.pdf')
+
+
+class IndexedMatcherTests(unittest.TestCase):
+    def test_index_gives_same_anchors_as_full_scan(self):
+        subsection_variants, section_variants = VariantsLoader().load()
+        page_texts = DocConverter({'pdf_workers': 1, 'pdf_backend': 'pypdf2'})._read_pdf_pages(FIXTURE_PDF)
+        blocks = DocConverter._pages_to_blocks(page_texts, set())
+        layouts = {
+            'full document': blocks,
+            'DMP only': blocks[240:290],
+            'reversed': blocks[::-1],
+            'every other block': blocks[::2],
+        }
+        for label, layout in layouts.items():
+            with self.subTest(layout=label):
+                expected = LinearMatcher(use_index=False).find_all(layout, subsection_variants, section_variants)
+                actual = LinearMatcher().find_all(layout, subsection_variants, section_variants)
+                self.assertEqual(actual, expected)
+        found, _ = LinearMatcher().find_all(blocks, subsection_variants, section_variants)
+        self.assertTrue(all(found[sid] is not None for sid in found))
+
+
+class FingerprintFilterTests(unittest.TestCase):
+    def setUp(self):
+        self.subsection_variants, self.section_variants = VariantsLoader().load()
+        self.names = [n for variants in (*self.subsection_variants.values(), *self.section_variants.values())
+                      for n in variants]
+        page_texts = DocConverter({'pdf_workers': 1, 'pdf_backend': 'pypdf2'})._read_pdf_pages(FIXTURE_PDF)
+        self.blocks = DocConverter._pages_to_blocks(page_texts, set())
+
+    def test_filtered_blocks_can_never_score(self):
+        kept = set(FingerprintFilter().candidates(self.blocks, self.names))
+        self.assertLess(len(kept), len(self.blocks) // 2)
+        vocabulary = set().union(*_name_token_sets(tuple(self.names)))
+        for i, blk in enumerate(self.blocks):
+            if i not in kept and not blk.is_hf:
+                self.assertFalse(blk.tokens & vocabulary, blk.text)
+                self.assertIsNone(LinearMatcher._RE_NUMERATION.match(blk.text), blk.text)
+
+    def test_body_text_is_not_normalised(self):
+        blocks = [TextBlock(blk.text, page=blk.page) for blk in self.blocks]
+        found, _ = LinearMatcher().find_all(blocks, self.subsection_variants, self.section_variants)
+        expected, _ = LinearMatcher(use_index=False).find_all(
+            self.blocks, self.subsection_variants, self.section_variants)
+        self.assertEqual(found, expected)
+        skipped = [blk for blk in blocks if blk._norm is None]
+        self.assertGreater(len(skipped), len(blocks) // 2)
+
+    def test_trim_start_matches_unfiltered_scan(self):
+        trimmer = DMPTrimmer()
+        start_names = self.section_variants['1'] + self.subsection_variants['1.1']
+        name_sets = _name_token_sets(tuple(start_names))
+        for layout in (self.blocks, self.blocks[::2], self.blocks[::-1]):
+            self.assertEqual(
+                trimmer._find_start(layout, name_sets, trimmer.prefilter.candidates(layout, start_names)),
+                trimmer._find_start(layout, name_sets),
+            )
+
+    def test_length_changing_case_folding_falls_back_per_block(self):
+        blocks = [TextBlock('İstanbul office'), TextBlock('Sposób pozyskiwania danych'), TextBlock('2.1 x')]
+        self.assertEqual(FingerprintFilter().candidates(blocks, self.subsection_variants['1.1']), [1, 2])
+
+
+@unittest.skipUnless(HAS_MATRIX_MATCHER, 'numpy/scipy not installed')
+class MatrixMatcherTests(unittest.TestCase):
+    def test_matrix_scores_give_same_anchors_as_full_scan(self):
+        subsection_variants, section_variants = VariantsLoader().load()
+        page_texts = DocConverter({'pdf_workers': 1, 'pdf_backend': 'pypdf2'})._read_pdf_pages(FIXTURE_PDF)
+        blocks = DocConverter._pages_to_blocks(page_texts, set())
+
+        # Wider window band than the defaults so 2-/3-block windows are exercised
+        class WideLinear(LinearMatcher):
+            MIN_FIRST, LOW = 0.2, 0.5
+
+        class WideMatrix(MatrixMatcher):
+            MIN_FIRST, LOW = 0.2, 0.5
+
+        for label, layout in (('full document', blocks), ('reversed', blocks[::-1]),
+                              ('every other block', blocks[::2]), ('two blocks', blocks[:2])):
+            for reference, matrix in ((LinearMatcher, MatrixMatcher), (WideLinear, WideMatrix)):
+                with self.subTest(layout=label, matcher=matrix.__name__):
+                    expected = reference(use_index=False).find_all(layout, subsection_variants, section_variants)
+                    actual = matrix().find_all(layout, subsection_variants, section_variants)
+                    self.assertEqual(actual, expected)
+
+
+class BlockTokenTests(unittest.TestCase):
+    def test_window_tokens_match_normalised_joined_text(self):
+        texts = [
+            '1.1 Sposób pozyskiwania danych', '1.1', '1.2.Pozyskiwane dane', '2.',
+            'BOLD: Dokumentacja i jakość', '[BOLD]', '3. Przechowywanie i tworzenie',
+            'ZARZĄDZANIE DANYMI', '5.4 Sposób zapewnienia identyfikatora',
+        ]
+        blocks = [TextBlock(t) for t in texts]
+        for start in range(len(blocks)):
+            for size in (1, 2, 3):
+                if start + size > len(blocks):
+                    continue
+                joined = ' '.join(texts[start:start + size])
+                with self.subTest(window=joined):
+                    self.assertEqual(set(_window_tokens(blocks, start, size)),
+                                     set(_norm_for_match(joined).split()))
+
+
+class TermMatcherTests(unittest.TestCase):
+    TERMS = [
+        'Początek formularza', 'Zarządzanie danymi', 'RE-USE', r'^Strona \d+', r'^a|danych\s+osobowych',
+        r'(osobow|wrażliw)\w+', '(unbalanced', r'[]|]x', r'(?x) verbose \ term',
+    ]
+
+    @staticmethod
+    def _per_pattern(terms):
+        patterns = []
+        for term in terms:
+            try:
+                patterns.append(re.compile(term, re.IGNORECASE))
+            except re.error:
+                patterns.append(re.compile(re.escape(term), re.IGNORECASE))
+        return patterns
+
+    def test_combined_matcher_agrees_with_per_pattern_search(self):
+        page_texts = DocConverter({'pdf_workers': 1, 'pdf_backend': 'pypdf2'})._read_pdf_pages(FIXTURE_PDF)
+        lines = [strip_formatting(blk.text) for blk in DocConverter._pages_to_blocks(page_texts, set())]
+        lines += ['Strona 3 z 9', 'x Strona 3', 'a', 'ochrona danych  osobowych', 'POCZĄTEK FORMULARZA', '|x']
+        patterns = self._per_pattern(self.TERMS)
+        matcher = TermMatcher.from_terms(self.TERMS)
+        for line in lines:
+            with self.subTest(line=line):
+                self.assertEqual(matcher.search(line) is not None, any(p.search(line) for p in patterns))
+                self.assertEqual(_NOISE_MATCHER.search(line) is not None,
+                                 any(p.search(line) for p in _BUILTIN_NOISE))
+
+    def test_reports_matching_term(self):
+        matcher = TermMatcher.from_terms(self.TERMS)
+        self.assertEqual(matcher.search('Strona 12'), r'^Strona \d+')
+        self.assertEqual(matcher.search('methods to re-use data'), 'RE-USE')
+        self.assertEqual(matcher.search('dane wrażliwe'), r'(osobow|wrażliw)\w+')
+        self.assertEqual(matcher.search('see (unbalanced note'), '(unbalanced')
+        self.assertIsNone(matcher.search('nothing to skip here'))
+
+    def test_compiled_terms_are_cached_until_the_file_changes(self):
+        tmp = tempfile.mkdtemp(prefix='dmp_art_terms_')
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        mgr = SkipTermsManager(os.path.join(tmp, 'terms.json'))
+        self.assertIsNone(mgr.compile().search('anything'))
+        mgr.save(['alpha'])
+        first = mgr.compile()
+        self.assertIs(SkipTermsManager(mgr.path).compile(), first)
+        mgr.add('beta term')
+        second = mgr.compile()
+        self.assertIsNot(second, first)
+        self.assertEqual(second.search('a Beta Term here'), 'beta term')
+
+
+if __name__ == '__main__':
+    unittest.main()
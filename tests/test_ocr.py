@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""Focused tests for streaming OCR, OCR engines, the OCR page cache and DMP page ranges."""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from utils.extraction_cache import OCRPageCache
+from utils.extractor_v4 import DMPExtractor, DMPTrimmer, DocConverter, VariantsLoader
+from utils.ocr import OCREngine, StreamingOCR
+
+FIXTURE_PDF = os.path.join(os.path.dirname(__file__), 'fixtures', 'test_dmp_long.pdf')
+
+
+class _FakePage:
+    """Stand-in for a rasterised PIL page; tracks how many are alive."""
+
+    alive = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def __init__(self, number, dpi=200):
+        self.number = number
+        self.dpi = dpi
+        with _FakePage.lock:
+            _FakePage.alive += 1
+            _FakePage.peak = max(_FakePage.peak, _FakePage.alive)
+
+    def close(self):
+        with _FakePage.lock:
+            _FakePage.alive -= 1
+
+    def tobytes(self):
+        return str(self.number).encode()
+
+
+class StreamingOCRTests(unittest.TestCase):
+    def setUp(self):
+        _FakePage.alive = _FakePage.peak = 0
+        self.windows = []
+
+    def _rasterise(self, path, first, last):
+        self.windows.append((first, last))
+        return [_FakePage(n) for n in range(first, last + 1)]
+
+    def test_pages_are_recognised_in_order_with_bounded_memory(self):
+        progress = []
+        ocr = StreamingOCR(workers=3, window=4, rasterise=self._rasterise,
+                           recognise=lambda page: f'page {page.number}')
+        texts = ocr.run('scan.pdf', 50, progress_callback=lambda done, total: progress.append((done, total)))
+
+        self.assertEqual(texts, [f'page {n}' for n in range(1, 51)])
+        self.assertEqual(self.windows[0], (1, 4))
+        self.assertEqual(self.windows[-1], (49, 50))
+        self.assertEqual(progress[-1], (50, 50))
+        self.assertEqual(len(progress), 50)
+        self.assertLessEqual(_FakePage.peak, 3 + 4)
+        self.assertEqual(_FakePage.alive, 0)
+
+    def test_page_range_is_respected(self):
+        ocr = StreamingOCR(workers=1, window=2, rasterise=self._rasterise,
+                           recognise=lambda page: str(page.number))
+        self.assertEqual(ocr.run('scan.pdf', 10, first_page=4, last_page=8), ['4', '5', '6', '7', '8'])
+        self.assertEqual(self.windows, [(4, 5), (6, 7), (8, 8)])
+
+    def test_selected_pages_share_windows_when_consecutive(self):
+        ocr = StreamingOCR(workers=2, window=3, rasterise=self._rasterise,
+                           recognise=lambda page: str(page.number))
+        self.assertEqual(ocr.run('scan.pdf', 20, pages=[2, 5, 6, 7, 8, 12, 25]), ['2', '5', '6', '7', '8', '12'])
+        self.assertEqual(self.windows, [(2, 2), (5, 7), (8, 8), (12, 12)])
+
+
+class _FakeEngine(OCREngine):
+    name = 'fake'
+    available = True
+
+    def __init__(self):
+        self.langs = set()
+
+    def version(self):
+        return 'fake-2'
+
+    def recognise(self, image, lang):
+        self.langs.add(lang)
+        return f'page {image.number}'
+
+
+class OCREngineTests(unittest.TestCase):
+    def test_engine_recognises_pages_and_run_stats_are_recorded(self):
+        cache_dir = tempfile.mkdtemp(prefix='dmp_art_ocr_')
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        engine = _FakeEngine()
+
+        def make():
+            return StreamingOCR(workers=2, window=3, engine=engine, cache=OCRPageCache(cache_dir),
+                                rasterise=lambda path, first, last: [_FakePage(n) for n in range(first, last + 1)])
+
+        ocr = make()
+        self.assertEqual(ocr.run('scan.pdf', 7), [f'page {n}' for n in range(1, 8)])
+        self.assertEqual(engine.langs, {'pol+eng'})
+        self.assertEqual(ocr.stats['engine'], 'fake')
+        self.assertEqual((ocr.stats['pages'], ocr.stats['cache_hits']), (7, 0))
+        self.assertLessEqual(ocr.stats['latency_ms']['mean'], ocr.stats['latency_ms']['max'])
+        self.assertGreater(ocr.stats['pages_per_second'], 0)
+
+        again = make()
+        again.run('scan.pdf', 7)
+        self.assertEqual(again.stats['cache_hits'], 7)
+        self.assertIsNone(again.stats['latency_ms'])  # nothing was recognised
+
+    def test_engines_must_implement_version_and_recognise(self):
+        class _Incomplete(OCREngine):
+            name = 'incomplete'
+
+            def version(self):
+                return 'incomplete-1'
+
+        with self.assertRaises(TypeError):
+            _Incomplete()
+
+
+class OCRPageCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix='dmp_art_ocr_')
+        self.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _ocr(self, cache, dpi=200):
+        def recognise(page):
+            self.calls.append(page.number)
+            return f'text of page {page.number}'
+
+        return StreamingOCR(
+            workers=2, window=3, dpi=dpi, cache=cache, engine_version='fake-1',
+            rasterise=lambda path, first, last: [_FakePage(n) for n in range(first, last + 1)],
+            recognise=recognise,
+        )
+
+    def test_second_run_is_served_from_cache(self):
+        cache = OCRPageCache(self.cache_dir)
+        first = self._ocr(cache).run('scan.pdf', 6)
+        cache.flush_stats()
+        self.assertEqual(sorted(self.calls), [1, 2, 3, 4, 5, 6])
+
+        self.calls.clear()
+        cache = OCRPageCache(self.cache_dir)
+        self.assertEqual(self._ocr(cache).run('scan.pdf', 6), first)
+        self.assertEqual(self.calls, [])
+        self._ocr(cache, dpi=300).run('scan.pdf', 1)  # DPI is part of the key
+        self.assertEqual(self.calls, [1])
+        cache.flush_stats()
+
+        stats = OCRPageCache(self.cache_dir).stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (6, 7, 7))
+
+    def test_prune_evicts_least_recently_used(self):
+        cache = OCRPageCache(self.cache_dir, max_bytes=40)
+        for i, key in enumerate(('old', 'mid', 'new')):
+            cache.put(key, 'x' * 20)
+            os.utime(os.path.join(self.cache_dir, f'{key}.txt'), (1000 + i, 1000 + i))
+        self.assertEqual(cache.prune(), 1)
+        self.assertIsNone(cache.get('old'))
+        self.assertEqual(cache.get('new'), 'x' * 20)
+
+    def test_stats_reuse_the_directory_scan_within_usage_ttl(self):
+        cache = OCRPageCache(self.cache_dir, usage_ttl=60)
+        cache.put('a', 'x' * 10)
+        self.assertEqual(cache.stats()['entries'], 1)
+        cache.put('b', 'x' * 10)
+        with mock.patch('utils.extraction_cache.os.scandir') as scandir:
+            self.assertEqual(cache.stats()['entries'], 1)
+        scandir.assert_not_called()
+        cache.usage_ttl = 0
+        self.assertEqual(cache.stats()['entries'], 2)
+
+
+class _ScannedConverter(DocConverter):
+    """DocConverter whose "scan" renders the fixture PDF's text layer page by page."""
+
+    def __init__(self, page_texts, settings=None):
+        super().__init__({'pdf_backend': 'pypdf2', **(settings or {})})
+        self.page_texts = page_texts
+        self.recognised = []  # (page, dpi)
+
+    def _make_ocr(self, dpi):
+        def rasterise(path, first, last):
+            return [_FakePage(n, dpi) for n in range(first, last + 1)]
+
+        def recognise(page):
+            self.recognised.append((page.number, page.dpi))
+            return self.page_texts[page.number - 1]
+
+        return StreamingOCR(workers=2, window=4, dpi=dpi, rasterise=rasterise, recognise=recognise,
+                            cache=self.ocr_cache, engine_version='fake-1')
+
+
+class DMPPageRangeTests(unittest.TestCase):
+    def setUp(self):
+        self.page_texts = DocConverter({'pdf_workers': 1, 'pdf_backend': 'pypdf2'})._read_pdf_pages(FIXTURE_PDF)
+        subsection_variants, section_variants = VariantsLoader().load()
+        self.sec1 = section_variants['1']
+        self.sub11 = subsection_variants['1.1']
+
+    def _locator(self, pages):
+        return DMPTrimmer().locate_pages(pages, self.sec1, self.sub11)
+
+    def test_locate_pages_finds_dmp_range(self):
+        self.assertEqual(self._locator(self.page_texts), (40, 46))
+        self.assertEqual(self._locator(self.page_texts[:44]), (40, None))
+        self.assertIsNone(self._locator(self.page_texts[:30]))
+
+    def test_full_quality_ocr_only_on_dmp_pages(self):
+        converter = _ScannedConverter(self.page_texts, {'ocr_dpi': 300, 'ocr_locate_dpi': 100})
+        progress = []
+        texts = converter._ocr(FIXTURE_PDF, 60, lambda msg, pct: progress.append(msg), self._locator)
+
+        self.assertEqual(converter.ocr_range, (39, 46))
+        self.assertEqual(len(texts), 60)
+        self.assertEqual(texts[39:47], self.page_texts[39:47])
+        self.assertEqual(texts[0], '')
+
+        full = sorted(n for n, dpi in converter.recognised if dpi == 300)
+        fast = [n for n, dpi in converter.recognised if dpi == 100]
+        self.assertEqual(full, list(range(40, 48)))
+        self.assertLess(max(fast), 60)  # fast pass stopped after the end marker
+        self.assertTrue(any(m.startswith('OCR (locating DMP') for m in progress))
+        self.assertTrue(progress[-1].startswith('OCR (DMP pages 40–47)'))
+
+    def test_text_layer_reading_stops_after_dmp_end(self):
+        for settings in ({'pdf_workers': 1}, {'pdf_workers': 4, 'pdf_parallel_min_pages': 8}):
+            converter = DocConverter({'pdf_backend': 'pypdf2', **settings})
+            pages = converter._read_pdf_pages(FIXTURE_PDF, dmp_locator=self._locator)
+            self.assertEqual(pages, self.page_texts[:47])
+            self.assertEqual(converter.page_count, 60)
+
+        # No end marker after the start → every page is read
+        pages = DocConverter({'pdf_backend': 'pypdf2'})._read_pdf_pages(FIXTURE_PDF, dmp_locator=lambda pages: None)
+        self.assertEqual(len(pages), 60)
+
+    def test_early_exit_keeps_extraction_output(self):
+        caches = []
+        for early_exit in (0, 1):
+            extractor = DMPExtractor()
+            extractor._converter = DocConverter({'early_exit': early_exit, 'pdf_backend': 'pypdf2'})
+            output_dir = tempfile.mkdtemp(prefix='dmp_art_extract_')
+            self.addCleanup(shutil.rmtree, output_dir, True)
+            result = extractor.process_file(FIXTURE_PDF, output_dir)
+            self.assertEqual(result['pages'], 60)
+            with open(os.path.join(output_dir, 'cache', result['cache_file']), encoding='utf-8') as f:
+                cache = json.load(f)
+            caches.append({k: v for k, v in cache.items() if k != '_metadata'})
+        self.assertEqual(caches[0], caches[1])
+
+    def test_only_pages_without_text_layer_are_ocrd(self):
+        # Page 5 is a scan image outside the DMP, 41-45 are DMP pages, 10 is a blank divider
+        scanned = [5, 41, 42, 43, 44, 45]
+        blank = 10
+
+        class _HybridConverter(_ScannedConverter):
+            def _extract_pages(self, path, backend, stop=None):
+                pages = super()._extract_pages(path, backend, stop)
+                # Scanned pages: only the header line is in the text layer
+                return ['' if n == blank else text.split('\n')[0] if n in scanned else text
+                        for n, text in enumerate(pages)]
+
+            def _pages_with_images(self, path, numbers):
+                return {5} & set(numbers)
+
+        converter = _HybridConverter(self.page_texts, {'ocr_dpi': 300, 'ocr_window': 4})
+        with mock.patch('utils.extractor_v4.HAS_OCR', True):
+            pages = converter._read_pdf_pages(FIXTURE_PDF, dmp_locator=self._locator)
+        expected = self.page_texts[:47]
+        expected[blank] = ''
+        self.assertEqual(pages, expected)
+        self.assertEqual(sorted(n for n, _ in converter.recognised), [n + 1 for n in scanned])
+        self.assertEqual([n for n, b in enumerate(converter.page_backends) if b == 'ocr'], scanned)
+        self.assertEqual(converter.page_backends.count('pypdf2'), 47 - len(scanned))
+
+    def test_blank_page_in_text_pdf_is_not_ocrd(self):
+        import PyPDF2
+
+        writer = PyPDF2.PdfWriter()
+        for n, page in enumerate(PyPDF2.PdfReader(FIXTURE_PDF).pages):
+            writer.add_page(page)
+            if n == 9:
+                writer.add_blank_page()
+        tmp = tempfile.mkdtemp(prefix='dmp_art_blank_')
+        self.addCleanup(shutil.rmtree, tmp, True)
+        path = os.path.join(tmp, 'with_blank_page.pdf')
+        with open(path, 'wb') as f:
+            writer.write(f)
+
+        for locator in (None, self._locator):
+            converter = DocConverter({'pdf_backend': 'pypdf2'})
+            with mock.patch('utils.extractor_v4.HAS_OCR', True), \
+                    mock.patch.object(DocConverter, '_ocr_selected') as ocr_selected:
+                pages = converter._read_pdf_pages(path, dmp_locator=locator)
+            self.assertEqual(pages[10].strip(), '')
+            ocr_selected.assert_not_called()
+
+    def test_falls_back_to_single_pass_without_dmp_start(self):
+        converter = _ScannedConverter(self.page_texts[:30], {'ocr_dpi': 300})
+        texts = converter._ocr(FIXTURE_PDF, 30, None, self._locator)
+        self.assertIsNone(converter.ocr_range)
+        self.assertEqual(texts, self.page_texts[:30])
+
+
+if __name__ == '__main__':
+    unittest.main()
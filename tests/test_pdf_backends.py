@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Focused tests for PDF text-layer reading: backends, parallel reads and fallbacks."""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from utils.extractor_v4 import HAS_PDFPLUMBER, DocConverter, _extract_pdf_pages
+from utils.pdf_backends import (
+    PDF_BACKENDS, PdfBackend, available_pdf_backends, get_pdf_backend, pages_with_images, register_pdf_backend,
+)
+
+FIXTURE_PDF = os.path.join(os.path.dirname(__file__), 'fixtures', 'test_dmp_long.pdf')
+
+
+class ParallelPdfConversionTests(unittest.TestCase):
+    def test_parallel_read_matches_serial_read(self):
+        serial = DocConverter({'pdf_workers': 1, 'pdf_backend': 'pypdf2'})
+        parallel = DocConverter({'pdf_workers': 4, 'pdf_parallel_min_pages': 8, 'pdf_backend': 'pypdf2'})
+        self.assertGreater(len(parallel._page_ranges(60)), 1)
+
+        pages = parallel._read_pdf_pages(FIXTURE_PDF)
+        self.assertEqual(pages, serial._read_pdf_pages(FIXTURE_PDF))
+        self.assertEqual(len(pages), 60)
+
+        blocks = parallel.convert(FIXTURE_PDF)
+        self.assertEqual(parallel.page_count, 60)
+        header = [b for b in blocks if b.text.startswith('Wniosek OPUS-29')]
+        self.assertEqual(len(header), 60)
+        self.assertTrue(all(b.is_hf for b in header))
+
+
+class _GluedConverter(DocConverter):
+    """DocConverter whose PyPDF2 text lost the word spacing on some pages."""
+
+    def __init__(self, glued, settings=None):
+        super().__init__({'pdf_backend': 'pypdf2', **(settings or {})})
+        self.glued = glued
+
+    def _extract_pages(self, path, backend, stop=None):
+        pages = super()._extract_pages(path, backend, stop)
+        return [text.replace(' ', '') if n in self.glued else text for n, text in enumerate(pages)]
+
+
+@unittest.skipUnless(HAS_PDFPLUMBER, 'pdfplumber not installed')
+class PdfplumberFallbackTests(unittest.TestCase):
+    def test_only_malformed_pages_are_reread(self):
+        pypdf2_pages = DocConverter({'pdf_workers': 1, 'pdf_backend': 'pypdf2'})._read_pdf_pages(FIXTURE_PDF)
+        glued = [3] + list(range(36, 46))
+        reread = dict(zip(glued, _extract_pdf_pages(FIXTURE_PDF, glued, 'pdfplumber')))
+        for settings in ({'pdf_workers': 1}, {'pdf_workers': 2, 'pdf_parallel_min_pages': 8}):
+            with self.subTest(**settings):
+                converter = _GluedConverter(set(glued), settings)
+                pages = converter._read_pdf_pages(FIXTURE_PDF)
+                self.assertEqual(pages, [reread.get(n, text) for n, text in enumerate(pypdf2_pages)])
+                self.assertEqual(
+                    [n for n, backend in enumerate(converter.page_backends) if backend == 'pdfplumber'],
+                    glued)
+                self.assertEqual(converter.page_backends.count('pypdf2'), 60 - len(glued))
+
+
+class _FakeBackend(PdfBackend):
+    """Backend serving transformed pypdf2 text, preferred by 'auto' (for auto-selection tests)."""
+
+    available = True
+    priority = 0
+
+    def __init__(self, name, transform):
+        self.name = name
+        self.texts = [transform(t) for t in get_pdf_backend('pypdf2').iter_pages(FIXTURE_PDF)]
+
+    @contextmanager
+    def _open(self, path):
+        yield self.texts
+
+    def _count(self, doc):
+        return len(doc)
+
+    def _text(self, doc, number):
+        return doc[number]
+
+
+class PdfBackendTests(unittest.TestCase):
+    def test_available_backends_read_the_same_pages(self):
+        for name in available_pdf_backends():
+            with self.subTest(backend=name):
+                backend = get_pdf_backend(name)
+                self.assertEqual(backend.page_count(FIXTURE_PDF), 60)
+                pages = backend.pages(FIXTURE_PDF, [40, 41])
+                self.assertEqual(list(backend.iter_pages(FIXTURE_PDF, 40, 42)), pages)
+                self.assertIn('PLAN ZARZADZANIA DANYMI', pages[0])
+                self.assertNotIn('\r', pages[0])
+
+    def test_pages_with_images(self):
+        from PIL import Image
+
+        tmp = tempfile.mkdtemp(prefix='dmp_art_image_')
+        self.addCleanup(shutil.rmtree, tmp, True)
+        scan = os.path.join(tmp, 'scan.pdf')
+        Image.new('L', (200, 280), 255).save(scan)
+        self.assertEqual(pages_with_images(scan, [0]), [True])
+        self.assertEqual(pages_with_images(FIXTURE_PDF, [0, 40]), [False, False])
+
+    def test_auto_skips_malformed_and_truncated_backends(self):
+        for fake in (_FakeBackend('glued', lambda t: t.replace(' ', '')),
+                     _FakeBackend('truncated', lambda t: t[:len(t) // 2])):
+            register_pdf_backend(fake)
+            self.addCleanup(PDF_BACKENDS.pop, fake.name)
+        converter = DocConverter({'pdf_backend': 'auto'})
+        builtin = [name for name in available_pdf_backends() if name not in ('glued', 'truncated')]
+        expected = min(builtin, key=lambda n: (get_pdf_backend(n).auto_fallback, get_pdf_backend(n).priority))
+        for _ in range(3):  # same answer every time: no timing involved
+            self.assertEqual(converter._select_pdf_backend(FIXTURE_PDF), expected)
+
+        register_pdf_backend(_FakeBackend('preferred', lambda t: t))
+        self.addCleanup(PDF_BACKENDS.pop, 'preferred')
+        self.assertEqual(converter._read_pdf_pages(FIXTURE_PDF), PDF_BACKENDS['preferred'].texts)
+        self.assertEqual(set(converter.page_backends), {'preferred'})
+
+    def test_backends_must_implement_the_page_reader_methods(self):
+        class _Incomplete(PdfBackend):
+            name = 'incomplete'
+
+        with self.assertRaises(TypeError):
+            _Incomplete()
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(RuntimeError):
+            DocConverter({'pdf_backend': 'nope'})._read_pdf_pages(FIXTURE_PDF)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Focused tests for the in-process and shared progress buses."""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from utils.progress import ProgressBus, SharedProgressBus
+
+
+class ProgressBusTests(unittest.TestCase):
+    def test_subscriber_wakes_on_publish_and_stops_after_final_event(self):
+        bus = ProgressBus(heartbeat=5)
+        bus.open('s1', {'message': 'Starting', 'progress': 0, 'status': 'processing'})
+        received = []
+        started = threading.Event()
+
+        def publish():
+            started.wait(5)
+            for pct in (10, 10, 50):  # the repeated update is not an event
+                bus.update('s1', {'message': 'Working', 'progress': pct})
+            bus.update('s1', {'message': 'Done', 'status': 'complete', 'redirect': '/review/x'})
+
+        publisher = threading.Thread(target=publish)
+        publisher.start()
+        for event_id, data in bus.subscribe('s1'):
+            received.append((event_id, data))
+            started.set()
+        publisher.join()
+
+        self.assertEqual([d['progress'] for _, d in received], [0, 10, 50, 100])
+        self.assertEqual(received[-1][1]['redirect'], '/review/x')
+        self.assertEqual([eid for eid, _ in received], sorted(eid for eid, _ in received))
+        self.assertIsNone(bus.get('s1'))  # discarded once the final event was delivered
+        self.assertFalse(bus.update('s1', {'progress': 1}))
+
+    def test_last_event_id_resumes_after_the_missed_events(self):
+        bus = ProgressBus()
+        bus.open('s1', {'message': 'Starting', 'progress': 0, 'status': 'processing'})
+        bus.update('s1', {'progress': 20})
+        first = next(bus.subscribe('s1'))[0]
+        bus.update('s1', {'progress': 40})
+        bus.update('s1', {'status': 'error', 'message': 'Failed'})
+        self.assertFalse(bus.update('s1', {'progress': 60}, if_active=True))
+        resumed = list(bus.subscribe('s1', last_event_id=first + 1))
+        self.assertEqual([d['progress'] for _, d in resumed], [40, 40])
+        self.assertEqual(resumed[-1][1]['status'], 'error')
+
+    def test_heartbeats_and_timeouts(self):
+        bus = ProgressBus(heartbeat=0.01, idle_timeout=0.05)
+        bus.open('s1', {'message': 'Queued', 'status': 'processing'})
+        events = list(bus.subscribe('s1'))
+        self.assertEqual(events[0][1]['message'], 'Queued')
+        self.assertIn((None, None), events)
+        self.assertEqual(events[-1], (None, {'message': 'Processing timeout', 'progress': 0, 'status': 'error'}))
+        self.assertEqual(list(bus.subscribe('unknown'))[0][1]['status'], 'error')
+
+    def test_entries_expire_after_their_ttl(self):
+        bus = ProgressBus(ttl=100, finished_ttl=10)
+        self.addCleanup(bus.close)
+        bus.open('running', {'status': 'processing'})
+        bus.open('done', {'status': 'complete'})
+        now = time.monotonic()
+        self.assertEqual(bus.sweep(now + 50), 1)
+        self.assertIsNone(bus.get('done'))
+        self.assertEqual(bus.sweep(now + 90), 0)
+        self.assertEqual(bus.sweep(time.monotonic() + 101), 1)
+        stats = bus.stats()
+        self.assertEqual((stats['live'], stats['finished'], stats['expired'], stats['evicted']), (0, 0, 2, 0))
+
+    def test_oldest_entries_are_evicted_beyond_max_entries(self):
+        bus = ProgressBus(max_entries=3, heartbeat=5)
+        self.addCleanup(bus.close)
+        for n in range(3):
+            bus.open(f's{n}', {'status': 'processing', 'progress': n})
+        stream = bus.subscribe('s0')
+        next(stream)
+        bus.open('s0', {'status': 'processing'})  # reopening makes it the newest
+        bus.open('s3', {'status': 'processing'})
+        self.assertIsNone(bus.get('s1'))
+        self.assertIsNotNone(bus.get('s0'))
+        self.assertEqual(next(stream)[1]['message'], 'Progress session closed')  # replaced channel
+        self.assertEqual(bus.stats()['evicted'], 1)
+        self.assertEqual(len(bus), 3)
+
+
+class SharedProgressBusTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix='dmp_art_progress_')
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.path = os.path.join(self.tmp, 'progress.sqlite3')
+
+    def _bus(self, **kwargs):
+        bus = SharedProgressBus(self.path, poll_interval=0.01, **kwargs)
+        self.addCleanup(bus.close)
+        return bus
+
+    def test_stream_sees_updates_published_by_another_worker(self):
+        worker_a, worker_b = self._bus(), self._bus()
+        worker_a.open('s1', {'message': 'Starting', 'progress': 0, 'status': 'processing'})
+
+        def publish():
+            time.sleep(0.05)
+            worker_a.update('s1', {'progress': 50, 'job_state': 'running'})
+            worker_a.update('s1', {'message': 'Done', 'status': 'complete', 'redirect': '/review/x'})
+
+        publisher = threading.Thread(target=publish)
+        publisher.start()
+        received = list(worker_b.subscribe('s1'))
+        publisher.join()
+        self.assertEqual([d['progress'] for _, d in received], [0, 50, 100])
+        self.assertEqual(received[-1][1]['redirect'], '/review/x')
+        self.assertIsNone(worker_a.get('s1'))
+
+        worker_a.open('s2', {'message': 'Queued', 'status': 'processing', 'job_state': 'queued'})
+        first = next(worker_b.subscribe('s2'))[0]
+        worker_a.update('s2', {'status': 'error', 'message': 'Failed'})
+        self.assertFalse(worker_b.update('s2', {'progress': 10}, if_active=True))
+        self.assertEqual([d['status'] for _, d in worker_b.subscribe('s2', last_event_id=first)], ['error'])
+
+    def test_expiry_eviction_and_job_counts_are_shared(self):
+        worker_a, worker_b = self._bus(max_entries=2, ttl=100, finished_ttl=10), self._bus(max_entries=2)
+        worker_a.open('s1', {'status': 'processing', 'job_state': 'running'})
+        worker_b.open('s2', {'status': 'processing', 'job_state': 'queued'})
+        self.assertEqual((worker_b.stats()['jobs_running'], worker_b.stats()['jobs_queued']), (1, 1))
+        worker_b.open('s3', {'status': 'complete'})
+        self.assertIsNone(worker_a.get('s1'))
+        self.assertEqual(worker_a.sweep(time.time() + 50), 1)  # s3, finished
+        stats = worker_b.stats()
+        self.assertEqual((stats['live'], stats['finished'], stats['expired'], stats['evicted']), (1, 0, 1, 1))
+        self.assertEqual(len(worker_a), 1)
+
+    def test_async_stream_polls_updates_from_another_worker(self):
+        worker_a, worker_b = self._bus(), self._bus()
+        worker_a.open('s1', {'message': 'Starting', 'progress': 0, 'status': 'processing'})
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.05, worker_a.update, 's1', {'message': 'Done', 'status': 'complete'})
+            return [data async for _, data in worker_b.asubscribe('s1')]
+
+        self.assertEqual([d['progress'] for d in asyncio.run(main())], [0, 100])
+        self.assertIsNone(worker_a.get('s1'))
+
+    def test_async_stream_reads_the_database_off_the_event_loop(self):
+        worker_a, worker_b = self._bus(), self._bus()
+        worker_a.open('s1', {'message': 'Starting', 'progress': 0, 'status': 'processing'})
+        read = worker_b._read
+
+        def slow_read(*args):
+            time.sleep(0.2)  # a SQLite read stuck behind a busy writer
+            return read(*args)
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            # the other worker writes from its own thread, not from this loop
+            writer = threading.Timer(0.5, worker_a.update, ('s1', {'message': 'Done', 'status': 'complete'}))
+            writer.start()
+            gaps = []
+
+            async def tick():
+                last = loop.time()
+                try:
+                    while True:
+                        await asyncio.sleep(0.005)
+                        gaps.append(loop.time() - last)
+                        last = loop.time()
+                finally:
+                    gaps.append(loop.time() - last)
+
+            ticker = asyncio.ensure_future(tick())
+            received = [data async for _, data in worker_b.asubscribe('s1')]
+            ticker.cancel()
+            await asyncio.gather(ticker, return_exceptions=True)
+            writer.join()
+            return received, gaps
+
+        with mock.patch.object(worker_b, '_read', side_effect=slow_read):
+            received, gaps = asyncio.run(main())
+        self.assertEqual([d['progress'] for d in received], [0, 100])
+        self.assertLess(max(gaps), 0.1)  # the loop kept running while the stream polled
+
+
+if __name__ == '__main__':
+    unittest.main()
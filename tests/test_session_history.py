@@ -22,12 +22,14 @@ class SessionHistoryTests(unittest.TestCase):
             'ACTIVE_SESSIONS_FOLDER': self.app.config['ACTIVE_SESSIONS_FOLDER'],
             'SESSION_ARCHIVE_FOLDER': self.app.config['SESSION_ARCHIVE_FOLDER'],
             'ARCHIVES_FOLDER': self.app.config['ARCHIVES_FOLDER'],
+            'UPLOAD_FOLDER': self.app.config['UPLOAD_FOLDER'],
         }
 
         self.app.config['CACHE_FOLDER'] = os.path.join(self.temp_dir, 'cache')
         self.app.config['ACTIVE_SESSIONS_FOLDER'] = os.path.join(self.temp_dir, 'sessions', 'active')
         self.app.config['SESSION_ARCHIVE_FOLDER'] = os.path.join(self.temp_dir, 'sessions', 'archive')
         self.app.config['ARCHIVES_FOLDER'] = os.path.join(self.temp_dir, 'legacy_archives')
+        self.app.config['UPLOAD_FOLDER'] = os.path.join(self.temp_dir, 'uploads')
 
         os.makedirs(self.app.config['CACHE_FOLDER'], exist_ok=True)
         os.makedirs(self.app.config['ACTIVE_SESSIONS_FOLDER'], exist_ok=True)
@@ -121,6 +123,36 @@ class SessionHistoryTests(unittest.TestCase):
         self.assertTrue(active_metadata['preserved_after_archive'])
         self.assertEqual(active_metadata['last_archive_id'], payload['archive_id'])
 
+    def test_uploads_with_the_same_name_do_not_share_a_file(self):
+        first = dmp_app._upload_path('session-a', 'plan.pdf')
+        second = dmp_app._upload_path('session-b', 'plan.pdf')
+        self.assertNotEqual(first, second)
+        for path, content in ((first, b'first'), (second, b'second')):
+            with open(path, 'wb') as file_handle:
+                file_handle.write(content)
+
+        dmp_app._remove_upload(first)
+
+        self.assertFalse(os.path.exists(os.path.dirname(first)))
+        with open(second, 'rb') as file_handle:
+            self.assertEqual(file_handle.read(), b'second')
+        self.assertTrue(os.path.isdir(self.app.config['UPLOAD_FOLDER']))
+
+    def test_clear_cache_keeps_rule_statistics(self):
+        cache_folder = self.app.config['CACHE_FOLDER']
+        for name in ('content_index.json', 'rule_hits.json'):
+            with open(os.path.join(cache_folder, name), 'w', encoding='utf-8') as file_handle:
+                json.dump({}, file_handle)
+
+        payload = self.client.post('/api/settings/clear-cache').get_json()
+
+        self.assertEqual(payload['deleted'], 1)
+        self.assertTrue(payload['index_reset'])
+        self.assertFalse(payload['rule_stats_reset'])
+        self.assertFalse(os.path.exists(self.cache_path))
+        self.assertFalse(os.path.exists(os.path.join(cache_folder, 'content_index.json')))
+        self.assertTrue(os.path.exists(os.path.join(cache_folder, 'rule_hits.json')))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
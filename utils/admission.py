@@ -0,0 +1,249 @@
+"""
+utils/admission.py — machine-wide admission control for extraction
+
+Every upload extraction holds an 'extract' slot, and OCR of a scanned
+document also an 'ocr' slot.  However many server processes and extraction
+pools are running, at most limits['extract'] documents are then extracted,
+and limits['ocr'] of them OCR'd, at the same time:
+
+    admission = AdmissionController(state_dir, {'extract': 2, 'ocr': 1}, max_wait=600)
+    with admission.slot('extract', on_wait=lambda position: ...):
+        ...
+
+A slot is an exclusive flock on `<kind>.<n>.slot` in state_dir.  It is
+released when its holder leaves the block or the holder's process dies.
+The holder writes its pid into the slot file, so stats() can count busy
+slots without touching the locks.  Waiters queue in arrival order: each
+keeps its own `<kind>.<ticket>.wait` file locked, and only the first live
+waiter may take a free slot.  on_wait(position) is called whenever a
+waiter's 1-based position changes.
+
+The deadline covers admission only: slot(kind) with bounded=True (the
+default, used for the job's 'extract' slot) raises AdmissionTimeout when
+there is still no slot `max_wait` seconds after `since` (the upload time).
+Slots taken once the job runs (the 'ocr' slot, bounded=False) wait as long
+as it takes.  A limit of 0 means no limit for that kind, and max_wait 0
+means waiting without a deadline.
+
+Without fcntl (Windows) slots and waiters are shared only by the threads of
+one process.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+KIND_LABELS = {'extract': 'extraction', 'ocr': 'OCR'}
+
+# Lock files held by this process when there is no fcntl
+_held: Set[str] = set()
+_held_lock = threading.Lock()
+
+
+class AdmissionTimeout(Exception):
+    """No slot became free before the deadline."""
+
+    def __init__(self, kind: str, max_wait: float, ahead: int = 0) -> None:
+        super().__init__(
+            f'Server busy: no free {KIND_LABELS.get(kind, kind)} slot within {max_wait:.0f} s '
+            f'({ahead} documents ahead in the queue). Please try again later.'
+        )
+        self.kind = kind
+        self.ahead = ahead
+
+
+def _try_lock(path: str, create: bool = True):
+    """Open `path` with an exclusive lock, or None if another holder has it."""
+    f = open(path, 'a+b' if create else 'r+b')  # 'r+b': FileNotFoundError if it is gone
+    if fcntl is None:
+        with _held_lock:
+            if path in _held:
+                f.close()
+                return None
+            _held.add(path)
+        return f
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def _unlock(f) -> None:
+    if fcntl is None:
+        with _held_lock:
+            _held.discard(f.name)
+    f.close()  # also releases the flock
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _slot_busy(path: str) -> bool:
+    """A live process holds the slot file (read only; never locks or creates it)."""
+    if fcntl is None:
+        with _held_lock:
+            return path in _held
+    try:
+        with open(path, 'rb') as f:
+            pid = int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return False
+    return pid > 0 and _pid_alive(pid)
+
+
+class AdmissionController:
+    """Slots per kind of work, shared through lock files; see the module docstring."""
+
+    def __init__(
+        self,
+        state_dir: str,
+        limits: Dict[str, int],
+        max_wait: float = 600.0,
+        since: Optional[float] = None,
+        poll_interval: float = 0.25,
+    ) -> None:
+        """since: time.time() at which waiting started (default: now)."""
+        self.state_dir = state_dir
+        self.limits = {kind: max(0, int(n)) for kind, n in limits.items()}
+        self.max_wait = max(0.0, float(max_wait))
+        self.deadline = (time.time() if since is None else since) + self.max_wait if self.max_wait else None
+        self.poll_interval = poll_interval
+
+    @classmethod
+    def from_settings(cls, state_dir: str, settings, since: Optional[float] = None) -> 'AdmissionController':
+        """Limits from max_concurrent_extractions / max_concurrent_ocr / admission_max_wait_s."""
+        return cls(
+            state_dir,
+            {'extract': settings['max_concurrent_extractions'], 'ocr': settings['max_concurrent_ocr']},
+            max_wait=settings['admission_max_wait_s'],
+            since=since,
+        )
+
+    @contextmanager
+    def slot(self, kind: str, on_wait: Optional[Callable[[int], None]] = None, bounded: bool = True):
+        """
+        Hold one `kind` slot for the duration of the block.  bounded=False
+        ignores the admission deadline (for slots taken by an admitted job).
+        """
+        limit = self.limits.get(kind, 0)
+        if limit <= 0:
+            yield
+            return
+        os.makedirs(self.state_dir, exist_ok=True)
+        held = self._try_slot(kind, limit) if not self._waiters(kind) else None
+        if held is None:
+            held = self._wait(kind, limit, on_wait, self.deadline if bounded else None)
+        try:
+            yield
+        finally:
+            held.truncate(0)
+            _unlock(held)
+
+    def stats(self) -> dict:
+        """Per kind: limit, slots in use and waiting documents (takes no slot lock)."""
+        stats = {}
+        for kind, limit in self.limits.items():
+            busy = sum(_slot_busy(self._slot_path(kind, n)) for n in range(limit))
+            stats[kind] = {'limit': limit, 'running': busy, 'waiting': len(self._waiters(kind))}
+        stats['max_wait_s'] = self.max_wait
+        return stats
+
+    # ── internals ───────────────────────────────────────────────────────────
+
+    def _slot_path(self, kind: str, n: int) -> str:
+        return os.path.join(self.state_dir, f'{kind}.{n}.slot')
+
+    def _try_slot(self, kind: str, limit: int):
+        for n in range(limit):
+            f = _try_lock(self._slot_path(kind, n))
+            if f is not None:
+                f.truncate(0)
+                f.write(str(os.getpid()).encode('ascii'))
+                f.flush()
+                return f
+        return None
+
+    def _waiters(self, kind: str) -> List[str]:
+        """Names of live waiter files of `kind`, oldest first; stale ones are removed."""
+        try:
+            names = sorted(
+                name for name in os.listdir(self.state_dir)
+                if name.startswith(kind + '.') and name.endswith('.wait')
+            )
+        except FileNotFoundError:
+            return []
+        live = []
+        for name in names:
+            path = os.path.join(self.state_dir, name)
+            try:
+                f = _try_lock(path, create=False)
+            except OSError:
+                continue  # removed meanwhile
+            if f is None:
+                live.append(name)
+                continue
+            # Nobody holds it: its waiter died
+            _unlock(f)
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        return live
+
+    def _enqueue(self, kind: str):
+        """Create and lock this waiter's ticket file (time-ordered name)."""
+        ticket = f'{kind}.{time.time_ns():020d}.{os.getpid()}.{threading.get_ident()}'
+        path = os.path.join(self.state_dir, ticket + '.wait')
+        if fcntl is None:
+            return path, _try_lock(path)
+        # Locked under a temporary name first, so no other waiter can see it
+        # unlocked and remove it as stale
+        tmp = os.path.join(self.state_dir, ticket + '.new')
+        f = _try_lock(tmp)
+        os.replace(tmp, path)
+        return path, f
+
+    def _wait(self, kind: str, limit: int, on_wait: Optional[Callable[[int], None]], deadline: Optional[float]):
+        path, ticket = self._enqueue(kind)
+        name = os.path.basename(path)
+        position = 0
+        try:
+            while True:
+                ahead = sum(1 for other in self._waiters(kind) if other < name)
+                if ahead == 0:
+                    held = self._try_slot(kind, limit)
+                    if held is not None:
+                        return held
+                if ahead + 1 != position:
+                    position = ahead + 1
+                    if on_wait is not None:
+                        on_wait(position)
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise AdmissionTimeout(kind, self.max_wait, ahead)
+                    time.sleep(min(self.poll_interval, remaining))
+                else:
+                    time.sleep(self.poll_interval)
+        finally:
+            _unlock(ticket)
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
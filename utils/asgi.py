@@ -0,0 +1,267 @@
+"""
+utils/asgi.py — async serving of the Flask app
+
+AsyncApp is an ASGI application built around the WSGI app:
+
+    /progress/<session_id>   served on the event loop: the SSE stream waits on
+                             ProgressBus.asubscribe(), so an open stream costs
+                             a coroutine instead of a server thread
+    offload prefixes         (default /api/ai/) the Flask view runs in its own
+                             thread pool, so slow AI provider calls never take
+                             threads from page and upload requests
+    everything else          the Flask app, run through a WSGI bridge in a
+                             thread pool of `threads`
+
+Extraction itself already runs in ExtractionJobQueue's process pool; uploads
+only save and enqueue.  Responses are byte-for-byte those of the Flask app
+(same views, same SSE messages via utils.progress.sse_message), so the
+browser scripts need no change.
+
+The request body is read on the event loop into a temporary file (spilled to
+disk beyond 1 MB) before the WSGI app sees it; response bodies are pulled
+from the WSGI iterable one chunk at a time in the pool.  A body larger than
+the wrapped app's MAX_CONTENT_LENGTH is refused with 413 as soon as its
+Content-Length, or the bytes received so far, exceed it.  An ASGI server such
+as uvicorn runs it (asgi.py, server_mode 'async').
+"""
+
+import asyncio
+import json
+import re
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+from .progress import SSE_CONNECTED, ProgressBus, sse_message
+
+_RE_PROGRESS = re.compile(r'^/progress/([^/]+)$')
+
+_SPOOL_BYTES = 1024 * 1024
+
+
+class AsyncApp:
+    """ASGI entry point for a WSGI app; see the module docstring."""
+
+    def __init__(
+        self,
+        wsgi_app,
+        progress_bus: ProgressBus,
+        threads: int = 8,
+        offload: Iterable[str] = ('/api/ai/',),
+        offload_threads: int = 4,
+    ) -> None:
+        self.wsgi_app = wsgi_app
+        self.progress_bus = progress_bus
+        self.offload = tuple(offload)
+        self._pool = ThreadPoolExecutor(max(1, int(threads)), thread_name_prefix='asgi-wsgi')
+        self._offload_pool = ThreadPoolExecutor(max(1, int(offload_threads)), thread_name_prefix='asgi-offload')
+        self.open_streams = 0
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']!r}")
+        m = _RE_PROGRESS.match(scope['path'])
+        if m and scope['method'] in ('GET', 'HEAD'):
+            await self._progress(scope, receive, send, m.group(1))
+        elif scope['path'].startswith(self.offload):
+            await self._wsgi(scope, receive, send, self._offload_pool)
+        else:
+            await self._wsgi(scope, receive, send, self._pool)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+        self._offload_pool.shutdown(wait=False)
+
+    # ── /progress ───────────────────────────────────────────────────────────
+
+    async def _progress(self, scope, receive, send, session_id: str) -> None:
+        """The /progress/<session_id> SSE stream of app.progress_stream, on the loop."""
+        try:
+            last_event_id: Optional[int] = int(_header(scope, b'last-event-id') or '')
+        except ValueError:
+            last_event_id = None
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),  # Disable nginx buffering
+            ],
+        })
+        if scope['method'] == 'HEAD':
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        async def stream() -> None:
+            if last_event_id is None:
+                await _send_text(send, SSE_CONNECTED)
+            async for event_id, data in self.progress_bus.asubscribe(session_id, last_event_id):
+                await _send_text(send, sse_message(event_id, data))
+            await send({'type': 'http.response.body', 'body': b''})
+
+        # The stream ends on its own, or when the client goes away
+        self.open_streams += 1
+        streaming = asyncio.ensure_future(stream())
+        disconnect = asyncio.ensure_future(_wait_disconnect(receive))
+        try:
+            await asyncio.wait((streaming, disconnect), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.open_streams -= 1
+            for task in (streaming, disconnect):
+                task.cancel()
+            await asyncio.gather(streaming, disconnect, return_exceptions=True)
+        if streaming.done() and not streaming.cancelled() and streaming.exception() is not None:
+            raise streaming.exception()
+
+    # ── WSGI bridge ─────────────────────────────────────────────────────────
+
+    def _max_body(self) -> Optional[int]:
+        """MAX_CONTENT_LENGTH of the wrapped (Flask) app, read per request as settings may change it."""
+        return getattr(self.wsgi_app, 'config', {}).get('MAX_CONTENT_LENGTH')
+
+    async def _wsgi(self, scope, receive, send, pool: ThreadPoolExecutor) -> None:
+        loop = asyncio.get_running_loop()
+        max_body = self._max_body()
+        if max_body is not None:
+            try:
+                declared = int(_header(scope, b'content-length') or 0)
+            except ValueError:
+                declared = 0
+            if declared > max_body:
+                await _too_large(send, max_body)
+                return
+        body = tempfile.SpooledTemporaryFile(max_size=_SPOOL_BYTES)
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if max_body is not None and body.tell() > max_body:
+                    await _too_large(send, max_body)
+                    return
+                if not message.get('more_body', False):
+                    break
+            length = body.tell()
+            body.seek(0)
+            environ = _environ(scope, body, length)
+
+            status: List[Tuple[int, list]] = []
+
+            def start_response(status_line: str, headers: list, exc_info=None):
+                if exc_info is not None and sent:
+                    raise exc_info[1].with_traceback(exc_info[2])
+                status[:] = [(int(status_line.split(' ', 1)[0]), headers)]
+                return lambda data: None  # write() is not used by Flask
+
+            def first_chunk():
+                result = self.wsgi_app(environ, start_response)
+                chunks = iter(result)
+                return result, chunks, next(chunks, b'')
+
+            sent = False
+            result, chunks, chunk = await loop.run_in_executor(pool, first_chunk)
+            try:
+                code, headers = status[0]
+                await send({
+                    'type': 'http.response.start',
+                    'status': code,
+                    'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+                })
+                sent = True
+                while True:
+                    if chunk:
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                    chunk = await loop.run_in_executor(pool, next, chunks, None)
+                    if chunk is None:
+                        break
+                await send({'type': 'http.response.body', 'body': b''})
+            finally:
+                if hasattr(result, 'close'):
+                    await loop.run_in_executor(pool, result.close)
+        finally:
+            body.close()
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get('headers', ()):
+        if key.lower() == name:
+            return value.decode('latin-1')
+    return None
+
+
+async def _send_text(send, text: str) -> None:
+    await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
+
+
+async def _too_large(send, max_body: int) -> None:
+    """413 in the JSON form of app.py's error handler."""
+    body = json.dumps({
+        'success': False,
+        'message': f'File too large. Maximum size is {max_body // (1024 * 1024)}MB.',
+    }).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': 413,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode('ascii')),
+                    (b'connection', b'close')],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _wait_disconnect(receive) -> None:
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def _environ(scope, body, length: int) -> dict:
+    """PEP 3333 environ for an ASGI HTTP scope; `body` holds the whole request body."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # WSGI carries the path as latin-1 decoded bytes
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1] if server[1] is not None else 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for key, value in scope.get('headers', ()):
+        name = key.decode('latin-1').upper().replace('-', '_')
+        if name in ('CONTENT_LENGTH', 'TRANSFER_ENCODING'):
+            continue  # the body is already complete
+        if name != 'CONTENT_TYPE':
+            name = f'HTTP_{name}'
+        value = value.decode('latin-1')
+        if name in environ:
+            value = environ[name] + ('; ' if name == 'HTTP_COOKIE' else ',') + value
+        environ[name] = value
+    return environ
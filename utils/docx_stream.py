@@ -0,0 +1,172 @@
+"""
+utils/docx_stream.py — streaming DOCX body reader
+
+DocxStream reads word/document.xml straight from the zip with
+lxml.etree.iterparse instead of building a python-docx Document.  Each body
+paragraph or table is turned into records as soon as its end tag is parsed
+and is then cleared, so memory stays flat however long the proposal is.
+
+The records reproduce what DocConverter._traverse_body reads through
+python-docx:
+
+    paragraph  text of its w:r / w:hyperlink runs (tabs, breaks and
+               non-breaking hyphens mapped like Run.text); bold when every
+               non-blank direct run has w:b on; heading style when the
+               paragraph style's name (styles.xml, falling back to the default
+               paragraph style) starts with "heading"
+    table row  one record per w:tr (nested tables included), cells joined
+               with " | ", repeated cell texts (merged cells) kept once
+
+Header/footer texts come from the word/header*.xml and word/footer*.xml parts.
+"""
+
+import re
+import zipfile
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+from lxml import etree
+
+_W = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+
+def _w(tag: str) -> str:
+    return f'{{{_W}}}{tag}'
+
+
+W_BODY, W_P, W_TBL, W_TR, W_TC, W_T = (_w(t) for t in ('body', 'p', 'tbl', 'tr', 'tc', 't'))
+W_R, W_HYPERLINK, W_RPR, W_B = (_w(t) for t in ('r', 'hyperlink', 'rPr', 'b'))
+W_PPR, W_PSTYLE, W_STYLE, W_NAME = (_w(t) for t in ('pPr', 'pStyle', 'style', 'name'))
+W_VAL, W_TYPE, W_DEFAULT, W_STYLE_ID = (_w(a) for a in ('val', 'type', 'default', 'styleId'))
+
+# Run content → text, as in python-docx Run.text (w:br depends on its type)
+_RUN_TEXT = {_w('cr'): '\n', _w('noBreakHyphen'): '-', _w('ptab'): '\t', _w('tab'): '\t'}
+_W_BR = _w('br')
+_ON = ('1', 'true', 'on')
+
+_RE_HF_PART = re.compile(r'word/(header|footer)\d*\.xml$')
+
+
+def _run_text(run) -> str:
+    parts = []
+    for child in run:
+        if child.tag == W_T:
+            parts.append(child.text or '')
+        elif child.tag == _W_BR:
+            if child.get(W_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        else:
+            parts.append(_RUN_TEXT.get(child.tag, ''))
+    return ''.join(parts)
+
+
+def _is_bold(run) -> bool:
+    """w:rPr/w:b present and on (a bare <w:b/> is on)."""
+    rpr = run.find(W_RPR)
+    b = rpr.find(W_B) if rpr is not None else None
+    return b is not None and b.get(W_VAL, 'true') in _ON
+
+
+def paragraph_text(p) -> str:
+    """Paragraph.text: runs and hyperlink runs directly under w:p."""
+    parts = []
+    for child in p:
+        if child.tag == W_R:
+            parts.append(_run_text(child))
+        elif child.tag == W_HYPERLINK:
+            parts.extend(_run_text(r) for r in child.iterchildren(W_R))
+    return ''.join(parts)
+
+
+class DocxStream:
+    """Streams the body of one DOCX file; see the module docstring."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def header_footer_texts(self) -> Set[str]:
+        """Lower-cased, stripped paragraph texts of every header/footer part."""
+        texts: Set[str] = set()
+        with zipfile.ZipFile(self.path) as z:
+            for name in z.namelist():
+                if not _RE_HF_PART.match(name):
+                    continue
+                root = etree.fromstring(z.read(name), etree.XMLParser(resolve_entities=False))
+                for p in root.iterchildren(W_P):
+                    t = paragraph_text(p).strip()
+                    if t:
+                        texts.add(t.lower())
+        return texts
+
+    @staticmethod
+    def _paragraph_styles(z: zipfile.ZipFile) -> Tuple[Dict[str, str], str]:
+        """styleId → lower-cased name for paragraph styles, and the default style's name."""
+        try:
+            root = etree.fromstring(z.read('word/styles.xml'), etree.XMLParser(resolve_entities=False))
+        except KeyError:
+            return {}, 'normal'
+        names: Dict[str, str] = {}
+        default = ''
+        for style in root.iterchildren(W_STYLE):
+            if style.get(W_TYPE, 'paragraph') != 'paragraph':
+                continue
+            name_el = style.find(W_NAME)
+            name = (name_el.get(W_VAL, '') if name_el is not None else '').lower()
+            names[style.get(W_STYLE_ID, '')] = name
+            if style.get(W_DEFAULT, 'false') in _ON:
+                default = name  # the last default wins, as in python-docx
+        return names, default
+
+    def blocks(self) -> Iterator[Tuple[str, str, bool, bool]]:
+        """
+        Yield (source, text, bold, heading_style) in document order: source is
+        'paragraph' or 'table'; text is stripped and never empty.
+        """
+        with zipfile.ZipFile(self.path) as z:
+            styles, default_style = self._paragraph_styles(z)
+            with z.open('word/document.xml') as f:
+                for _, el in etree.iterparse(f, events=('end',), tag=(W_P, W_TBL),
+                                             resolve_entities=False):
+                    parent = el.getparent()
+                    if parent is None or parent.tag != W_BODY:
+                        continue  # nested in a table: read with the table
+                    if el.tag == W_P:
+                        record = self._paragraph(el, styles, default_style)
+                        if record is not None:
+                            yield record
+                    else:
+                        yield from self._table_rows(el)
+                    # Drop the processed element and everything before it
+                    el.clear()
+                    while el.getprevious() is not None:
+                        del parent[0]
+
+    @staticmethod
+    def _paragraph(p, styles: Dict[str, str], default_style: str) -> Optional[Tuple[str, str, bool, bool]]:
+        text = paragraph_text(p).strip()
+        if not text:
+            return None
+        runs = [r for r in p.iterchildren(W_R) if _run_text(r).strip()]
+        bold = bool(runs) and all(_is_bold(r) for r in runs)
+        ppr = p.find(W_PPR)
+        pstyle = ppr.find(W_PSTYLE) if ppr is not None else None
+        style = styles.get(pstyle.get(W_VAL)) if pstyle is not None else None
+        heading = (default_style if style is None else style).startswith('heading')
+        return 'paragraph', text, bold, heading
+
+    @staticmethod
+    def _table_rows(tbl) -> Iterator[Tuple[str, str, bool, bool]]:
+        for row in tbl.iter(W_TR):
+            seen: Set[str] = set()
+            parts = []
+            for cell in row.iterchildren(W_TC):
+                cell_words = []
+                for p in cell.iter(W_P):
+                    t = ''.join(t.text or '' for t in p.iter(W_T)).strip()
+                    if t:
+                        cell_words.append(t)
+                cell_text = ' '.join(cell_words)
+                if cell_text and cell_text not in seen:
+                    parts.append(cell_text)
+                    seen.add(cell_text)
+            if parts:
+                yield 'table', ' | '.join(parts), False, False
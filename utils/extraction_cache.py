@@ -0,0 +1,287 @@
+"""
+utils/extraction_cache.py — content-addressed extraction cache
+
+Byte-identical uploads are extracted only once.  Each finished extraction is
+recorded in a small JSON index next to the cache files:
+
+    "<sha256 of upload>:<extractor fingerprint>" → cache_id
+
+The extractor fingerprint (DMPExtractor.fingerprint(), built by
+ExtractionProfile.fingerprint() in extractor_v4) covers the extractor
+version, the PDF backend, the settings and config files that influence the
+output, so editing skip terms, name variants or OCR settings invalidates
+earlier entries automatically.
+
+A hit is cloned into a fresh cache_<id>.json so every upload still gets its
+own review session (feedback is stored per cache_id).
+
+OCRPageCache keeps recognised text per rendered scan page under
+outputs/cache/ocr, so re-processing a scanned PDF only OCRs pages that changed:
+
+    sha256(page pixels, OCR language, engine version, DPI) → <key>.txt
+
+Least-recently-used entries (by mtime) are evicted once the directory grows
+past max_bytes; hit/miss/eviction counters are kept in ocr/stats.json.
+stats() rescans the directory for its entry count and size at most every
+usage_ttl seconds, so polling /health does not stat every cached page.
+
+The index and counter files are updated read-modify-write by extraction
+worker processes and web server workers alike; file_lock() serialises those
+updates across processes (fcntl; threads of one process only on Windows).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import BinaryIO, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+INDEX_FILENAME = 'content_index.json'
+_CHUNK_SIZE = 1024 * 1024
+
+
+@contextmanager
+def file_lock(path: str, lock: threading.Lock):
+    """Hold `lock` and an exclusive lock on `path`.lock, shared with other processes."""
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(f'{path}.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def hash_file(path: str) -> str:
+    """Return the SHA-256 hex digest of a file on disk."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_stream_with_hash(stream: BinaryIO, dest_path: str) -> str:
+    """Copy an upload stream to dest_path, hashing it on the way through."""
+    digest = hashlib.sha256()
+    with open(dest_path, 'wb') as out:
+        for chunk in iter(lambda: stream.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionIndex:
+    """Maps (content hash, extractor fingerprint) to an existing cache_id."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, cache_dir: str) -> None:
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, INDEX_FILENAME)
+
+    @staticmethod
+    def _key(content_hash: str, fingerprint: str) -> str:
+        return f'{content_hash}:{fingerprint}'
+
+    def _cache_path(self, cache_id: str) -> str:
+        return os.path.join(self.cache_dir, f'cache_{cache_id}.json')
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _save(self, entries: dict) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, content_hash: str, fingerprint: str) -> Optional[str]:
+        """Return the cache_id of a previous extraction, or None.
+
+        Entries whose cache file was deleted (e.g. "Clear cache" in settings)
+        are treated as misses.
+        """
+        entry = self._load().get(self._key(content_hash, fingerprint))
+        if not entry:
+            return None
+        cache_id = entry.get('cache_id', '')
+        if not cache_id or not os.path.exists(self._cache_path(cache_id)):
+            return None
+        return cache_id
+
+    def record(self, content_hash: str, fingerprint: str, cache_id: str) -> None:
+        with file_lock(self.path, self._lock):
+            entries = self._load()
+            entries[self._key(content_hash, fingerprint)] = {'cache_id': cache_id}
+            self._save(entries)
+
+    def clear(self) -> None:
+        """Forget every entry (the cache files themselves are not touched)."""
+        with file_lock(self.path, self._lock):
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def clone(self, cache_id: str) -> str:
+        """Copy cache_<cache_id>.json to a new cache_id and return the new id."""
+        new_id = str(uuid.uuid4())
+        shutil.copyfile(self._cache_path(cache_id), self._cache_path(new_id))
+        return new_id
+
+
+class OCRPageCache:
+    """On-disk, size-bounded LRU cache of OCR text per rendered page."""
+
+    STATS_FILENAME = 'stats.json'
+    _COUNTERS = ('hits', 'misses', 'evictions')
+    _stats_lock = threading.Lock()
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024, usage_ttl: float = 30.0) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.usage_ttl = usage_ttl  # seconds stats() reuses its entries/size scan
+        self._lock = threading.Lock()
+        self._pending = dict.fromkeys(self._COUNTERS, 0)  # not yet in stats.json
+        self._usage: Optional[Tuple[float, int, int]] = None  # (scanned at, entries, bytes)
+
+    @staticmethod
+    def key(image, lang: str, engine_version: str, dpi: int) -> str:
+        """Key for a rendered page (PIL image: pixels, size and mode are hashed)."""
+        digest = hashlib.sha256(image.tobytes())
+        meta = f"{getattr(image, 'mode', '')}|{getattr(image, 'size', '')}|{lang}|{engine_version}|{dpi}"
+        digest.update(meta.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.txt')
+
+    def _count(self, counter: str, n: int = 1) -> None:
+        with self._lock:
+            self._pending[counter] += n
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+        except OSError:
+            self._count('misses')
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        self._count('hits')
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def prune(self) -> int:
+        """Evict least-recently-used entries until the cache fits max_bytes."""
+        try:
+            entries = [
+                (e.stat().st_mtime, e.stat().st_size, e.path)
+                for e in os.scandir(self.cache_dir)
+                if e.is_file() and e.name.endswith('.txt')
+            ]
+        except OSError:
+            return 0
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        if evicted:
+            self._count('evictions', evicted)
+        return evicted
+
+    def _stats_path(self) -> str:
+        return os.path.join(self.cache_dir, self.STATS_FILENAME)
+
+    def _load_counters(self) -> dict:
+        try:
+            with open(self._stats_path(), encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = {}
+        return {name: int(saved.get(name, 0)) for name in self._COUNTERS}
+
+    def flush_stats(self) -> None:
+        """Add this instance's counters to ocr/stats.json."""
+        with self._lock:
+            pending, self._pending = self._pending, dict.fromkeys(self._COUNTERS, 0)
+        if not any(pending.values()):
+            return
+        with file_lock(self._stats_path(), self._stats_lock):
+            counters = self._load_counters()
+            for name, n in pending.items():
+                counters[name] += n
+            counters['updated_at'] = time.time()
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f'{self._stats_path()}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(counters, f, indent=2)
+            os.replace(tmp_path, self._stats_path())
+
+    def _disk_usage(self) -> Tuple[int, int]:
+        """(entries, bytes) of the cache directory, rescanned at most every usage_ttl seconds."""
+        now = time.monotonic()
+        usage = self._usage
+        if usage is not None and now - usage[0] < self.usage_ttl:
+            return usage[1], usage[2]
+        entries = size = 0
+        if os.path.isdir(self.cache_dir):
+            for e in os.scandir(self.cache_dir):
+                if e.is_file() and e.name.endswith('.txt'):
+                    entries += 1
+                    size += e.stat().st_size
+        self._usage = (now, entries, size)
+        return entries, size
+
+    def stats(self) -> dict:
+        """Persisted counters plus current size (see usage_ttl), for /health."""
+        counters = self._load_counters()
+        entries, size = self._disk_usage()
+        lookups = counters['hits'] + counters['misses']
+        counters.update(
+            entries=entries,
+            size_mb=round(size / (1024 * 1024), 2),
+            max_mb=round(self.max_bytes / (1024 * 1024), 2),
+            hit_rate=round(counters['hits'] / lookups, 3) if lookups else None,
+        )
+        return counters
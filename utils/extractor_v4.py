@@ -15,38 +15,37 @@ import os
 import re
 import json
 import uuid
+import math
+import hashlib
 import zipfile
 import logging
-from collections import Counter
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Dict, List, Optional, Set, Tuple
+from functools import lru_cache, partial
+from types import MappingProxyType
+from typing import AbstractSet, Dict, FrozenSet, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
 
 from docx import Document
 import PyPDF2
 
-try:
-    import pdfplumber
-    HAS_PDFPLUMBER = True
-except ImportError:
-    HAS_PDFPLUMBER = False
-
-try:
-    from pdf2image import convert_from_path
-    import pytesseract
-    if os.name == 'nt':
-        for _p in [
-            r"C:\Program Files\Tesseract-OCR\tesseract.exe",
-            r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
-        ]:
-            if os.path.exists(_p):
-                pytesseract.pytesseract.tesseract_cmd = _p
-                break
-    HAS_OCR = True
-except ImportError:
-    HAS_OCR = False
+from .admission import AdmissionController, AdmissionTimeout
+from .docx_stream import DocxStream
+from .extraction_cache import ExtractionIndex, OCRPageCache, file_lock, hash_file
+from .ocr import HAS_OCR, OCR_DPI, StreamingOCR, get_ocr_engine
+from .pdf_backends import HAS_PDFPLUMBER, available_pdf_backends, get_pdf_backend, pages_with_images
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever a change alters extraction output — invalidates the
+# content-addressed cache (see utils/extraction_cache.py).
+EXTRACTOR_VERSION = '4.0'
+
 # ─────────────────────────────────────────────────────────────────────────────
 # DMP structure constants  (must match review.html expectations)
 # ─────────────────────────────────────────────────────────────────────────────
@@ -154,6 +153,151 @@ _BUILTIN_NOISE: List = [
     re.compile(r'^\s*OSF\b.*\b(?:Page\s+\d+|ID:\s*\d{4,})', re.IGNORECASE),
 ]
 
+def _trie_pattern(words: AbstractSet[str]) -> str:
+    """
+    Regex alternation of `words` factored into a prefix trie.  Only presence
+    matters, so a word that extends another one is dropped.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node: dict) -> str:
+        if '' in node:
+            return ''
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items())]
+        return alts[0] if len(alts) == 1 else '(?:' + '|'.join(alts) + ')'
+
+    return build(trie) if trie else r'(?!)'
+
+
+class TermMatcher:
+    """
+    Many search terms folded into one compiled regex.
+
+    Regex terms become named alternatives (?P<t0>…)|(?P<t1>…); plain-text
+    terms share one prefix-trie alternative, so the regex engine walks them
+    like an Aho-Corasick trie instead of trying each term in turn.  Terms
+    anchored with a leading '^' go into a second alternation that is only
+    tried at position 0 (match(), not search()).  Terms that cannot be
+    embedded (own groups, backreferences, flags other than IGNORECASE,
+    inline global flags) are searched separately.  Plain-text terms ignore
+    case; regex terms keep their own IGNORECASE flag.  search() returns the
+    label of the matching term (by default its source string) for debugging
+    attribution, or None.
+    """
+
+    _RE_SPECIAL = re.compile(r'[.^$*+?{}\[\]\\|()]')
+
+    def __init__(
+        self,
+        literals: Sequence[str] = (),
+        patterns: Sequence[Tuple[str, re.Pattern]] = (),
+    ) -> None:
+        self._literals: Dict[str, str] = {}
+        for term in literals:
+            self._literals.setdefault(term.lower(), term)
+        self._labels: Dict[str, str] = {}
+        self._separate: List[Tuple[str, re.Pattern]] = []
+        parts: List[str] = []
+        anchored: List[str] = []
+        for term, pattern in patterns:
+            flags = pattern.flags & ~re.UNICODE
+            if pattern.groups or flags not in (0, re.IGNORECASE):
+                self._separate.append((term, pattern))
+                continue
+            name = f't{len(self._labels)}'
+            part = f'(?P<{name}>(?{"i" if flags else ""}:{pattern.pattern}))'
+            try:
+                re.compile(part)
+            except re.error:
+                self._separate.append((term, pattern))
+                continue
+            self._labels[name] = term
+            (anchored if self._is_start_anchored(pattern.pattern) else parts).append(part)
+        if self._literals:
+            parts.append(f'(?P<lit>(?i:{_trie_pattern(set(self._literals))}))')
+        self._combined = re.compile('|'.join(parts)) if parts else None
+        self._anchored = re.compile('|'.join(anchored)) if anchored else None
+
+    @staticmethod
+    def _is_start_anchored(pattern: str) -> bool:
+        """Leading '^' and no top-level '|' — can only match at position 0."""
+        if not pattern.startswith('^'):
+            return False
+        depth, i, in_class = 0, 1, False
+        while i < len(pattern):
+            ch = pattern[i]
+            if ch == '\\':
+                i += 2
+                continue
+            if in_class:
+                in_class = ch != ']'
+            elif ch == '[':
+                in_class = True
+                if pattern[i + 1:i + 2] == '^':
+                    i += 1
+                if pattern[i + 1:i + 2] == ']':  # "[]…]" / "[^]…]" — literal ']'
+                    i += 1
+            elif ch == '(':
+                depth += 1
+            elif ch == ')':
+                depth -= 1
+            elif ch == '|' and depth == 0:
+                return False
+            i += 1
+        return True
+
+    @classmethod
+    def split_terms(cls, terms: List[str]) -> Tuple[List[str], List[Tuple[str, re.Pattern]]]:
+        """Skip terms → (plain-text terms, (term, case-insensitive regex) pairs)."""
+        literals: List[str] = []
+        patterns: List[Tuple[str, re.Pattern]] = []
+        for term in terms:
+            if not cls._RE_SPECIAL.search(term):
+                literals.append(term)
+                continue
+            try:
+                patterns.append((term, re.compile(term, re.IGNORECASE)))
+            except re.error:
+                literals.append(term)
+        return literals, patterns
+
+    @classmethod
+    def from_terms(cls, terms: List[str]) -> 'TermMatcher':
+        """Skip terms: regexes where they compile, plain text otherwise."""
+        return cls(*cls.split_terms(terms))
+
+    @classmethod
+    def from_patterns(cls, patterns: List[re.Pattern]) -> 'TermMatcher':
+        return cls(patterns=[(p.pattern, p) for p in patterns])
+
+    def search(self, text: str) -> Optional[str]:
+        if self._anchored is not None:
+            m = self._anchored.match(text)
+            if m:
+                return self._labels[m.lastgroup]
+        if self._combined is not None:
+            m = self._combined.search(text)
+            if m:
+                if m.lastgroup == 'lit':
+                    found = m.group('lit')
+                    return self._literals.get(found.lower(), found)
+                return self._labels[m.lastgroup]
+        for term, pattern in self._separate:
+            if pattern.search(text):
+                return term
+        return None
+
+    def __len__(self) -> int:
+        return len(self._literals) + len(self._labels) + len(self._separate)
+
+
+_NOISE_MATCHER = TermMatcher.from_patterns(_BUILTIN_NOISE)
+
 # End-of-DMP pattern — triggers when a block matches "oświadczenia administracyjne"
 # (Polish proposals) or "administrative declarations" (English proposals),
 # in any spelling/diacritics variant.
@@ -186,9 +330,14 @@ def strip_formatting(text: str) -> str:
     return _RE_WS.sub(' ', _RE_FMT.sub('', text)).strip()
 
 
+def _content_tokens(text: str) -> Set[str]:
+    """Tokens that count for matching: ≥4 chars and not in _STOP."""
+    return {w for w in text.split() if len(w) >= 4 and w not in _STOP}
+
+
 def token_overlap(query: str, candidate: str) -> float:
     """Fraction of query content tokens (≥4 chars, not in _STOP) found in candidate."""
-    q_tokens = {w for w in query.split() if len(w) >= 4 and w not in _STOP}
+    q_tokens = _content_tokens(query)
     if not q_tokens:
         return 0.0
     c_tokens = set(candidate.split())
@@ -200,12 +349,42 @@ def _norm_for_match(text: str) -> str:
     return normalize_diacritics(normalize(text))
 
 
-def _score_block(block_text: str, norm_names: List[str]) -> float:
-    """Return best token_overlap score between block_text and any of norm_names."""
-    if not norm_names:
-        return 0.0
-    c = _norm_for_match(block_text)
-    return max(token_overlap(n, c) for n in norm_names)
+@lru_cache(maxsize=512)
+def _name_token_sets(names: Tuple[str, ...]) -> Tuple[FrozenSet[str], ...]:
+    """
+    Content-token sets of normalised name variants — computed once per
+    process for each variant list (names are hashed as a tuple).
+    """
+    return tuple(frozenset(_content_tokens(_norm_for_match(n))) for n in names)
+
+
+def _score_tokens(tokens: AbstractSet[str], name_sets: Tuple[FrozenSet[str], ...]) -> float:
+    """Best token_overlap of any name variant against a candidate token set."""
+    best = 0.0
+    for q_tokens in name_sets:
+        if q_tokens:
+            best = max(best, len(q_tokens & tokens) / len(q_tokens))
+    return best
+
+
+def _window_tokens(blocks: List['TextBlock'], start: int, size: int) -> AbstractSet[str]:
+    """
+    Tokens of _norm_for_match(' '.join(texts of blocks[start:start+size])),
+    built from the blocks' cached token sets.  Numeration is only stripped at
+    the start of the joined text, so later blocks contribute tail_tokens.  If
+    the first block normalises to nothing the prefix strip could run into the
+    next block, so that case is normalised from the joined string.
+    """
+    first = blocks[start]
+    if size == 1:
+        return first.tokens
+    if not first.norm:
+        text = ' '.join(blocks[j].text for j in range(start, start + size))
+        return set(_norm_for_match(text).split())
+    tokens = set(first.tokens)
+    for j in range(start + 1, start + size):
+        tokens |= blocks[j].tail_tokens
+    return tokens
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -213,7 +392,10 @@ def _score_block(block_text: str, norm_names: List[str]) -> float:
 # ─────────────────────────────────────────────────────────────────────────────
 
 class TextBlock:
-    __slots__ = ('text', 'is_bold', 'is_heading', 'source', 'page', 'is_hf')
+    __slots__ = (
+        'text', 'is_bold', 'is_heading', 'source', 'page', 'is_hf',
+        '_norm', '_tokens', '_tail_tokens', '_is_noise',
+    )
 
     def __init__(
         self,
@@ -230,24 +412,183 @@ class TextBlock:
         self.source = source
         self.page = page
         self.is_hf = is_hf
+        # Matching forms of `text`, computed on first use (text is never mutated)
+        self._norm: Optional[str] = None
+        self._tokens: Optional[FrozenSet[str]] = None
+        self._tail_tokens: Optional[FrozenSet[str]] = None
+        self._is_noise: Optional[bool] = None
+
+    @property
+    def norm(self) -> str:
+        """_norm_for_match(text)."""
+        if self._norm is None:
+            self._norm = _norm_for_match(self.text)
+        return self._norm
+
+    @property
+    def tokens(self) -> FrozenSet[str]:
+        """Tokens of norm."""
+        if self._tokens is None:
+            self._tokens = frozenset(self.norm.split())
+        return self._tokens
+
+    @property
+    def tail_tokens(self) -> FrozenSet[str]:
+        """Tokens as normalised when the block is not first in a window (numeration kept)."""
+        if self._tail_tokens is None:
+            text = _RE_WS.sub(' ', _RE_FMT.sub(' ', self.text)).strip().lower()
+            self._tail_tokens = frozenset(normalize_diacritics(text).split())
+        return self._tail_tokens
+
+    @property
+    def is_noise(self) -> bool:
+        """text matches a built-in noise pattern (DMP / section titles, OSF headers)."""
+        if self._is_noise is None:
+            self._is_noise = _NOISE_MATCHER.search(self.text) is not None
+        return self._is_noise
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Document converter  (unchanged from v2)
+# Document converter
 # ─────────────────────────────────────────────────────────────────────────────
 
+class ConverterSettings:
+    """Conversion, OCR and admission options from config/settings.json (missing keys → defaults)."""
+
+    _DEFAULT_PATH = os.path.normpath(
+        os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            '..', 'config', 'settings.json',
+        )
+    )
+
+    DEFAULTS = {
+        'pdf_workers': 1,              # 1 = serial, 0 = one process per CPU core
+        'pdf_parallel_min_pages': 24,  # shorter PDFs are always read serially
+        'ocr_workers': 2,              # pages recognised concurrently, 0 = CPU cores
+        'ocr_window': 4,               # pages rasterised per pdf2image call
+        'ocr_dpi': OCR_DPI,
+        'ocr_engine': 'auto',          # tesserocr (persistent API handles) / pytesseract / auto
+        'ocr_two_pass': 1,             # locate the DMP at low DPI, then OCR only its pages
+        'ocr_locate_dpi': 100,
+        'ocr_locate_min_pages': 8,     # shorter scans are OCR'd in a single pass
+        'ocr_cache_max_mb': 256,       # OCR page cache size (0 = disabled)
+        'ocr_page_min_chars': 40,      # text-layer pages with less body text are OCR'd if they hold
+                                       # an image or lie in the DMP (0 = never)
+        'early_exit': 1,               # stop reading pages once the DMP end marker is seen
+        'docx_stream': 1,              # stream word/document.xml (0 = python-docx Document)
+        'pdf_backend': 'auto',         # utils/pdf_backends name, or 'auto' (chosen per document)
+        'pdf_auto_sample_pages': 3,    # pages each backend reads when pdf_backend is 'auto'
+        # Upload extractions on this machine (utils/admission.py; 0 = no limit)
+        'max_concurrent_extractions': 2,
+        'max_concurrent_ocr': 1,       # of those, documents being OCR'd at once
+        'admission_max_wait_s': 600,   # seconds after upload until a waiting job is rejected (0 = never)
+    }
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or self._DEFAULT_PATH
+
+    def load(self) -> dict:
+        settings = dict(self.DEFAULTS)
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return settings
+        for key, default in self.DEFAULTS.items():
+            try:
+                settings[key] = type(default)(saved.get(key, default))
+            except (TypeError, ValueError):
+                pass
+        return settings
+
+
+def _iter_pdf_pages(
+    path: str, backend: str = 'pypdf2', start: int = 0, end: Optional[int] = None
+) -> Iterator[str]:
+    """Lazily yield the text of pages [start, end); the file closes when the generator does."""
+    return get_pdf_backend(backend).iter_pages(path, start, end)
+
+
+def _extract_pdf_page_range(
+    path: str, start: int, end: Optional[int], backend: str = 'pypdf2'
+) -> List[str]:
+    """Text of pages [start, end) — module-level so process pools can pickle it."""
+    return list(_iter_pdf_pages(path, backend, start, end))
+
+
+def _extract_pdf_pages(path: str, numbers: List[int], backend: str = 'pypdf2') -> List[str]:
+    """Text of the given 0-based pages, in that order (one PDF parse)."""
+    return get_pdf_backend(backend).pages(path, numbers)
+
+
 class DocConverter:
     """Converts DOCX or PDF to a flat, ordered list of TextBlock objects."""
 
-    def convert(self, file_path: str) -> List[TextBlock]:
+    _RE_DOCX_PAGES = re.compile(rb'<Pages>(\d+)</Pages>')
+    _MIN_CHUNK_PAGES = 4
+    # Signs of a broken text layer: words glued together, camelCase joins
+    _RE_GLUED = re.compile(r'[a-z]{20,}')
+    _RE_CAMEL = re.compile(r'[a-z][A-Z]')
+
+    def __init__(self, settings: Optional[dict] = None, defaults: Optional[Mapping] = None) -> None:
+        """
+        settings: overrides for ConverterSettings (config/settings.json).
+        defaults: already loaded settings to start from (ExtractionProfile.settings)
+        instead of reading config/settings.json.
+        """
+        self.settings = dict(defaults) if defaults is not None else ConverterSettings().load()
+        self.settings.update(settings or {})
+        # PDF text-layer reads are split across this many processes (0 = all cores)
+        self.pdf_workers = max(1, int(self.settings['pdf_workers']) or os.cpu_count() or 1)
+        self.parallel_min_pages = max(1, int(self.settings['pdf_parallel_min_pages']))
+        # Pages in the last converted document (DOCX: as saved by Word, 0 if unknown)
+        self.page_count = 0
+        # 0-based inclusive page range that was OCR'd when two-pass OCR narrowed a scan
+        self.ocr_range: Optional[Tuple[int, int]] = None
+        # Text-layer backend used for the last PDF (pdf_backend, resolved if 'auto')
+        self.pdf_backend = ''
+        # Backend that produced each page read from the last PDF (a pdf_backends
+        # name or 'ocr'; '' for scan pages outside ocr_range)
+        self.page_backends: List[str] = []
+        # OCR runs (StreamingOCR) of the last document, for ocr_stats()
+        self._ocr_runs: List[StreamingOCR] = []
+        self.ocr_cache: Optional[OCRPageCache] = None
+        # OCR waits for an 'ocr' slot of this controller (DMPExtractor sets it per upload)
+        self.admission: Optional[AdmissionController] = None
+
+    def use_ocr_cache(self, cache_dir: Optional[str]) -> None:
+        """Look up / store OCR text per page under cache_dir (None disables)."""
+        max_mb = int(self.settings['ocr_cache_max_mb'])
+        self.ocr_cache = (
+            OCRPageCache(cache_dir, max_bytes=max_mb * 1024 * 1024)
+            if cache_dir and max_mb > 0 else None
+        )
+
+    def convert(
+        self, file_path: str, progress_callback=None, dmp_locator=None
+    ) -> List[TextBlock]:
+        """
+        progress_callback(msg, pct) receives per-page OCR progress (pct 10–19).
+        dmp_locator(pages_text) → (start_page, end_page | None) or None enables
+        two-pass OCR of scanned PDFs (see DMPTrimmer.locate_pages) and lets PDF
+        page reading stop at the page holding the DMP end marker (early_exit).
+        """
+        self.ocr_range = None
+        self.page_count = 0
+        self.page_backends = []
+        self._ocr_runs = []
         ext = os.path.splitext(file_path)[1].lower()
         if ext == '.docx':
             return self._from_docx(file_path)
         if ext == '.pdf':
-            return self._from_pdf(file_path)
+            return self._from_pdf(file_path, progress_callback, dmp_locator)
         raise ValueError(f"Unsupported format: {ext}")
 
     def _from_docx(self, path: str) -> List[TextBlock]:
+        self.page_count = self._docx_page_count(path)
+        if self.settings['docx_stream']:
+            return self._from_docx_stream(path)
         doc = Document(path)
         hf_set: Set[str] = set()
         for sec in doc.sections:
@@ -323,14 +664,51 @@ class DocConverter:
 
         return blocks
 
+    @staticmethod
+    def _from_docx_stream(path: str) -> List[TextBlock]:
+        """Same blocks as _traverse_body, read with DocxStream (no Document tree)."""
+        stream = DocxStream(path)
+        hf_set = stream.header_footer_texts()
+        blocks: List[TextBlock] = []
+        for source, text, bold, heading_style in stream.blocks():
+            if source == 'paragraph':
+                heading = heading_style or (bold and len(text) < 200)
+                source = 'heading' if heading_style else 'paragraph'
+            else:
+                heading = False
+            blocks.append(TextBlock(text, bold, heading, source, len(blocks), text.lower() in hf_set))
+        return blocks
+
+    @classmethod
+    def _docx_page_count(cls, path: str) -> int:
+        """Page count recorded by Word in docProps/app.xml (0 when absent)."""
+        try:
+            with zipfile.ZipFile(path) as z:
+                m = cls._RE_DOCX_PAGES.search(z.read('docProps/app.xml'))
+        except (KeyError, zipfile.BadZipFile, OSError):
+            return 0
+        return int(m.group(1)) if m else 0
+
     @staticmethod
     def _is_para_bold(para) -> bool:
         runs = [r for r in para.runs if r.text.strip()]
         return bool(runs) and all(r.bold for r in runs)
 
-    def _from_pdf(self, path: str) -> List[TextBlock]:
-        pages_text = self._read_pdf_pages(path)
-        hf_set = self._detect_pdf_hf(pages_text)
+    def _from_pdf(self, path: str, progress_callback=None, dmp_locator=None) -> List[TextBlock]:
+        pages_text = self._read_pdf_pages(path, progress_callback, dmp_locator)
+        if len(pages_text) < self.page_count:
+            logger.info('DocConverter: read %d of %d pages (stopped at end of DMP)',
+                        len(pages_text), self.page_count)
+        self.page_count = max(self.page_count, len(pages_text))
+        if self.ocr_range is not None:
+            first, last = self.ocr_range
+            hf_set = self._detect_pdf_hf(pages_text[first:last + 1])
+        else:
+            hf_set = self._detect_pdf_hf(pages_text)
+        return self._pages_to_blocks(pages_text, hf_set)
+
+    @staticmethod
+    def _pages_to_blocks(pages_text: List[str], hf_set: Set[str]) -> List[TextBlock]:
         blocks: List[TextBlock] = []
         for page_num, page_text in enumerate(pages_text):
             for line in page_text.split('\n'):
@@ -343,58 +721,260 @@ class DocConverter:
                 )
         return blocks
 
-    def _read_pdf_pages(self, path: str) -> List[str]:
-        pages: List[str] = []
+    def _read_pdf_pages(self, path: str, progress_callback=None, dmp_locator=None) -> List[str]:
+        """
+        Page texts in order.  With a dmp_locator (and early_exit on) reading
+        stops after the page on which the DMP end marker follows the DMP start;
+        without an end marker every page is read.
+        """
+        if dmp_locator is not None and self.settings['early_exit']:
+            stop = partial(self._dmp_end_reached, dmp_locator=dmp_locator)
+        else:
+            stop = None
         try:
-            with open(path, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-                for page in reader.pages:
-                    pages.append(page.extract_text() or '')
+            backend = self.pdf_backend = self._select_pdf_backend(path)
+            pages = self._extract_pages(path, backend, stop)
         except Exception as exc:
             raise RuntimeError(f"PDF read error: {exc}") from exc
 
         if sum(len(t) for t in pages) < 100:
             if HAS_OCR:
-                return self._ocr(path)
+                texts = self._ocr(path, len(pages), progress_callback, dmp_locator)
+                first, last = self.ocr_range or (0, len(texts) - 1)
+                self.page_backends = [
+                    'ocr' if first <= n <= last else '' for n in range(len(texts))
+                ]
+                return texts
             raise RuntimeError(
                 "PDF appears to be a scanned image but OCR (pytesseract + pdf2image) "
                 "is not installed."
             )
 
-        if self._is_text_malformed(pages):
-            if HAS_PDFPLUMBER:
-                logger.warning("PyPDF2 extracted malformed text. Trying pdfplumber...")
-                try:
-                    pages_pl = self._read_pdf_with_pdfplumber(path)
-                    if not self._is_text_malformed(pages_pl):
-                        logger.info("pdfplumber extracted text successfully")
-                        return pages_pl
-                    logger.warning("pdfplumber also gave malformed text")
-                except Exception as e:
-                    logger.warning(f"pdfplumber failed: {e}")
+        self.page_backends = [backend] * len(pages)
+        image_pages = self._pages_without_text(path, pages, dmp_locator)
+        if image_pages and HAS_OCR:
+            logger.info('%d of %d pages have no usable text layer; OCR of those pages',
+                        len(image_pages), len(pages))
+            texts = self._ocr_selected(path, image_pages, progress_callback)
+            for n, text in zip(image_pages, texts):
+                if len(text.strip()) > len(pages[n].strip()):
+                    pages[n] = text
+                    self.page_backends[n] = 'ocr'
+        elif image_pages:
+            logger.warning('%d pages have no usable text layer but OCR (pytesseract + pdf2image) '
+                           'is not installed', len(image_pages))
+
+        malformed = [n for n, text in enumerate(pages)
+                     if self.page_backends[n] == backend and self._is_text_malformed(text)]
+        if malformed and HAS_PDFPLUMBER and backend != 'pdfplumber':
+            logger.warning("%s extracted malformed text on %d of %d pages. Trying pdfplumber...",
+                           backend, len(malformed), len(pages))
+            try:
+                reread = self._read_selected_pages(path, malformed, 'pdfplumber')
+            except Exception as e:
+                logger.warning(f"pdfplumber failed: {e}")
+            else:
+                for n, text in zip(malformed, reread):
+                    if self._is_text_malformed(text):
+                        logger.warning("pdfplumber also gave malformed text on page %d", n + 1)
+                        continue
+                    pages[n] = text
+                    self.page_backends[n] = 'pdfplumber'
 
         return pages
 
-    @staticmethod
-    def _is_text_malformed(pages: List[str]) -> bool:
-        if not pages:
-            return False
-        sample = ' '.join(pages[:min(5, len(pages))])
-        if len(sample) < 100:
+    def _select_pdf_backend(self, path: str) -> str:
+        """
+        The pdf_backend setting, or with 'auto' the available backend with the
+        lowest priority whose text on a few sample pages is not malformed and
+        not much shorter than the longest sample text (pypdf2 if none
+        qualifies).  auto_fallback backends are only tried if no other one
+        qualifies.  The choice depends on the document alone, not on timing
+        (tests/benchmark_extraction.py pdfbackends compares the speeds).
+        """
+        name = self.settings['pdf_backend']
+        if name != 'auto':
+            return get_pdf_backend(name).name
+        names = available_pdf_backends()
+        if len(names) == 1:
+            return names[0]
+
+        total = get_pdf_backend(names[0]).page_count(path)
+        count = min(total, max(1, int(self.settings['pdf_auto_sample_pages'])))
+        # Spread over the document, skipping the cover page when possible
+        sample = sorted({min(total - 1, (k + 1) * total // (count + 1)) for k in range(count)})
+
+        trials: Dict[str, int] = {}  # backend → chars of clean samples
+        notes = []
+        order = sorted(names, key=lambda n: (get_pdf_backend(n).auto_fallback, get_pdf_backend(n).priority))
+        for candidate in order:
+            if trials and get_pdf_backend(candidate).auto_fallback:
+                break
+            try:
+                texts = get_pdf_backend(candidate).pages(path, sample)
+            except Exception as exc:
+                logger.warning('PDF backend %s failed on %s (%s)', candidate, path, exc)
+                notes.append(f'{candidate} failed')
+                continue
+            if any(self._is_text_malformed(text) for text in texts):
+                notes.append(f'{candidate} malformed')
+            else:
+                trials[candidate] = sum(len(text.strip()) for text in texts)
+                notes.append(f'{candidate} {trials[candidate]} chars')
+
+        longest = max(trials.values(), default=0)
+        acceptable = [candidate for candidate in order
+                      if candidate in trials and trials[candidate] >= 0.9 * longest]
+        chosen = acceptable[0] if acceptable else 'pypdf2'
+        logger.info('PDF backend (auto, pages %s): %s — %s',
+                    [n + 1 for n in sample], chosen, ', '.join(notes))
+        return chosen
+
+    def _pages_without_text(self, path: str, pages: List[str], dmp_locator=None) -> List[int]:
+        """
+        Scanned pages inside a text PDF: pages whose text layer, header/footer
+        lines aside, has fewer than ocr_page_min_chars characters and that
+        either draw an image or lie in the DMP page range (dmp_locator).
+        Blank separator, cover and divider pages are left alone.
+        """
+        min_chars = int(self.settings['ocr_page_min_chars'])
+        if min_chars <= 0:
+            return []
+        hf_set = self._detect_pdf_hf(pages)
+        sparse = []
+        for n, text in enumerate(pages):
+            lines = (line.strip() for line in text.split('\n'))
+            if sum(len(line) for line in lines if line.lower() not in hf_set) < min_chars:
+                sparse.append(n)
+        if not sparse:
+            return []
+        span = dmp_locator(pages) if dmp_locator is not None else None
+        if span is None:
+            in_dmp = range(0)
+        else:
+            in_dmp = range(span[0], (len(pages) - 1 if span[1] is None else span[1]) + 1)
+        images = self._pages_with_images(path, [n for n in sparse if n not in in_dmp])
+        return [n for n in sparse if n in in_dmp or n in images]
+
+    def _pages_with_images(self, path: str, numbers: List[int]) -> Set[int]:
+        """The given 0-based pages that draw an image (all of them if that cannot be told)."""
+        if not numbers:
+            return set()
+        try:
+            flags = pages_with_images(path, numbers)
+        except Exception as exc:
+            logger.warning('Cannot inspect page images of %s (%s)', path, exc)
+            return set(numbers)
+        return {n for n, has_image in zip(numbers, flags) if has_image}
+
+    def _ocr_selected(self, path: str, numbers: List[int], progress_callback=None) -> List[str]:
+        """OCR the given 0-based pages; texts in that order."""
+        def on_page(done: int, total: int) -> None:
+            if progress_callback:
+                progress_callback(f'OCR (pages without text): page {done} of {total}…',
+                                  10 + 9 * done // total)
+
+        try:
+            with self._ocr_slot(progress_callback):
+                return self._make_ocr(self.settings['ocr_dpi']).run(
+                    path, self.page_count, pages=[n + 1 for n in numbers], progress_callback=on_page
+                )
+        finally:
+            self._flush_ocr_cache()
+
+    @classmethod
+    def _is_text_malformed(cls, text: str) -> bool:
+        """One page's text looks glued together (PyPDF2 lost the word spacing)."""
+        if len(text) < 100:
             return False
-        long_sequences = re.findall(r'[a-z]{20,}', sample)
-        camel_case = re.findall(r'[a-z][A-Z]', sample)
-        camel_ratio = len(camel_case) / max(len(sample) / 100, 1)
+        long_sequences = cls._RE_GLUED.findall(text)
+        camel_ratio = len(cls._RE_CAMEL.findall(text)) / max(len(text) / 100, 1)
         return len(long_sequences) >= 3 or camel_ratio > 1.5
 
+    def _read_selected_pages(self, path: str, numbers: List[int], backend: str) -> List[str]:
+        """
+        Texts of the given 0-based pages, in that order.  At least
+        parallel_min_pages pages are split into chunks read in a process pool
+        (one PDF parse per chunk).
+        """
+        if self.pdf_workers <= 1 or len(numbers) < self.parallel_min_pages:
+            return _extract_pdf_pages(path, numbers, backend)
+        size = max(self._MIN_CHUNK_PAGES, math.ceil(len(numbers) / (self.pdf_workers * 2)))
+        chunks = [numbers[i:i + size] for i in range(0, len(numbers), size)]
+        try:
+            with ProcessPoolExecutor(max_workers=min(self.pdf_workers, len(chunks))) as pool:
+                texts: List[str] = []
+                for chunk_texts in pool.map(partial(_extract_pdf_pages, path, backend=backend), chunks):
+                    texts.extend(chunk_texts)
+                return texts
+        except (OSError, BrokenProcessPool) as exc:
+            logger.warning('Parallel PDF read unavailable (%s); reading serially', exc)
+            return _extract_pdf_pages(path, numbers, backend)
+
     @staticmethod
-    def _read_pdf_with_pdfplumber(path: str) -> List[str]:
+    def _dmp_end_reached(pages: List[str], dmp_locator, recent: Optional[int] = 1) -> bool:
+        """True once an end marker in the last `recent` pages (None = all) follows the DMP start."""
+        tail = pages if recent is None else pages[-recent:]
+        if not any(_RE_END_DMP.search(text) for text in tail):
+            return False
+        span = dmp_locator(pages)
+        return span is not None and span[1] is not None
+
+    def _extract_pages(self, path: str, backend: str, stop=None) -> List[str]:
+        """
+        Page texts in order; stop(pages_so_far) → True ends reading early.
+        Sets page_count to the document's total number of pages.
+        """
+        self.page_count = get_pdf_backend(backend).page_count(path)
         pages: List[str] = []
-        with pdfplumber.open(path) as pdf:
-            for page in pdf.pages:
-                pages.append(page.extract_text() or '')
+        pages_iter = self._iter_pages(path, backend, self.page_count)
+        try:
+            for text in pages_iter:
+                pages.append(text)
+                if stop is not None and stop(pages):
+                    break
+        finally:
+            pages_iter.close()
         return pages
 
+    def _iter_pages(self, path: str, backend: str, total: int) -> Iterator[str]:
+        """
+        Yield page texts in order.  Documents with at least parallel_min_pages
+        pages are split into contiguous page ranges read in a process pool
+        (one PDF parse per range); ranges not yet started are cancelled when
+        the consumer stops early.
+        """
+        ranges = self._page_ranges(total)
+        if len(ranges) <= 1:
+            yield from _iter_pdf_pages(path, backend)
+            return
+
+        done = 0
+        pool = None
+        try:
+            pool = ProcessPoolExecutor(max_workers=min(self.pdf_workers, len(ranges)))
+            futures = [
+                pool.submit(_extract_pdf_page_range, path, start, end, backend)
+                for start, end in ranges
+            ]
+            for future in futures:
+                for text in future.result():
+                    yield text
+                    done += 1
+        except (OSError, BrokenProcessPool) as exc:
+            logger.warning('Parallel PDF read unavailable (%s); reading serially', exc)
+            yield from _iter_pdf_pages(path, backend, start=done)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def _page_ranges(self, total: int) -> List[Tuple[int, int]]:
+        """Split [0, total) into about two ranges per worker."""
+        if self.pdf_workers <= 1 or total < self.parallel_min_pages:
+            return [(0, total)]
+        size = max(self._MIN_CHUNK_PAGES, math.ceil(total / (self.pdf_workers * 2)))
+        return [(start, min(start + size, total)) for start in range(0, total, size)]
+
     @staticmethod
     def _detect_pdf_hf(pages: List[str]) -> Set[str]:
         if len(pages) < 2:
@@ -410,18 +990,120 @@ class DocConverter:
         threshold = max(2, len(pages) // 2)
         return {line for line, cnt in counter.items() if cnt >= threshold}
 
-    @staticmethod
-    def _ocr(path: str) -> List[str]:
-        images = convert_from_path(path)
-        return [pytesseract.image_to_string(img, lang='pol+eng') for img in images]
+    def _ocr(
+        self, path: str, page_count: int, progress_callback=None, dmp_locator=None
+    ) -> List[str]:
+        """
+        OCR a scanned PDF.  With a dmp_locator, a fast low-DPI pass first finds
+        the DMP pages (stopping once the end marker is seen) and only that
+        range is OCR'd at full quality; other pages are returned as ''.
+        """
+        try:
+            with self._ocr_slot(progress_callback):
+                return self._ocr_pages(path, page_count, progress_callback, dmp_locator)
+        finally:
+            self._flush_ocr_cache()
+
+    def _ocr_slot(self, progress_callback=None):
+        """
+        Context holding an OCR admission slot (nothing without self.admission).
+        The job is already admitted, so the upload deadline does not apply.
+        """
+        if self.admission is None:
+            return nullcontext()
+
+        def on_wait(position: int) -> None:
+            if progress_callback:
+                progress_callback(f'Waiting for a free OCR slot (position {position})…', 10)
+        return self.admission.slot('ocr', on_wait=on_wait, bounded=False)
+
+    def _flush_ocr_cache(self) -> None:
+        if self.ocr_cache is not None:
+            self.ocr_cache.prune()
+            self.ocr_cache.flush_stats()
+
+    def _ocr_pages(
+        self, path: str, page_count: int, progress_callback=None, dmp_locator=None
+    ) -> List[str]:
+        def reporter(stage: str, low: int, high: int):
+            def on_page(done: int, total: int) -> None:
+                if progress_callback:
+                    progress_callback(f'{stage}: page {done} of {total}…',
+                                      low + (high - low) * done // total)
+            return on_page
+
+        settings = self.settings
+        if (dmp_locator is not None and settings['ocr_two_pass']
+                and page_count >= settings['ocr_locate_min_pages']):
+            span = self._locate_dmp_pages(
+                path, page_count, dmp_locator, reporter('OCR (locating DMP, fast pass)', 10, 14)
+            )
+            if span is not None:
+                first, last = span
+                logger.info('Two-pass OCR: DMP on pages %d–%d of %d', first + 1, last + 1, page_count)
+                texts = self._make_ocr(settings['ocr_dpi']).run(
+                    path, page_count, first_page=first + 1, last_page=last + 1,
+                    progress_callback=reporter(f'OCR (DMP pages {first + 1}–{last + 1})', 15, 19),
+                )
+                self.ocr_range = (first, last)
+                return [''] * first + texts + [''] * (page_count - last - 1)
+            logger.warning('Two-pass OCR: DMP start not found in fast pass — OCR of all pages')
+
+        stop_when = None
+        if dmp_locator is not None and settings['early_exit']:
+            stop_when = partial(self._dmp_end_reached, dmp_locator=dmp_locator, recent=None)
+        return self._make_ocr(settings['ocr_dpi']).run(
+            path, page_count, progress_callback=reporter('OCR', 10, 19), stop_when=stop_when
+        )
+
+    def _locate_dmp_pages(
+        self, path: str, page_count: int, dmp_locator, on_page
+    ) -> Optional[Tuple[int, int]]:
+        """0-based inclusive (first, last) page range of the DMP from a low-DPI pass."""
+        def end_seen(pages: List[str]) -> bool:
+            span = dmp_locator(pages)
+            return span is not None and span[1] is not None
+
+        rough = self._make_ocr(self.settings['ocr_locate_dpi']).run(
+            path, page_count, progress_callback=on_page, stop_when=end_seen
+        )
+        span = dmp_locator(rough)
+        if span is None:
+            return None
+        start, end = span
+        # One page of margin before the start: a heading garbled at low DPI
+        # may sit on the preceding page.
+        return max(0, start - 1), (page_count - 1 if end is None else end)
+
+    def _make_ocr(self, dpi: int) -> StreamingOCR:
+        ocr = StreamingOCR(
+            workers=self.settings['ocr_workers'],
+            window=self.settings['ocr_window'],
+            dpi=dpi,
+            cache=self.ocr_cache,
+            engine=get_ocr_engine(self.settings['ocr_engine']),
+        )
+        self._ocr_runs.append(ocr)
+        return ocr
+
+    def ocr_stats(self) -> List[dict]:
+        """Engine, pages, throughput and per-page latency of each OCR run of the last document."""
+        return [ocr.stats for ocr in self._ocr_runs if ocr.stats]
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Content cleaner  (unchanged from v2)
+# Content cleaner
 # ─────────────────────────────────────────────────────────────────────────────
 
 class ContentCleaner:
-    def clean(self, blocks: List[TextBlock], skip_patterns: list) -> List[str]:
+    def __init__(self) -> None:
+        # Lines dropped per skip term / rule label since the last reset
+        self.hits: Counter = Counter()
+
+    def clean(self, blocks: List[TextBlock], skip_patterns) -> List[str]:
+        """skip_patterns: TermMatcher (SkipTermsManager.compile) or a list of compiled regexes."""
+        if not isinstance(skip_patterns, TermMatcher):
+            skip_patterns = TermMatcher.from_patterns(list(skip_patterns))
         result = []
         for block in blocks:
             if block.is_hf:
@@ -429,23 +1111,37 @@ class ContentCleaner:
             text = strip_formatting(block.text)
             # Check noise BEFORE stripping numerations — patterns match "4. Legal requirements..."
             # as well as "Legal requirements..." (numeration-optional patterns).
-            if any(p.search(text) for p in _BUILTIN_NOISE):
+            term = _NOISE_MATCHER.search(text)
+            if term is not None:
+                logger.debug("ContentCleaner: dropped %r (noise %r)", text[:60], term)
                 continue
             text = _RE_SEC_NUM.sub('', text)
             text = _RE_MAIN_NUM.sub('', text)
             text = _RE_WS.sub(' ', text).strip()
             if not text:
                 continue
-            if any(p.search(text) for p in skip_patterns):
+            term = skip_patterns.search(text)
+            if term is not None:
+                self.hits[term] += 1
+                logger.debug("ContentCleaner: dropped %r (skip term %r)", text[:60], term)
                 continue
             result.append(text)
         return result
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Skip-terms manager  (unchanged from v2)
+# Skip-terms manager
 # ─────────────────────────────────────────────────────────────────────────────
 
+def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a config file, None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
 class SkipTermsManager:
     _DEFAULT_PATH = os.path.normpath(
         os.path.join(
@@ -480,18 +1176,146 @@ class SkipTermsManager:
         self.save(terms)
         return terms
 
-    def compile(self) -> list:
-        patterns = []
-        for term in self.load():
-            try:
-                patterns.append(re.compile(term, re.IGNORECASE))
-            except re.error:
-                patterns.append(re.compile(re.escape(term), re.IGNORECASE))
-        return patterns
+    # path → ((mtime_ns, size), TermMatcher); rebuilt when the file changes
+    _compiled: Dict[str, Tuple[Tuple[int, int], TermMatcher]] = {}
+
+    def stamp(self) -> Optional[Tuple[int, int]]:
+        return _file_stamp(self.path)
+
+    def compile(self) -> TermMatcher:
+        """All terms as one TermMatcher (cached per process until the file changes)."""
+        stamp = self.stamp()
+        if stamp is None:
+            return TermMatcher()
+        cached = self._compiled.get(self.path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        matcher = TermMatcher.from_terms(self.load())
+        self._compiled[self.path] = (stamp, matcher)
+        return matcher
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Validation helpers  (unchanged from v2)
+# Extraction rules  (config/extraction_rules.json)
+# ─────────────────────────────────────────────────────────────────────────────
+
+class ExtractionRules:
+    """
+    Skip-pattern rules from config/extraction_rules.json.
+
+    skip_patterns.general and user_custom_rules apply to every document,
+    skip_patterns.pdf_specific / docx_specific only to that file type.
+    Disabled categories and rules are ignored; patterns are case-sensitive
+    regexes labelled by rule id that must match a whole cleaned line
+    (compiled as ^(?:pattern)$), so a header rule such as "OSF," never drops
+    a DMP sentence that merely mentions OSF.  The parsed rules are cached per process and
+    reloaded when the file changes.  Lines removed per rule are summed across
+    extractions in <cache>/rule_hits.json (record_hits / load_hits).
+    """
+
+    _DEFAULT_PATH = os.path.normpath(
+        os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            '..', 'config', 'extraction_rules.json',
+        )
+    )
+    HITS_FILENAME = 'rule_hits.json'
+    _ALL_TYPES = 'general'
+
+    # path → ((mtime_ns, size), rules); rules are dicts with id/category/pattern/…
+    _loaded: Dict[str, Tuple[Tuple[int, int], List[dict]]] = {}
+    _hits_lock = threading.Lock()
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or self._DEFAULT_PATH
+
+    def stamp(self) -> Optional[Tuple[int, int]]:
+        return _file_stamp(self.path)
+
+    def rules(self) -> List[dict]:
+        """Every rule with its category and effective enabled flag."""
+        stamp = self.stamp()
+        if stamp is None:
+            return []
+        cached = self._loaded.get(self.path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as exc:
+            logger.warning('ExtractionRules: cannot read %s (%s)', self.path, exc)
+            return []
+
+        groups = [
+            (category, group.get('enabled', True), group.get('patterns', []))
+            for category, group in data.get('skip_patterns', {}).items()
+        ]
+        custom = data.get('user_custom_rules', {})
+        groups.append(('custom', custom.get('enabled', True), custom.get('rules', [])))
+
+        rules: List[dict] = []
+        for category, group_enabled, entries in groups:
+            for entry in entries:
+                if not entry.get('id') or not entry.get('pattern'):
+                    continue
+                rule = {
+                    'id': entry['id'],
+                    'category': category,
+                    'pattern': entry['pattern'],
+                    'description': entry.get('description', ''),
+                    'enabled': bool(group_enabled and entry.get('enabled', True)),
+                }
+                try:
+                    rule['regex'] = re.compile(f"^(?:{entry['pattern']})$")
+                except re.error as exc:
+                    logger.warning('ExtractionRules: rule %s disabled, bad pattern (%s)', entry['id'], exc)
+                    rule['enabled'] = False
+                rules.append(rule)
+        self._loaded[self.path] = (stamp, rules)
+        return rules
+
+    def patterns(self, doc_type: str) -> List[Tuple[str, re.Pattern]]:
+        """(rule id, line-anchored regex) of enabled rules for a 'pdf' or 'docx' document."""
+        wanted = {self._ALL_TYPES, 'custom', f'{doc_type}_specific'}
+        return [
+            (rule['id'], rule['regex']) for rule in self.rules()
+            if rule['enabled'] and rule['category'] in wanted
+        ]
+
+    @classmethod
+    def load_hits(cls, stats_dir: str) -> dict:
+        """{'hits': {rule_id: lines removed}, 'documents': n} from stats_dir."""
+        try:
+            with open(os.path.join(stats_dir, cls.HITS_FILENAME), encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = {}
+        return {
+            'hits': {k: int(v) for k, v in saved.get('hits', {}).items()},
+            'documents': int(saved.get('documents', 0)),
+            'updated_at': saved.get('updated_at'),
+        }
+
+    @classmethod
+    def record_hits(cls, stats_dir: str, hits: Dict[str, int]) -> None:
+        """Add one extraction's per-rule removals to stats_dir/rule_hits.json."""
+        path = os.path.join(stats_dir, cls.HITS_FILENAME)
+        with file_lock(path, cls._hits_lock):
+            stats = cls.load_hits(stats_dir)
+            for rule_id, n in hits.items():
+                stats['hits'][rule_id] = stats['hits'].get(rule_id, 0) + n
+            stats['documents'] += 1
+            stats['updated_at'] = time.time()
+            os.makedirs(stats_dir, exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(stats, f, indent=2)
+            os.replace(tmp_path, path)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Validation helpers
 # ─────────────────────────────────────────────────────────────────────────────
 
 def validate_docx_file(path: str) -> Tuple[bool, str]:
@@ -558,6 +1382,94 @@ class VariantsLoader:
         return subsection_variants, section_variants
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Fingerprint pre-filter  (shared by steps 2 and 3)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _fold(text: str) -> str:
+    """Lowercase + strip diacritics, without removing formatting or numeration."""
+    return normalize_diacritics(text.lower())
+
+
+# Normalised tokens never start right after a letter in the raw text (they
+# follow whitespace, numeration or a formatting marker), so keyword matches
+# are anchored there — fewer attempts inside words.
+_RE_WORD_START = r'(?<![^\W\d])'
+
+
+@lru_cache(maxsize=32)
+def _compile_fingerprints(words: FrozenSet[str]) -> re.Pattern:
+    return re.compile(_RE_WORD_START + _trie_pattern(words))
+
+
+class FingerprintFilter:
+    """
+    One-pass pre-filter over raw block text using config/dmp_anchors.json.
+
+    The fingerprint_pl / fingerprint_en keywords of every section, plus the
+    content tokens of the name variants being searched, are compiled into a
+    single trie regex that is searched in each block's folded text (_fold).
+    Every token of _norm_for_match(text) is a substring of that folded text,
+    so a block without a hit shares no token with any variant, scores 0 and
+    can never be an anchor — its text is not even normalised.  Blocks with an
+    "X.Y" numeration prefix are kept for LinearMatcher's strategy 0.
+    """
+
+    _DEFAULT_PATH = os.path.normpath(
+        os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            '..', 'config', 'dmp_anchors.json',
+        )
+    )
+
+    def __init__(self, path: Optional[str] = None, fingerprints: Optional[FrozenSet[str]] = None) -> None:
+        """fingerprints: keywords already read from path (ExtractionProfile.fingerprints)."""
+        self.path = path or self._DEFAULT_PATH
+        self._fingerprints = fingerprints
+
+    def fingerprints(self) -> FrozenSet[str]:
+        """Folded fingerprint keywords of all sections (empty if the file is missing)."""
+        if self._fingerprints is None:
+            words: Set[str] = set()
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    sections = json.load(f).get('sections', {})
+            except (OSError, ValueError) as exc:
+                logger.warning('FingerprintFilter: cannot read %s (%s)', self.path, exc)
+                sections = {}
+            for entry in sections.values():
+                for key in ('fingerprint_pl', 'fingerprint_en'):
+                    words.update(_fold(w).strip() for w in entry.get(key, []))
+            words.discard('')
+            self._fingerprints = frozenset(words)
+        return self._fingerprints
+
+    # Line-start "X.Y" numeration (superset of LinearMatcher._RE_NUMERATION per block)
+    _RE_NUMBERED_LINE = re.compile(r'^[^\S\n]*\d+\.\d+[.\s]', re.MULTILINE)
+
+    def candidates(self, blocks: List[TextBlock], names: List[str]) -> List[int]:
+        """Positions of blocks that may match any of `names`, in document order."""
+        words = set(self.fingerprints())
+        for q_tokens in _name_token_sets(tuple(names)):
+            words |= q_tokens
+        pattern = _compile_fingerprints(frozenset(words))
+
+        # One scan of the whole document; '\n' never occurs in a keyword, so
+        # no match spans two blocks.
+        text = '\n'.join(blk.text for blk in blocks)
+        offsets = [0]
+        for blk in blocks:
+            offsets.append(offsets[-1] + len(blk.text) + 1)
+        hits = {bisect_right(offsets, m.start()) - 1 for m in self._RE_NUMBERED_LINE.finditer(text)}
+        folded = _fold(text)
+        if len(folded) == len(text):
+            hits.update(bisect_right(offsets, m.start()) - 1 for m in pattern.finditer(folded))
+        else:
+            # lower() changed a length (e.g. 'İ'), offsets no longer line up
+            hits.update(i for i, blk in enumerate(blocks) if pattern.search(_fold(blk.text)))
+        return [i for i in sorted(hits) if not blocks[i].is_hf]
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # DMP Trimmer  (step 2 — independent of step 3)
 # ─────────────────────────────────────────────────────────────────────────────
@@ -574,11 +1486,38 @@ class DMPTrimmer:
            diacritics variant). Everything from that block onward is removed.
 
     Both detections are independent of each other and of LinearMatcher.
+    Start candidates are narrowed by a FingerprintFilter first.
     """
 
     HIGH = 0.55  # single-block score to accept immediately
     LOW = 0.45   # minimum score to accept with a 2-block window
 
+    def __init__(self, prefilter: Optional[FingerprintFilter] = None) -> None:
+        self.prefilter = prefilter or FingerprintFilter()
+
+    def locate_pages(
+        self,
+        pages_text: List[str],
+        sec1_names: List[str],
+        sub11_names: List[str],
+    ) -> Optional[Tuple[int, Optional[int]]]:
+        """
+        0-based (start_page, end_page) of the DMP in raw page texts, using the
+        same start/end detection as trim().  end_page is None when no end
+        marker follows the start; returns None when the start is not found.
+        """
+        hf_set = DocConverter._detect_pdf_hf(pages_text)
+        blocks = DocConverter._pages_to_blocks(pages_text, hf_set)
+        start_names = sec1_names + sub11_names
+        start_idx = self._find_start(
+            blocks, _name_token_sets(tuple(start_names)), self.prefilter.candidates(blocks, start_names)
+        )
+        if start_idx is None:
+            return None
+        end_idx = self._find_end(blocks[start_idx:])
+        end_page = None if end_idx is None else blocks[start_idx + end_idx].page
+        return blocks[start_idx].page, end_page
+
     def trim(
         self,
         blocks: List[TextBlock],
@@ -586,9 +1525,10 @@ class DMPTrimmer:
         sub11_names: List[str],
     ) -> List[TextBlock]:
         all_start_names = sec1_names + sub11_names
-        norm_start = [_norm_for_match(n) for n in all_start_names]
-
-        start_idx = self._find_start(blocks, norm_start)
+        start_idx = self._find_start(
+            blocks, _name_token_sets(tuple(all_start_names)),
+            self.prefilter.candidates(blocks, all_start_names),
+        )
         end_idx = self._find_end(blocks)
 
         if start_idx is None:
@@ -604,21 +1544,27 @@ class DMPTrimmer:
         return blocks[start_idx:]
 
     def _find_start(
-        self, blocks: List[TextBlock], norm_names: List[str]
+        self,
+        blocks: List[TextBlock],
+        name_sets: Tuple[FrozenSet[str], ...],
+        positions: Optional[List[int]] = None,
     ) -> Optional[int]:
-        """Return index of first block that looks like a DMP section-1 or 1.1 heading."""
-        for i, blk in enumerate(blocks):
+        """
+        Return index of first block that looks like a DMP section-1 or 1.1 heading.
+        positions: blocks to score (FingerprintFilter.candidates); None = all.
+        """
+        for i in (range(len(blocks)) if positions is None else positions):
+            blk = blocks[i]
             if blk.is_hf:
                 continue
             # Try single block first
-            single = _score_block(blk.text, norm_names)
+            single = _score_tokens(blk.tokens, name_sets)
             if single >= self.HIGH:
                 logger.debug("DMPTrimmer start: block %d score %.2f (single)", i, single)
                 return i
             # Try 2-block window for cases where heading wraps
             if single >= self.LOW and i + 1 < len(blocks):
-                window = blk.text + ' ' + blocks[i + 1].text
-                score2 = _score_block(window, norm_names)
+                score2 = _score_tokens(_window_tokens(blocks, i, 2), name_sets)
                 if score2 >= self.HIGH:
                     logger.debug("DMPTrimmer start: block %d score %.2f (2-block)", i, score2)
                     return i
@@ -639,6 +1585,48 @@ class DMPTrimmer:
 # Linear matcher  (step 3 — independent of step 2)
 # ─────────────────────────────────────────────────────────────────────────────
 
+class BlockIndex:
+    """
+    Inverted index over one document's blocks, built once per find_all().
+
+    postings: content token (see _content_tokens, after _norm_for_match) → block positions
+    numbered: "X.Y" numeration prefix (LinearMatcher._RE_NUMERATION) → block positions
+
+    A block sharing no content token with any name variant scores 0 and can
+    never be an anchor, so only blocks from the postings of the variants'
+    tokens (plus numeration hits) need to be scored.  `positions` limits the
+    index to FingerprintFilter candidates; other blocks are never normalised.
+    """
+
+    def __init__(self, blocks: List[TextBlock], positions: Optional[List[int]] = None) -> None:
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        self.numbered: Dict[str, List[int]] = defaultdict(list)
+        for i in (range(len(blocks)) if positions is None else positions):
+            blk = blocks[i]
+            for token in blk.tokens:
+                if len(token) >= 4 and token not in _STOP:
+                    self.postings[token].append(i)
+            m = LinearMatcher._RE_NUMERATION.match(blk.text)
+            if m:
+                self.numbered[f"{m.group(1)}.{m.group(2)}"].append(i)
+
+    def candidates(
+        self,
+        name_sets: Tuple[FrozenSet[str], ...],
+        search_from: int,
+        sid: Optional[str] = None,
+    ) -> List[int]:
+        """Sorted positions ≥ search_from that may match any name (see _name_token_sets)."""
+        positions: Set[int] = set()
+        for q_tokens in name_sets:
+            for token in q_tokens:
+                positions.update(self.postings.get(token, ()))
+        if sid is not None:
+            positions.update(self.numbered.get(sid, ()))
+        ordered = sorted(positions)
+        return ordered[bisect_left(ordered, search_from):]
+
+
 class LinearMatcher:
     """
     Finds subsection boundaries by matching name variants in document order.
@@ -657,6 +1645,11 @@ class LinearMatcher:
     LOW = 0.38
     MIN_FIRST = 0.38  # single-block pre-filter before trying windows
 
+    def __init__(self, use_index: bool = True, prefilter: Optional[FingerprintFilter] = None) -> None:
+        # use_index=False scans every block (reference behaviour, used by benchmarks)
+        self.use_index = use_index
+        self.prefilter = prefilter or FingerprintFilter()
+
     def find_all(
         self,
         blocks: List[TextBlock],
@@ -668,12 +1661,14 @@ class LinearMatcher:
             subsection_matches: {sid: (start_idx, win_size) or None}
             section_starts:     {sec_id: start_idx or None}  (section headers only)
         """
+        index = self._build_index(blocks, subsection_variants, section_variants)
+
         # Phase 1: find subsections in forward order
         subsection_matches: Dict[str, Optional[Tuple[int, int]]] = {}
         cursor = 0
         for sid in SECTION_ORDER:
             names = subsection_variants.get(sid, [])
-            result = self._find_anchor(blocks, names, cursor, sid=sid)
+            result = self._find_anchor(blocks, names, cursor, sid=sid, index=index)
             subsection_matches[sid] = result
             if result is not None:
                 cursor = result[0] + result[1]
@@ -684,13 +1679,26 @@ class LinearMatcher:
         # Phase 2: find section headers (independent full-document scan)
         section_starts: Dict[str, Optional[int]] = {}
         for sec_id, names in section_variants.items():
-            result = self._find_anchor(blocks, names, 0)
+            result = self._find_anchor(blocks, names, 0, index=index)
             section_starts[sec_id] = result[0] if result else None
             if result:
                 logger.debug("LinearMatcher: section %s header → block %d", sec_id, result[0])
 
         return subsection_matches, section_starts
 
+    def _build_index(
+        self,
+        blocks: List[TextBlock],
+        subsection_variants: Dict[str, List[str]],
+        section_variants: Dict[str, List[str]],
+    ) -> Optional[BlockIndex]:
+        """Per-document lookup structure handed to _find_anchor (None = full scan)."""
+        if not self.use_index:
+            return None
+        names = [n for variants in (*subsection_variants.values(), *section_variants.values())
+                 for n in variants]
+        return BlockIndex(blocks, self.prefilter.candidates(blocks, names))
+
     # Compiled pattern for numeration-based detection (e.g. "2.1.", "3.2 ", "5.4.")
     _RE_NUMERATION = re.compile(r'^\s*(\d+)\.(\d+)[.\s]')
 
@@ -700,6 +1708,7 @@ class LinearMatcher:
         names: List[str],
         search_from: int,
         sid: Optional[str] = None,
+        index: Optional[BlockIndex] = None,
     ) -> Optional[Tuple[int, int]]:
         """
         Find the first occurrence of any name variant at or after search_from.
@@ -712,20 +1721,28 @@ class LinearMatcher:
         Strategy 1: token overlap — single-block pre-filter (>= MIN_FIRST),
           then window of 1-3 blocks. Returns first HIGH hit; records first LOW
           as fallback.
+
+        With an index only candidate blocks (BlockIndex.candidates) are visited;
+        every skipped block would have failed the MIN_FIRST pre-filter.
         """
         if not names:
             return None
 
-        norm_names = [_norm_for_match(n) for n in names]
+        name_sets = _name_token_sets(tuple(names))
         first_low: Optional[Tuple[int, int]] = None
 
-        for i in range(search_from, len(blocks)):
+        if index is not None:
+            positions = index.candidates(name_sets, search_from, sid)
+        else:
+            positions = range(search_from, len(blocks))
+
+        for i in positions:
             blk = blocks[i]
             if blk.is_hf:
                 continue
 
             # Skip main section title blocks — they should not match as subsection anchors
-            if any(p.search(blk.text) for p in _BUILTIN_NOISE):
+            if blk.is_noise:
                 continue
 
             # Strategy 0: numeration prefix matching (e.g. "2.1. Metadata...")
@@ -735,7 +1752,7 @@ class LinearMatcher:
                     logger.debug("LinearMatcher: %s numeration match at block %d", sid, i)
                     return i, 1
 
-            single = _score_block(blk.text, norm_names)
+            single = _score_tokens(blk.tokens, name_sets)
             if single < self.MIN_FIRST:
                 continue
 
@@ -755,8 +1772,7 @@ class LinearMatcher:
             for win in (2, 3):
                 if i + win > len(blocks):
                     break
-                window_text = ' '.join(blocks[j].text for j in range(i, i + win))
-                s = _score_block(window_text, norm_names)
+                s = _score_tokens(_window_tokens(blocks, i, win), name_sets)
                 if s > best_score:
                     best_score, best_win = s, win
 
@@ -768,6 +1784,169 @@ class LinearMatcher:
         return first_low
 
 
+def available_extractors() -> List[str]:
+    """extractor_name values DMPExtractor accepts in this installation."""
+    from .matrix_matcher import HAS_MATRIX_MATCHER
+    return ['v4', 'v4-matrix'] if HAS_MATRIX_MATCHER else ['v4']
+
+
+def make_matcher(
+    extractor_name: str = 'v4', prefilter: Optional[FingerprintFilter] = None
+) -> LinearMatcher:
+    """
+    Anchor matcher for an extractor_name: 'v4' → LinearMatcher (indexed),
+    'v4-matrix' → MatrixMatcher (NumPy/SciPy score matrix, same anchors).
+    """
+    if extractor_name == 'v4':
+        return LinearMatcher(prefilter=prefilter)
+    if extractor_name == 'v4-matrix':
+        from .matrix_matcher import HAS_MATRIX_MATCHER, MatrixMatcher
+        if HAS_MATRIX_MATCHER:
+            return MatrixMatcher(prefilter=prefilter)
+        logger.warning("extractor 'v4-matrix' needs numpy and scipy — using 'v4'")
+        return LinearMatcher(prefilter=prefilter)
+    raise ValueError(f"Unknown extractor: {extractor_name}")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Extraction profile  (compiled config snapshot)
+# ─────────────────────────────────────────────────────────────────────────────
+
+class ExtractionProfile:
+    """
+    Immutable snapshot of every config file that shapes an extraction, in
+    the form the pipeline uses it:
+
+        subsection_variants / section_variants   dmp_variants.json, names as tuples
+                                                 (their _name_token_sets computed)
+        skip_matchers[doc_type]                  skip terms + enabled rules, one
+                                                 TermMatcher per 'docx' / 'pdf'
+        rule_ids                                 extraction_rules.json rule ids
+        fingerprints                             dmp_anchors.json keywords
+        settings                                 config/settings.json
+
+    current() returns the process-wide profile and builds a new one only when
+    a file's (mtime_ns, size) changes.  The new profile replaces the old one
+    in one assignment; an extraction keeps the profile it started with.
+    """
+
+    DOC_TYPES = ('docx', 'pdf')
+    # Settings that change which pages are read or OCR'd, hashed into fingerprint()
+    FINGERPRINT_SETTINGS = (
+        'ocr_two_pass', 'ocr_dpi', 'ocr_locate_dpi', 'ocr_locate_min_pages', 'ocr_page_min_chars', 'early_exit',
+    )
+
+    # paths → profile; replaced (never mutated) when a file changes
+    _current: Dict[Tuple[str, ...], 'ExtractionProfile'] = {}
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        variants_path: Optional[str] = None,
+        skip_terms_path: Optional[str] = None,
+        rules_path: Optional[str] = None,
+        anchors_path: Optional[str] = None,
+        settings_path: Optional[str] = None,
+    ) -> None:
+        self.paths = self._paths(variants_path, skip_terms_path, rules_path, anchors_path, settings_path)
+        variants, skip_terms, rules, anchors, settings = self.paths
+        # Stamped before reading: a file saved mid-build leaves a stale stamp,
+        # so the next current() builds again
+        self.stamps = tuple(_file_stamp(path) for path in self.paths)
+
+        subsection_variants, section_variants = VariantsLoader(variants).load()
+        self.subsection_variants: Mapping[str, Tuple[str, ...]] = MappingProxyType(
+            {sid: tuple(names) for sid, names in subsection_variants.items()}
+        )
+        self.section_variants: Mapping[str, Tuple[str, ...]] = MappingProxyType(
+            {sid: tuple(names) for sid, names in section_variants.items()}
+        )
+        # DMP start names (DMPTrimmer); token sets of every variant list cached
+        self.start_names = self.section_variants.get('1', ()) + self.subsection_variants.get('1.1', ())
+        for names in (*self.subsection_variants.values(), *self.section_variants.values(), self.start_names):
+            _name_token_sets(names)
+
+        extraction_rules = ExtractionRules(rules)
+        self.rule_ids = frozenset(rule['id'] for rule in extraction_rules.rules())
+        literals, patterns = TermMatcher.split_terms(SkipTermsManager(skip_terms).load())
+        self.skip_matchers: Mapping[str, TermMatcher] = MappingProxyType({
+            doc_type: TermMatcher(literals, patterns + extraction_rules.patterns(doc_type))
+            for doc_type in self.DOC_TYPES
+        })
+
+        self.fingerprints = FingerprintFilter(anchors).fingerprints()
+        self.settings: Mapping = MappingProxyType(ConverterSettings(settings).load())
+
+        # Bytes hashed into DMPExtractor.fingerprint()
+        parts = []
+        for path in (variants, skip_terms, rules):
+            parts.append(b'\0')
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    parts.append(f.read())
+        self._config_bytes = b''.join(parts)
+
+    @staticmethod
+    def _paths(
+        variants_path: Optional[str] = None,
+        skip_terms_path: Optional[str] = None,
+        rules_path: Optional[str] = None,
+        anchors_path: Optional[str] = None,
+        settings_path: Optional[str] = None,
+    ) -> Tuple[str, ...]:
+        return (
+            variants_path or VariantsLoader._DEFAULT_PATH,
+            skip_terms_path or SkipTermsManager._DEFAULT_PATH,
+            rules_path or ExtractionRules._DEFAULT_PATH,
+            anchors_path or FingerprintFilter._DEFAULT_PATH,
+            settings_path or ConverterSettings._DEFAULT_PATH,
+        )
+
+    @classmethod
+    def current(
+        cls,
+        variants_path: Optional[str] = None,
+        skip_terms_path: Optional[str] = None,
+        rules_path: Optional[str] = None,
+        anchors_path: Optional[str] = None,
+        settings_path: Optional[str] = None,
+    ) -> 'ExtractionProfile':
+        """Up-to-date profile of the given config files (default: config/)."""
+        key = cls._paths(variants_path, skip_terms_path, rules_path, anchors_path, settings_path)
+        stamps = tuple(_file_stamp(path) for path in key)
+        profile = cls._current.get(key)
+        if profile is not None and profile.stamps == stamps:
+            return profile
+        with cls._lock:
+            # Another thread may have rebuilt it while we waited
+            profile = cls._current.get(key)
+            if profile is None or profile.stamps != tuple(_file_stamp(path) for path in key):
+                profile = cls(*key)
+                cls._current[key] = profile
+                logger.info('ExtractionProfile: config loaded (%d subsections, %d skip terms / rules)',
+                            len(profile.subsection_variants), len(profile.skip_matchers['pdf']))
+            return profile
+
+    def skip_matcher(self, doc_type: str) -> TermMatcher:
+        matcher = self.skip_matchers.get(doc_type)
+        if matcher is None:
+            raise ValueError(f"Unknown document type: {doc_type!r}")
+        return matcher
+
+    def fingerprint(self, pdf_backend: str, settings: Optional[Mapping] = None) -> str:
+        """
+        Hash of extractor version, PDF backend, FINGERPRINT_SETTINGS (from
+        `settings`, default this profile's) and the variants / skip-term / rule files.
+        """
+        settings = self.settings if settings is None else settings
+        digest = hashlib.sha256(EXTRACTOR_VERSION.encode('utf-8'))
+        digest.update(pdf_backend.encode('utf-8'))
+        for key in self.FINGERPRINT_SETTINGS:
+            digest.update(f'\0{key}={settings[key]}'.encode('utf-8'))
+        digest.update(self._config_bytes)
+        return digest.hexdigest()[:16]
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Main extractor
 # ─────────────────────────────────────────────────────────────────────────────
@@ -780,20 +1959,86 @@ class DMPExtractor:
         result = DMPExtractor().process_file(file_path, output_dir)
     """
 
-    def __init__(self) -> None:
-        self._converter = DocConverter()
-        self._trimmer = DMPTrimmer()
-        self._matcher = LinearMatcher()
+    def __init__(self, extractor_name: str = 'v4', profile: Optional[ExtractionProfile] = None) -> None:
+        """
+        profile: config snapshot used for every document.  By default the
+        process-wide ExtractionProfile.current(), re-checked per document.
+        """
+        self.extractor_name = extractor_name
+        self._pinned = profile is not None
         self._cleaner = ContentCleaner()
-        self._skip_mgr = SkipTermsManager()
-        self._variants_loader = VariantsLoader()
+        self._use_profile(profile or ExtractionProfile.current())
+
+    def _use_profile(self, profile: ExtractionProfile) -> None:
+        self.profile = profile
+        self._converter = DocConverter(defaults=profile.settings)
+        prefilter = FingerprintFilter(profile.paths[3], profile.fingerprints)
+        self._trimmer = DMPTrimmer(prefilter)
+        self._matcher = make_matcher(self.extractor_name, prefilter)
+
+    def refresh(self) -> ExtractionProfile:
+        """Switch to the current profile if the config files changed; returns the profile in use."""
+        if not self._pinned:
+            profile = ExtractionProfile.current(*self.profile.paths)
+            if profile is not self.profile:
+                self._use_profile(profile)
+        return self.profile
+
+    def fingerprint(self) -> str:
+        """Hash of extractor version + config files and settings that shape the output."""
+        # The text layer depends on the PDF backend (and, for 'auto', on which are installed)
+        pdf_backend = self._converter.settings['pdf_backend']
+        if pdf_backend == 'auto':
+            pdf_backend += ':' + ','.join(available_pdf_backends())
+        return self.profile.fingerprint(pdf_backend, self._converter.settings)
+
+    def skip_matcher(self, doc_type: str) -> TermMatcher:
+        """Skip terms + enabled extraction rules for doc_type as one TermMatcher."""
+        return self.profile.skip_matcher(doc_type)
+
+    def lookup_cached(
+        self,
+        file_path: str,
+        output_dir: str,
+        content_hash: Optional[str] = None,
+    ) -> Optional[dict]:
+        """
+        Return a process_file()-style result for a byte-identical document
+        extracted earlier with the same fingerprint, or None on a miss.
+        The cached JSON is cloned under a new cache_id.
+        """
+        content_hash = content_hash or hash_file(file_path)
+        index = ExtractionIndex(os.path.join(output_dir, 'cache'))
+        source_id = index.lookup(content_hash, self.fingerprint())
+        if source_id is None:
+            return None
+        cache_id = index.clone(source_id)
+        logger.info('Extraction cache hit for %s (cloned %s → %s)', file_path, source_id, cache_id)
+        return {
+            'success': True,
+            'filename': self._smart_filename(file_path),
+            'cache_id': cache_id,
+            'cache_file': f'cache_{cache_id}.json',
+            'cache_hit': True,
+            'message': 'Loaded from extraction cache (identical document)',
+        }
 
     def process_file(
         self,
         file_path: str,
         output_dir: str,
         progress_callback=None,
+        content_hash: Optional[str] = None,
+        admission_dir: Optional[str] = None,
+        queued_at: Optional[float] = None,
     ) -> dict:
+        """
+        Extract one document into a cache file; returns the result dict.
+        admission_dir: state directory of an AdmissionController with the
+        profile's limits.  The document then waits for an extraction slot
+        until admission_max_wait_s after queued_at (time.time() of the
+        upload); once admitted, its OCR waits for an OCR slot without a deadline.
+        """
         def cb(msg: str, pct: int) -> None:
             if progress_callback:
                 progress_callback(msg, pct)
@@ -809,62 +2054,108 @@ class DMPExtractor:
             if not ok:
                 return {'success': False, 'message': msg}
 
-            cb('Converting document to text blocks…', 10)
-            blocks = self._converter.convert(file_path)
-            logger.info('DocConverter: %d blocks from %s', len(blocks), file_path)
+            # One config snapshot for the whole document, including the cache key
+            profile = self.refresh()
+            content_hash = content_hash or hash_file(file_path)
+            cached = self.lookup_cached(file_path, output_dir, content_hash)
+            if cached is not None:
+                cb('Done (cached).', 100)
+                return cached
+
+            # Machine-wide limits for uploads (the web job queue passes admission_dir)
+            admission = None
+            if admission_dir is not None:
+                admission = AdmissionController.from_settings(admission_dir, profile.settings, since=queued_at)
+            self._converter.admission = admission
+            if admission is None:
+                return self._extract(file_path, output_dir, ext, profile, content_hash, cb)
+
+            def on_wait(position: int) -> None:
+                cb(f'Waiting for a free extraction slot (position {position})…', 5)
+            with admission.slot('extract', on_wait=on_wait):
+                return self._extract(file_path, output_dir, ext, profile, content_hash, cb)
+
+        except AdmissionTimeout as exc:
+            logger.warning('Extraction of %s not admitted: %s', file_path, exc)
+            return {'success': False, 'message': str(exc)}
+        except Exception as exc:
+            logger.exception('process_file failed for %s', file_path)
+            return {'success': False, 'message': str(exc)}
 
-            cb('Loading section name variants…', 20)
-            subsection_variants, section_variants = self._variants_loader.load()
+    def _extract(
+        self, file_path: str, output_dir: str, ext: str, profile: ExtractionProfile,
+        content_hash: str, cb,
+    ) -> dict:
+        """Convert, trim, match and clean one validated document; writes the cache file."""
+        cb('Loading section name variants…', 5)
+        subsection_variants, section_variants = profile.subsection_variants, profile.section_variants
+        sec1_names = section_variants.get('1', ())
+        sub11_names = subsection_variants.get('1.1', ())
+
+        cb('Converting document to text blocks…', 10)
+        self._converter.use_ocr_cache(os.path.join(output_dir, 'cache', 'ocr'))
+        blocks = self._converter.convert(
+            file_path,
+            progress_callback=cb,
+            dmp_locator=lambda pages: self._trimmer.locate_pages(pages, sec1_names, sub11_names),
+        )
+        logger.info('DocConverter: %d blocks from %s', len(blocks), file_path)
 
-            cb('Trimming to DMP section…', 30)
-            sec1_names = section_variants.get('1', [])
-            sub11_names = subsection_variants.get('1.1', [])
-            trimmed = self._trimmer.trim(blocks, sec1_names, sub11_names)
-            logger.info('DMPTrimmer: %d → %d blocks after trim', len(blocks), len(trimmed))
+        cb('Trimming to DMP section…', 30)
+        trimmed = self._trimmer.trim(blocks, sec1_names, sub11_names)
+        logger.info('DMPTrimmer: %d → %d blocks after trim', len(blocks), len(trimmed))
 
-            cb('Locating section boundaries…', 50)
-            subsection_matches, section_starts = self._matcher.find_all(
-                trimmed, subsection_variants, section_variants
-            )
-            found = sum(1 for v in subsection_matches.values() if v is not None)
-            logger.info('LinearMatcher: found %d / %d subsections', found, len(SECTION_ORDER))
-
-            cb('Extracting and cleaning content…', 70)
-            skip_patterns = self._skip_mgr.compile()
-            cache = self._build_cache(trimmed, subsection_matches, section_starts, skip_patterns)
-
-            cb('Saving cache…', 90)
-            cache_id = str(uuid.uuid4())
-            cache_dir = os.path.join(output_dir, 'cache')
-            os.makedirs(cache_dir, exist_ok=True)
-            cache_path = os.path.join(cache_dir, f'cache_{cache_id}.json')
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(cache, f, ensure_ascii=False, indent=2)
-
-            filled = sum(
-                1 for sid in SECTION_ORDER
-                if cache.get(sid, {}).get('paragraphs')
-            )
-            cb('Done.', 100)
-
-            return {
-                'success': True,
-                'filename': self._smart_filename(file_path),
-                'cache_id': cache_id,
-                'cache_file': f'cache_{cache_id}.json',
-                'message': f'Extracted {filled} of {len(SECTION_ORDER)} sections',
-            }
+        cb('Locating section boundaries…', 50)
+        subsection_matches, section_starts = self._matcher.find_all(
+            trimmed, subsection_variants, section_variants
+        )
+        found = sum(1 for v in subsection_matches.values() if v is not None)
+        logger.info('LinearMatcher: found %d / %d subsections', found, len(SECTION_ORDER))
+
+        cb('Extracting and cleaning content…', 70)
+        skip_patterns = profile.skip_matcher(ext.lstrip('.'))
+        self._cleaner.hits.clear()
+        cache = self._build_cache(trimmed, subsection_matches, section_starts, skip_patterns)
+        if self._converter.page_backends:
+            cache['_metadata'] = {'page_backends': self._converter.page_backends}
+            ocr_stats = self._converter.ocr_stats()
+            if ocr_stats:
+                cache['_metadata']['ocr'] = ocr_stats
+        ExtractionRules.record_hits(
+            os.path.join(output_dir, 'cache'),
+            {label: n for label, n in self._cleaner.hits.items() if label in profile.rule_ids},
+        )
 
-        except Exception as exc:
-            logger.exception('process_file failed for %s', file_path)
-            return {'success': False, 'message': str(exc)}
+        cb('Saving cache…', 90)
+        cache_id = str(uuid.uuid4())
+        cache_dir = os.path.join(output_dir, 'cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_path = os.path.join(cache_dir, f'cache_{cache_id}.json')
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        ExtractionIndex(cache_dir).record(content_hash, self.fingerprint(), cache_id)
+
+        filled = sum(
+            1 for sid in SECTION_ORDER
+            if cache.get(sid, {}).get('paragraphs')
+        )
+        cb('Done.', 100)
+
+        return {
+            'success': True,
+            'filename': self._smart_filename(file_path),
+            'cache_id': cache_id,
+            'cache_file': f'cache_{cache_id}.json',
+            'pages': self._converter.page_count,
+            'message': f'Extracted {filled} of {len(SECTION_ORDER)} sections',
+        }
 
     def _build_cache(
         self,
         blocks: List[TextBlock],
         subsection_matches: Dict[str, Optional[Tuple[int, int]]],
         section_starts: Dict[str, Optional[int]],
-        skip_patterns: list,
+        skip_patterns: TermMatcher,
     ) -> dict:
         cache: dict = {}
         # When a subsection absorbs the rest of the document (because the
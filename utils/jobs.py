@@ -0,0 +1,358 @@
+"""
+utils/jobs.py — background extraction job queue
+
+/upload stores the file and enqueues a job; a bounded pool of workers runs
+DMPExtractor.process_file outside the request thread.
+
+    ExtractionJobQueue.submit()  → queue position (1 = next to start)
+                                   raises QueueFullError when the backlog is full
+    on_update(job_id, fields)    → per-job state for the progress bus / SSE
+    on_finish(job_id, result, context)
+                                 → called once with the process_file() result
+
+Job states: queued → running → done | failed.
+
+Admission: jobs run with admission_dir (<output_dir>/state/admission), so
+process_file also waits for machine-wide extraction / OCR slots
+(utils/admission.py), shared with the other server processes.  A job still
+waiting `max_wait` seconds after submit() fails with AdmissionTimeout's
+message, whether it is still in this queue or already waiting for its
+extraction slot.  Once admitted, OCR waits for an OCR slot without a deadline.
+
+With executor='process' (default) extractions run in a ProcessPoolExecutor;
+progress messages travel back through a multiprocessing queue that worker
+processes inherit via the pool initializer.  executor='thread' runs them in
+threads of the current process (used by tests and frozen Windows builds).
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Deque, Dict, Optional
+
+from .admission import AdmissionTimeout
+
+logger = logging.getLogger(__name__)
+
+STATE_QUEUED = 'queued'
+STATE_RUNNING = 'running'
+STATE_DONE = 'done'
+STATE_FAILED = 'failed'
+
+# Progress queue inherited by worker processes (see _init_worker)
+_worker_events = None
+
+
+class QueueFullError(Exception):
+    """Raised by ExtractionJobQueue.submit() when the backlog is full."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f'Extraction queue is full. Please retry in {retry_after} s.')
+        self.retry_after = retry_after
+
+
+def _init_worker(events) -> None:
+    global _worker_events
+    _worker_events = events
+
+
+def run_extraction_job(job_id: str, file_path: str, output_dir: str,
+                       content_hash: Optional[str] = None, extractor_name: str = 'v4',
+                       queued_at: Optional[float] = None, events=None) -> dict:
+    """Worker entry point — runs one extraction and streams progress to `events`."""
+    from .extractor_v4 import DMPExtractor
+
+    events = events if events is not None else _worker_events
+
+    def progress(message: str, pct: int) -> None:
+        if events is not None:
+            events.put((job_id, message, pct))
+
+    return DMPExtractor(extractor_name).process_file(
+        file_path, output_dir, progress_callback=progress, content_hash=content_hash,
+        admission_dir=os.path.join(output_dir, 'state', 'admission'), queued_at=queued_at,
+    )
+
+
+class _Job:
+    __slots__ = ('job_id', 'args', 'context', 'enqueued_at', 'started_at')
+
+    def __init__(self, job_id: str, args: tuple, context: Optional[dict]) -> None:
+        self.job_id = job_id
+        self.args = args
+        self.context = context or {}
+        self.enqueued_at = time.monotonic()
+        self.started_at = 0.0
+
+
+class ExtractionJobQueue:
+    """Bounded FIFO of extraction jobs in front of a worker pool."""
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_queue: int = 16,
+        executor: str = 'process',
+        on_update: Optional[Callable[[str, dict], None]] = None,
+        on_finish: Optional[Callable[[str, dict, dict], None]] = None,
+        job_fn: Callable[..., dict] = run_extraction_job,
+        max_wait: float = 0,
+    ) -> None:
+        """max_wait: seconds a job may wait to start before it fails (0 = no limit)."""
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.executor_kind = executor
+        self.on_update = on_update
+        self.on_finish = on_finish
+        self.job_fn = job_fn
+        self.max_wait = max(0.0, float(max_wait))
+
+        self._lock = threading.Lock()
+        self._pending: Deque[_Job] = deque()
+        self._running: Dict[str, _Job] = {}
+        self._executor = None
+        self._events = None
+        self._listener: Optional[threading.Thread] = None
+        self._avg_duration = 30.0  # seconds; refined as jobs complete
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ── public API ──────────────────────────────────────────────────────────
+
+    def submit(self, job_id: str, file_path: str, output_dir: str,
+               content_hash: Optional[str] = None, context: Optional[dict] = None,
+               extractor_name: str = 'v4') -> int:
+        """Enqueue an extraction. Returns the queue position (0 = started immediately)."""
+        job = _Job(job_id, (file_path, output_dir, content_hash, extractor_name, time.time()), context)
+        self._ensure_reaper()
+        with self._lock:
+            if len(self._running) >= self.max_workers and len(self._pending) >= self.max_queue:
+                raise QueueFullError(self._retry_after_locked())
+            self._pending.append(job)
+            position = len(self._pending)
+        self._notify(job_id, self._queued_fields(position))
+        self._pump()
+        with self._lock:
+            return 0 if job_id in self._running else self._position_locked(job_id)
+
+    def position(self, job_id: str) -> int:
+        """1-based position among pending jobs; 0 if running or unknown."""
+        with self._lock:
+            return self._position_locked(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'queued': len(self._pending),
+                'running': len(self._running),
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'executor': self.executor_kind,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'max_wait_s': self.max_wait,
+                'avg_duration_s': round(self._avg_duration, 2),
+            }
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Fail queued jobs waiting longer than max_wait; returns how many."""
+        if not self.max_wait:
+            return 0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [(i, job) for i, job in enumerate(self._pending) if now - job.enqueued_at >= self.max_wait]
+            for _, job in expired:
+                self._pending.remove(job)
+            self._failed += len(expired)
+            self._rejected += len(expired)
+            waiting = [(job.job_id, i + 1) for i, job in enumerate(self._pending)]
+        for ahead, job in expired:
+            logger.warning('Extraction job %s did not start within %d s', job.job_id, self.max_wait)
+            self._report(job, {'success': False, 'message': str(AdmissionTimeout('extract', self.max_wait, ahead))})
+        if expired:
+            for job_id, position in waiting:
+                self._notify(job_id, self._queued_fields(position))
+        return len(expired)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._stop.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+            events, self._events = self._events, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+        if events is not None:
+            events.put(None)
+
+    # ── internals ───────────────────────────────────────────────────────────
+
+    def _position_locked(self, job_id: str) -> int:
+        for i, job in enumerate(self._pending):
+            if job.job_id == job_id:
+                return i + 1
+        return 0
+
+    def _retry_after_locked(self) -> int:
+        backlog = len(self._pending) + len(self._running)
+        return max(5, int(math.ceil(self._avg_duration * backlog / self.max_workers)))
+
+    @staticmethod
+    def _queued_fields(position: int) -> dict:
+        return {
+            'message': f'Waiting in extraction queue (position {position})…',
+            'progress': 0,
+            'status': 'processing',
+            'job_state': STATE_QUEUED,
+            'queue_position': position,
+        }
+
+    def _ensure_reaper(self) -> None:
+        if not self.max_wait or self._reaper is not None or self._stop.is_set():
+            return
+        with self._lock:
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap_loop, name='extract-reaper', daemon=True)
+                self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        while not self._stop.wait(min(1.0, self.max_wait)):
+            try:
+                self.expire()
+            except Exception:
+                logger.exception('Expiring queued extraction jobs failed')
+
+    def _notify(self, job_id: str, fields: dict) -> None:
+        if self.on_update is None:
+            return
+        try:
+            self.on_update(job_id, fields)
+        except Exception:
+            logger.exception('Job update callback failed for %s', job_id)
+
+    def _ensure_executor(self):
+        if self._executor is not None:
+            return self._executor
+        if self.executor_kind == 'process':
+            ctx = multiprocessing.get_context()
+            self._events = ctx.Queue()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(self._events,),
+            )
+        else:
+            self._events = queue.Queue()
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix='extract'
+            )
+        self._listener = threading.Thread(
+            target=self._listen, args=(self._events,), name='extract-progress', daemon=True
+        )
+        self._listener.start()
+        return self._executor
+
+    def _listen(self, events) -> None:
+        """Relay worker progress messages to on_update."""
+        while True:
+            try:
+                item = events.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            job_id, message, pct = item
+            self._notify(job_id, {
+                'message': message,
+                'progress': pct,
+                'status': 'processing',
+                'job_state': STATE_RUNNING,
+                'queue_position': 0,
+            })
+
+    def _pump(self) -> None:
+        """Start pending jobs while workers are free; refresh queue positions."""
+        started = []
+        with self._lock:
+            while self._pending and len(self._running) < self.max_workers:
+                job = self._pending.popleft()
+                job.started_at = time.monotonic()
+                self._running[job.job_id] = job
+                started.append(job)
+            waiting = [(job.job_id, i + 1) for i, job in enumerate(self._pending)]
+
+        for job in started:
+            self._start(job)
+        if started:
+            for job_id, position in waiting:
+                self._notify(job_id, self._queued_fields(position))
+
+    def _start(self, job: _Job) -> None:
+        self._notify(job.job_id, {
+            'message': 'Extraction started…',
+            'progress': 5,
+            'status': 'processing',
+            'job_state': STATE_RUNNING,
+            'queue_position': 0,
+        })
+        try:
+            with self._lock:
+                executor = self._ensure_executor()
+                events = self._events
+            if self.executor_kind == 'process':
+                future = executor.submit(self.job_fn, job.job_id, *job.args)
+            else:
+                future = executor.submit(self.job_fn, job.job_id, *job.args, events=events)
+        except Exception as exc:
+            logger.exception('Could not start extraction job %s', job.job_id)
+            self._finish(job, {'success': False, 'message': f'Could not start extraction: {exc}'})
+            return
+        future.add_done_callback(lambda f, job=job: self._on_done(job, f))
+
+    def _on_done(self, job: _Job, future) -> None:
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            logger.error('Extraction worker process died while running %s', job.job_id)
+            with self._lock:
+                self._executor = None  # recreated on next start
+                events, self._events = self._events, None
+            if events is not None:
+                events.put(None)
+            result = {'success': False, 'message': 'Extraction worker crashed'}
+        except Exception as exc:
+            logger.exception('Extraction job %s raised', job.job_id)
+            result = {'success': False, 'message': str(exc)}
+        if not isinstance(result, dict):
+            result = {'success': False, 'message': 'Extraction returned no result'}
+        self._finish(job, result)
+
+    def _finish(self, job: _Job, result: dict) -> None:
+        with self._lock:
+            self._running.pop(job.job_id, None)
+            duration = time.monotonic() - job.started_at
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+            if result.get('success'):
+                self._completed += 1
+            else:
+                self._failed += 1
+        self._report(job, result)
+        self._pump()
+
+    def _report(self, job: _Job, result: dict) -> None:
+        if self.on_finish is not None:
+            try:
+                self.on_finish(job.job_id, result, job.context)
+            except Exception:
+                logger.exception('Job finish callback failed for %s', job.job_id)
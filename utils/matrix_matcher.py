@@ -0,0 +1,236 @@
+"""
+utils/matrix_matcher.py — vectorised anchor scoring for LinearMatcher
+
+MatrixMatcher produces the same anchors as LinearMatcher, but scores every
+block against every name variant up front with a few sparse matrix products
+instead of one Python loop per subsection:
+
+    H  blocks × vocabulary   tokens of each block (TextBlock.tokens)
+    T  blocks × vocabulary   tail tokens (numeration kept, TextBlock.tail_tokens)
+    Q  variants × vocabulary content tokens of every name variant
+
+The 2- and 3-block windows are the row-shifted sums H[i] + T[i+1] (+ T[i+2]),
+clipped to 0/1 so a token in several blocks counts once — the matrix form of
+_window_tokens().  (window × Qᵀ) / |q| gives every token_overlap score; the
+maximum over each group's variant columns is the score of that subsection or
+section header.  The forward cursor and HIGH / LOW / MIN_FIRST rules then run
+on the score table, visiting only blocks that can pass MIN_FIRST.  Windows
+are only read at blocks scoring in [MIN_FIRST, LOW), so only those rows (and
+the tail rows of the blocks after them) are built.
+
+Only tokens that occur in some name variant form the vocabulary: any other
+token can never contribute to an overlap.  Requires NumPy and SciPy
+(HAS_MATRIX_MATCHER); selected with "extractor_name": "v4-matrix".
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+    from scipy import sparse
+    HAS_MATRIX_MATCHER = True
+except ImportError:
+    HAS_MATRIX_MATCHER = False
+
+from .extractor_v4 import (
+    SECTION_ORDER, FingerprintFilter, LinearMatcher, TextBlock, _name_token_sets,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AnchorScores:
+    """
+    Score table for one document: for every name-variant group (one list of
+    names per subsection / section header) and every block, the best overlap
+    of a 1-, 2- and 3-block window starting at that block.
+    """
+
+    _ROW_CHUNK = 4096  # rows densified at a time when reducing variant columns
+
+    def __init__(
+        self,
+        blocks: List[TextBlock],
+        groups: List[Tuple[str, ...]],
+        window_band: Tuple[float, float] = (0.0, 1.0),
+        positions: Optional[List[int]] = None,
+    ) -> None:
+        """
+        window_band: (lo, hi) — 2-/3-block windows are only scored at blocks
+        whose single-block score lies in [lo, hi) for some group, the only
+        rows the selection rules read them from.
+        positions: blocks that may score at all (FingerprintFilter.candidates);
+        the other rows stay empty and their text is not normalised.
+        """
+        self.blocks = blocks
+        self.n = len(blocks)
+        self.group_pos: Dict[Tuple[str, ...], int] = {}
+        for names in groups:
+            self.group_pos.setdefault(names, len(self.group_pos))
+
+        # Variant columns: one per non-empty token set, grouped contiguously
+        self.vocab: Dict[str, int] = {}
+        q_rows: List[int] = []
+        q_cols: List[int] = []
+        col_len: List[int] = []
+        col_group: List[int] = []
+        for names, g in self.group_pos.items():
+            for q_tokens in _name_token_sets(names):
+                if not q_tokens:
+                    continue
+                for token in q_tokens:
+                    q_rows.append(len(col_len))
+                    q_cols.append(self.vocab.setdefault(token, len(self.vocab)))
+                col_len.append(len(q_tokens))
+                col_group.append(g)
+
+        q_matrix = sparse.csr_matrix(
+            (np.ones(len(q_rows), dtype=np.int32), (q_rows, q_cols)),
+            shape=(len(col_len), max(len(self.vocab), 1)),
+        )
+        self._qt = q_matrix.T.tocsc()
+        self._col_len = np.asarray(col_len, dtype=np.float64)
+        col_group_arr = np.asarray(col_group, dtype=np.intp)
+        # Variant columns are contiguous per group: each run is reduced with max
+        self._starts = np.flatnonzero(np.r_[True, col_group_arr[1:] != col_group_arr[:-1]])
+        self._targets = col_group_arr[self._starts] if len(col_group_arr) else col_group_arr
+
+        # windows[w-1][i, g]: score of the w-block window starting at block i;
+        # -1 where the window runs past the last block or was not scored
+        if positions is None:
+            positions = list(range(self.n))
+        kept = set(positions)
+        head = self._block_matrix(
+            blk.tokens if i in kept else () for i, blk in enumerate(blocks)
+        )
+        single = self._group_scores(head)
+        self.windows: List['np.ndarray'] = [single]
+
+        lo, hi = window_band
+        rows = np.flatnonzero(((single >= lo) & (single < hi)).any(axis=1))
+        # Tail tokens (numeration kept) only for blocks that follow those rows
+        followers = np.unique(np.concatenate([rows + 1, rows + 2]))
+        followers = followers[followers < self.n]
+        tail = self._block_matrix(blocks[j].tail_tokens for j in followers.tolist())
+        window = head[rows]
+        for size in (2, 3):
+            valid = rows + size <= self.n
+            rows = rows[valid]
+            shifted = tail[np.searchsorted(followers, rows + size - 1)]
+            window = window[valid] + shifted
+            window.data[:] = 1  # union, not multiset sum
+            scores = np.full_like(single, -1.0)
+            scores[rows] = self._group_scores(window)
+            self.windows.append(scores)
+
+        self.numeration: Dict[int, str] = {}
+        self.numbered: Dict[str, List[int]] = {}
+        for i in positions:
+            m = LinearMatcher._RE_NUMERATION.match(blocks[i].text)
+            if m:
+                num = f"{m.group(1)}.{m.group(2)}"
+                self.numeration[i] = num
+                self.numbered.setdefault(num, []).append(i)
+
+    def _block_matrix(self, token_sets):
+        """0/1 CSR matrix (one row per token set) over the variant vocabulary."""
+        indptr = [0]
+        indices: List[int] = []
+        for tokens in token_sets:
+            indices.extend(self.vocab[t] for t in tokens if t in self.vocab)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.int32), indices, indptr),
+            shape=(len(indptr) - 1, self._qt.shape[0]),
+        )
+
+    def _group_scores(self, window) -> 'np.ndarray':
+        """(rows × vocabulary) windows → (rows × groups) best token_overlap."""
+        rows = window.shape[0]
+        scores = np.zeros((rows, len(self.group_pos)))
+        if not len(self._col_len):
+            return scores
+        counts = (window @ self._qt).tocsr()
+        for lo in range(0, rows, self._ROW_CHUNK):
+            hi = min(lo + self._ROW_CHUNK, rows)
+            # Same float division as _score_tokens: count / len(q)
+            ratio = counts[lo:hi].toarray() / self._col_len
+            scores[lo:hi, self._targets] = np.maximum.reduceat(ratio, self._starts, axis=1)
+        return scores
+
+
+class MatrixMatcher(LinearMatcher):
+    """
+    LinearMatcher with all overlap scores computed up front (AnchorScores).
+    find_all() keeps the forward cursor and selection rules unchanged.
+    """
+
+    def __init__(self, prefilter: Optional[FingerprintFilter] = None) -> None:
+        super().__init__(use_index=False, prefilter=prefilter)
+
+    def _build_index(
+        self,
+        blocks: List[TextBlock],
+        subsection_variants: Dict[str, List[str]],
+        section_variants: Dict[str, List[str]],
+    ) -> AnchorScores:
+        groups = [tuple(subsection_variants.get(sid, [])) for sid in SECTION_ORDER]
+        groups += [tuple(names) for names in section_variants.values()]
+        positions = self.prefilter.candidates(blocks, [n for names in groups for n in names])
+        return AnchorScores(blocks, groups, window_band=(self.MIN_FIRST, self.LOW), positions=positions)
+
+    def _find_anchor(
+        self,
+        blocks: List[TextBlock],
+        names: List[str],
+        search_from: int,
+        sid: Optional[str] = None,
+        index: Optional[AnchorScores] = None,
+    ) -> Optional[Tuple[int, int]]:
+        """LinearMatcher._find_anchor over precomputed scores (see AnchorScores)."""
+        if not names:
+            return None
+        if index is None:
+            index = AnchorScores(blocks, [tuple(names)], window_band=(self.MIN_FIRST, self.LOW))
+
+        g = index.group_pos[tuple(names)]
+        single_col = index.windows[0][:, g]
+        visit = single_col >= self.MIN_FIRST
+        if sid is not None:
+            visit[index.numbered.get(sid, [])] = True
+        visit[:search_from] = False
+
+        first_low: Optional[Tuple[int, int]] = None
+        for i in np.flatnonzero(visit).tolist():
+            if blocks[i].is_hf or blocks[i].is_noise:
+                continue
+
+            if sid is not None and index.numeration.get(i) == sid:
+                logger.debug("MatrixMatcher: %s numeration match at block %d", sid, i)
+                return i, 1
+
+            single = float(single_col[i])
+            if single < self.MIN_FIRST:
+                continue
+            if single >= self.HIGH:
+                return i, 1
+            if single >= self.LOW:
+                if first_low is None:
+                    first_low = (i, 1)
+                continue
+
+            best_score, best_win = single, 1
+            for win in (2, 3):
+                s = float(index.windows[win - 1][i, g])
+                if s < 0:  # window runs past the last block
+                    break
+                if s > best_score:
+                    best_score, best_win = s, win
+
+            if best_score >= self.HIGH:
+                return i, best_win
+            if best_score >= self.LOW and first_low is None:
+                first_low = (i, best_win)
+
+        return first_low
@@ -0,0 +1,354 @@
+"""
+utils/ocr.py — streaming OCR for scanned PDFs
+
+Pages are rasterised in small windows (pdf2image first_page/last_page) and
+recognised in a bounded thread pool; each pytesseract call runs its own
+tesseract process, so threads give real parallelism.  Every page image is
+closed as soon as it has been recognised and the next window is only
+rasterised once the pool has caught up, so at most `window + workers` page
+images are alive at any time — independent of the document's length.
+
+    texts = StreamingOCR(workers=4).run(path, page_count, progress_callback=cb)
+    cb(done_pages, total_pages) is called once per recognised page.
+
+With a cache (extraction_cache.OCRPageCache) each rendered page is looked up
+by its pixel hash before tesseract runs; only new or changed pages are OCR'd.
+
+run(stop_when=...) ends the scan early: after each window the predicate gets
+the texts recognised so far (a contiguous prefix) and a true result stops
+rasterising further pages.  run(pages=[...]) OCRs only the listed pages
+(consecutive pages still share a rasterisation window).
+
+Recognition goes through an OCREngine shared by every run in the process:
+
+    tesserocr    initialised tesseract API handles (language models loaded
+                 once) reused across pages and documents; images are passed
+                 in memory
+    pytesseract  one tesseract process + temporary image file per page
+                 (fallback when tesserocr is not installed)
+
+get_ocr_engine('auto') prefers tesserocr.  After each run, StreamingOCR.stats
+holds per-page recognition latency and throughput for comparing engines.
+"""
+
+import os
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from pdf2image import convert_from_path
+    HAS_PDF2IMAGE = True
+except ImportError:
+    HAS_PDF2IMAGE = False
+
+try:
+    import pytesseract
+    if os.name == 'nt':
+        for _p in [
+            r"C:\Program Files\Tesseract-OCR\tesseract.exe",
+            r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
+        ]:
+            if os.path.exists(_p):
+                pytesseract.pytesseract.tesseract_cmd = _p
+                break
+    HAS_PYTESSERACT = True
+except ImportError:
+    HAS_PYTESSERACT = False
+
+try:
+    import tesserocr
+    HAS_TESSEROCR = True
+except ImportError:
+    HAS_TESSEROCR = False
+
+HAS_OCR = HAS_PDF2IMAGE and (HAS_PYTESSERACT or HAS_TESSEROCR)
+
+logger = logging.getLogger(__name__)
+
+OCR_LANG = 'pol+eng'
+OCR_DPI = 200  # pdf2image default
+
+
+@lru_cache(maxsize=None)
+def tesseract_version() -> str:
+    """Installed tesseract version (part of the OCR page cache key)."""
+    try:
+        return f'tesseract-{pytesseract.get_tesseract_version()}'
+    except Exception:
+        return 'tesseract-unknown'
+
+
+class OCREngine(ABC):
+    """Recognises one page image.  One instance per engine serves the whole process."""
+
+    name = ''
+    available = False
+
+    @abstractmethod
+    def version(self) -> str:
+        """Engine + model version (part of the OCR page cache key)."""
+
+    @abstractmethod
+    def recognise(self, image, lang: str) -> str:
+        """Text of one page image."""
+
+
+class PytesseractEngine(OCREngine):
+    name = 'pytesseract'
+    available = HAS_PYTESSERACT
+
+    def version(self) -> str:
+        return tesseract_version()
+
+    def recognise(self, image, lang: str) -> str:
+        return pytesseract.image_to_string(image, lang=lang)
+
+
+class TesserocrEngine(OCREngine):
+    """
+    Keeps initialised PyTessBaseAPI handles per language: each concurrent
+    page borrows one, so models are loaded once per handle instead of once
+    per page.  tesserocr releases the GIL while recognising.
+    """
+
+    name = 'tesserocr'
+    available = HAS_TESSEROCR
+
+    def __init__(self) -> None:
+        self._idle: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def version(self) -> str:
+        # "tesseract 5.3.0\n leptonica-…" → tesserocr-5.3.0
+        return 'tesserocr-' + tesserocr.tesseract_version().split()[1]
+
+    def recognise(self, image, lang: str) -> str:
+        with self._lock:
+            idle = self._idle.setdefault(lang, [])
+            api = idle.pop() if idle else None
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(lang=lang)
+        try:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+            with self._lock:
+                self._idle[lang].append(api)
+
+
+OCR_ENGINES: Dict[str, OCREngine] = {
+    engine.name: engine for engine in (TesserocrEngine(), PytesseractEngine())
+}
+
+
+def available_ocr_engines() -> List[str]:
+    """Installed engines, preferred first."""
+    return [name for name, engine in OCR_ENGINES.items() if engine.available]
+
+
+def get_ocr_engine(name: str = 'auto') -> OCREngine:
+    """The named engine, or with 'auto' the first available one."""
+    if name == 'auto':
+        available = available_ocr_engines()
+        if not available:
+            raise RuntimeError('No OCR engine installed (tesserocr or pytesseract)')
+        name = available[0]
+    engine = OCR_ENGINES.get(name)
+    if engine is None or not engine.available:
+        raise RuntimeError(f'OCR engine not available: {name!r} (available: {available_ocr_engines()})')
+    return engine
+
+
+class StreamingOCR:
+    """Windowed rasterisation + bounded parallel recognition of PDF pages."""
+
+    def __init__(
+        self,
+        workers: int = 2,
+        window: int = 4,
+        dpi: int = OCR_DPI,
+        lang: str = OCR_LANG,
+        rasterise: Optional[Callable] = None,
+        recognise: Optional[Callable] = None,
+        cache=None,
+        engine_version: Optional[str] = None,
+        engine: Optional[OCREngine] = None,
+    ) -> None:
+        """engine: OCREngine (default get_ocr_engine('auto')); unused when recognise is given."""
+        self.workers = max(1, int(workers) or os.cpu_count() or 1)
+        self.window = max(1, int(window))
+        self.dpi = dpi
+        self.lang = lang
+        # Injectable for tests: rasterise(path, first, last) -> [images],
+        # recognise(image) -> str
+        self._rasterise = rasterise or self._rasterise_pdf
+        self._recognise = recognise or self._recognise_engine
+        self._custom_recognise = recognise is not None
+        self.engine = engine
+        self.cache = cache
+        self._engine_version = engine_version
+        # Last run: pages, cache hits, wall time, per-page recognition latency
+        self.stats: dict = {}
+        self._latencies: List[float] = []
+        self._cache_hits = 0
+        self._stats_lock = threading.Lock()
+
+    def run(
+        self,
+        path: str,
+        page_count: int,
+        first_page: int = 1,
+        last_page: Optional[int] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        stop_when: Optional[Callable[[List[str]], bool]] = None,
+        pages: Optional[Sequence[int]] = None,
+    ) -> List[str]:
+        """
+        OCR pages first_page..last_page (1-based, inclusive), or the ascending
+        1-based `pages` when given; texts in that order.  Shorter than
+        requested only if stop_when fired.
+        """
+        if pages is None:
+            last_page = page_count if last_page is None else min(last_page, page_count)
+            pages = range(first_page, last_page + 1)
+        else:
+            pages = [n for n in pages if 1 <= n <= page_count]
+        total = len(pages)
+        if total <= 0:
+            return []
+
+        if self.workers > 1:
+            # tesseract's own OpenMP threads would oversubscribe the page pool
+            os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+        self._latencies = []
+        self._cache_hits = 0
+        started = time.perf_counter()
+
+        texts: List[Optional[str]] = [None] * total
+        pending = {}
+        done = 0
+        submitted = 0
+
+        def drain(limit: int) -> None:
+            nonlocal done
+            while len(pending) > limit:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    texts[pending.pop(future)] = future.result()
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, total)
+
+        windows = self._windows(pages)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ocr') as pool:
+            for index, start, end in windows:
+                self._submit_window(pool, pending, path, start, end, index)
+                submitted = index + end - start + 1
+                # Rasterise the next window only once the pool has caught up
+                drain(self.workers)
+                if stop_when is not None and submitted < total:
+                    prefix = texts[:submitted]
+                    if None in prefix:
+                        prefix = prefix[:prefix.index(None)]
+                    if stop_when(prefix):
+                        logger.info('OCR stopped early after page %d of %d', end, pages[-1])
+                        break
+            drain(0)
+        self._record_stats(done, time.perf_counter() - started)
+        return [text or '' for text in texts[:submitted]]
+
+    def _record_stats(self, pages: int, seconds: float) -> None:
+        latencies = sorted(self._latencies)
+        self.stats = {
+            'engine': self._engine_name(),
+            'dpi': self.dpi,
+            'workers': self.workers,
+            'pages': pages,
+            'cache_hits': self._cache_hits,
+            'seconds': round(seconds, 3),
+            'pages_per_second': round(pages / seconds, 2) if seconds > 0 else None,
+            'latency_ms': {
+                'mean': round(1000 * sum(latencies) / len(latencies), 1),
+                'p95': round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 1),
+                'max': round(1000 * latencies[-1], 1),
+            } if latencies else None,
+        }
+        if latencies:
+            logger.info('OCR (%s): %d pages in %.1f s, %.1f ms/page (p95 %.1f ms), %d cached',
+                        self.stats['engine'], pages, seconds, self.stats['latency_ms']['mean'],
+                        self.stats['latency_ms']['p95'], self._cache_hits)
+
+    def _engine_name(self) -> str:
+        if self._custom_recognise:
+            return 'custom'
+        return self.engine.name if self.engine is not None else ''
+
+    def _windows(self, pages: Sequence[int]) -> List[Tuple[int, int, int]]:
+        """(index in pages, first, last): runs of consecutive pages, at most `window` long."""
+        windows = []
+        index = 0
+        while index < len(pages):
+            start = end = pages[index]
+            while (end - start + 1 < self.window and index + end - start + 1 < len(pages)
+                   and pages[index + end - start + 1] == end + 1):
+                end += 1
+            windows.append((index, start, end))
+            index += end - start + 1
+        return windows
+
+    def _submit_window(self, pool, pending: dict, path: str, start: int, end: int,
+                       index: int) -> None:
+        # Kept separate so the window's image list goes out of scope on return;
+        # afterwards each image is only referenced by its pending work item.
+        for offset, image in enumerate(self._rasterise(path, start, end)):
+            pending[pool.submit(self._recognise_and_release, image)] = index + offset
+
+    def _recognise_and_release(self, image) -> str:
+        try:
+            if self.cache is None:
+                return self._timed_recognise(image)
+            if self._engine_version is None:
+                self._engine_version = self._version()
+            key = self.cache.key(image, self.lang, self._engine_version, self.dpi)
+            text = self.cache.get(key)
+            if text is None:
+                text = self._timed_recognise(image)
+                self.cache.put(key, text)
+            else:
+                with self._stats_lock:
+                    self._cache_hits += 1
+            return text
+        finally:
+            close = getattr(image, 'close', None)
+            if close is not None:
+                close()
+
+    def _timed_recognise(self, image) -> str:
+        started = time.perf_counter()
+        text = self._recognise(image)
+        with self._stats_lock:
+            self._latencies.append(time.perf_counter() - started)
+        return text
+
+    def _version(self) -> str:
+        try:
+            return self._get_engine().version()
+        except RuntimeError:
+            return 'tesseract-unknown'
+
+    def _get_engine(self) -> OCREngine:
+        if self.engine is None:
+            self.engine = get_ocr_engine('auto')
+        return self.engine
+
+    def _rasterise_pdf(self, path: str, first: int, last: int) -> list:
+        return convert_from_path(path, dpi=self.dpi, first_page=first, last_page=last)
+
+    def _recognise_engine(self, image) -> str:
+        return self._get_engine().recognise(image, self.lang)
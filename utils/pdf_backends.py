@@ -0,0 +1,242 @@
+"""
+utils/pdf_backends.py — PDF text-layer backends
+
+Each backend reads the text layer of a PDF page by page:
+
+    backend = get_pdf_backend('pypdfium2')
+    backend.page_count(path)
+    backend.iter_pages(path, start, end)   # lazy, pages [start, end)
+    backend.pages(path, [3, 7, 8])         # the given 0-based pages (iter_numbers: lazy)
+
+pages_with_images(path, numbers) tells which pages draw an image XObject.
+
+Built in, roughly fastest first (tests/benchmark_extraction.py pdfbackends):
+pypdfium2, pymupdf, pypdf2 (always installed) and pdfplumber; the optional
+ones only if their package imports.  Page text uses
+'\\n' line breaks for every backend.  Other backends can be added with
+register_pdf_backend(); process-pool workers look backends up by name, so
+register them at import time of a module the workers also import.
+
+DocConverter picks one with "pdf_backend" in config/settings.json; "auto"
+reads a few sample pages per document with each available backend and takes
+the acceptable one (clean, not truncated) with the lowest priority, so the
+choice depends on the document only, never on machine load.  Backends with
+auto_fallback set (pdfplumber: slow to open) are only tried there when no
+other backend gives clean text.
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import PyPDF2
+
+try:
+    import pdfplumber
+    HAS_PDFPLUMBER = True
+except ImportError:
+    HAS_PDFPLUMBER = False
+
+try:
+    import pypdfium2
+    HAS_PDFIUM = True
+except ImportError:
+    HAS_PDFIUM = False
+
+try:
+    import pymupdf
+    HAS_PYMUPDF = True
+except ImportError:
+    try:
+        import fitz as pymupdf  # PyMuPDF < 1.24
+        HAS_PYMUPDF = True
+    except ImportError:
+        HAS_PYMUPDF = False
+
+
+class PdfBackend(ABC):
+    """Base class: subclasses set name/available/priority and implement _open, _count, _text."""
+
+    name = ''
+    available = False
+    auto_fallback = False
+    # 'auto' prefers acceptable backends with a lower priority
+    priority = 100
+
+    @abstractmethod
+    def _open(self, path: str):
+        """Context manager yielding the opened document."""
+
+    @abstractmethod
+    def _count(self, doc) -> int:
+        """Number of pages of an opened document."""
+
+    @abstractmethod
+    def _text(self, doc, number: int) -> str:
+        """Text of 0-based page `number` of an opened document."""
+
+    def page_count(self, path: str) -> int:
+        with self._open(path) as doc:
+            return self._count(doc)
+
+    def iter_pages(self, path: str, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        """Text of pages [start, end); the file closes when the generator does."""
+        with self._open(path) as doc:
+            total = self._count(doc)
+            for number in range(start, total if end is None else min(end, total)):
+                yield self._text(doc, number)
+
+    def iter_numbers(self, path: str, numbers: List[int]) -> Iterator[str]:
+        """Lazily yield the text of the given 0-based pages, in that order."""
+        with self._open(path) as doc:
+            for number in numbers:
+                yield self._text(doc, number)
+
+    def pages(self, path: str, numbers: List[int]) -> List[str]:
+        """Text of the given 0-based pages, in that order (one PDF parse)."""
+        return list(self.iter_numbers(path, numbers))
+
+
+class PyPDF2Backend(PdfBackend):
+    name = 'pypdf2'
+    available = True
+    priority = 30
+
+    @contextmanager
+    def _open(self, path: str):
+        with open(path, 'rb') as f:
+            yield PyPDF2.PdfReader(f)
+
+    def _count(self, doc) -> int:
+        return len(doc.pages)
+
+    def _text(self, doc, number: int) -> str:
+        return doc.pages[number].extract_text() or ''
+
+
+class PdfplumberBackend(PdfBackend):
+    name = 'pdfplumber'
+    available = HAS_PDFPLUMBER
+    auto_fallback = True
+    priority = 40
+
+    @contextmanager
+    def _open(self, path: str):
+        with pdfplumber.open(path) as pdf:
+            yield pdf
+
+    def _count(self, doc) -> int:
+        return len(doc.pages)
+
+    def _text(self, doc, number: int) -> str:
+        return doc.pages[number].extract_text() or ''
+
+    def iter_pages(self, path: str, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        # Only the requested pages are loaded (pages=…, 1-based)
+        numbers = None if end is None else list(range(start + 1, end + 1))
+        with pdfplumber.open(path, pages=numbers) as pdf:
+            for page in (pdf.pages if numbers else pdf.pages[start:]):
+                yield page.extract_text() or ''
+
+    def iter_numbers(self, path: str, numbers: List[int]) -> Iterator[str]:
+        with pdfplumber.open(path, pages=[n + 1 for n in numbers]) as pdf:
+            for page in pdf.pages:
+                yield page.extract_text() or ''
+
+
+class PdfiumBackend(PdfBackend):
+    name = 'pypdfium2'
+    available = HAS_PDFIUM
+    priority = 10
+
+    @contextmanager
+    def _open(self, path: str):
+        doc = pypdfium2.PdfDocument(path)
+        try:
+            yield doc
+        finally:
+            doc.close()
+
+    def _count(self, doc) -> int:
+        return len(doc)
+
+    def _text(self, doc, number: int) -> str:
+        page = doc[number]
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range().replace('\r\n', '\n')
+        finally:
+            textpage.close()
+            page.close()
+
+
+class PyMuPDFBackend(PdfBackend):
+    name = 'pymupdf'
+    available = HAS_PYMUPDF
+    priority = 20
+
+    @contextmanager
+    def _open(self, path: str):
+        doc = pymupdf.open(path)
+        try:
+            yield doc
+        finally:
+            doc.close()
+
+    def _count(self, doc) -> int:
+        return doc.page_count
+
+    def _text(self, doc, number: int) -> str:
+        return doc[number].get_text()
+
+
+PDF_BACKENDS: Dict[str, PdfBackend] = {}
+
+
+def register_pdf_backend(backend: PdfBackend) -> PdfBackend:
+    PDF_BACKENDS[backend.name] = backend
+    return backend
+
+
+for _backend in (PdfiumBackend(), PyMuPDFBackend(), PyPDF2Backend(), PdfplumberBackend()):
+    register_pdf_backend(_backend)
+
+
+def available_pdf_backends() -> List[str]:
+    """Names of registered backends whose library is installed."""
+    return [name for name, backend in PDF_BACKENDS.items() if backend.available]
+
+
+def get_pdf_backend(name: str) -> PdfBackend:
+    backend = PDF_BACKENDS.get(name)
+    if backend is None or not backend.available:
+        raise ValueError(f"PDF backend not available: {name!r} (available: {available_pdf_backends()})")
+    return backend
+
+
+def pages_with_images(path: str, numbers: List[int]) -> List[bool]:
+    """
+    For each given 0-based page: does it draw an image XObject, directly or
+    inside a form XObject?  (PyPDF2, whatever the text backend.)
+    """
+    with open(path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        return [_has_image(reader.pages[n].get('/Resources'), set()) for n in numbers]
+
+
+def _has_image(resources, seen: set) -> bool:
+    if resources is None:
+        return False
+    xobjects = resources.get_object().get('/XObject')
+    if xobjects is None:
+        return False
+    for ref in xobjects.get_object().values():
+        xobject = ref.get_object()
+        subtype = xobject.get('/Subtype')
+        if subtype == '/Image':
+            return True
+        if subtype == '/Form' and id(xobject) not in seen:
+            seen.add(id(xobject))
+            if _has_image(xobject.get('/Resources'), seen):
+                return True
+    return False
@@ -0,0 +1,629 @@
+"""
+utils/progress.py — publish/subscribe progress for upload sessions
+
+Every upload session has a channel holding its current progress state.
+Publishers merge fields into it; each change that alters what a client sees
+becomes an event with an increasing id.  Subscribers (the /progress SSE
+stream) block on the channel's condition variable until an event arrives,
+so an update reaches the browser within milliseconds and an idle stream
+costs no CPU.
+
+    bus.open(session_id, fields)          new channel (replaces an old one)
+    bus.update(session_id, fields)        merge + publish; False if unknown
+    bus.subscribe(session_id, last_id)    → (event_id, data) pairs; (None, None)
+                                            is a heartbeat, the stream ends
+                                            after the final event
+    bus.asubscribe(session_id, last_id)   the same as an async iterator, for
+                                            streams served from an event loop
+    sse_message(event_id, data)           one pair as SSE text
+
+An event's data is {message, progress, status, job_state, queue_position};
+the final event (status 'complete' or 'error') also carries the redirect.
+A subscriber that passes the id of the last event it saw (SSE Last-Event-ID)
+receives only the events it missed, as far as the channel's history goes.
+
+Channels are bounded for servers that run for months: a channel expires
+`ttl` seconds after its last update (`finished_ttl` once it completed or
+failed — clients that never open the stream leave it behind), a daemon
+thread sweeps expired channels, and beyond `max_entries` the oldest channel
+is evicted.  stats() counts live, expired and evicted channels, and the
+queued / running extraction jobs among them (their job_state).
+
+ProgressBus keeps channels in process memory.  SharedProgressBus keeps them
+in a SQLite file (WAL mode) so that every worker process of a multi-process
+server sees the same progress: a stream may be served by another worker than
+the one running the upload's extraction.  Publishes in the same process wake
+streams at once; updates from other processes are picked up within
+`poll_interval`.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from .jobs import STATE_QUEUED, STATE_RUNNING
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = ('complete', 'error')
+
+_GIVE_UP = object()
+
+
+# First message of a new /progress stream (not sent on reconnects)
+SSE_CONNECTED = f"retry: 2000\ndata: {json.dumps({'message': 'Connected', 'progress': 0, 'status': 'connected'})}\n\n"
+
+
+def sse_message(event_id: Optional[int], data: Optional[dict]) -> str:
+    """A subscribe() pair as an SSE message; a heartbeat is a comment line."""
+    if data is None:
+        return ": keep-alive\n\n"
+    if event_id is None:
+        return f"data: {json.dumps(data)}\n\n"
+    return f"id: {event_id}\ndata: {json.dumps(data)}\n\n"
+
+
+def _error(message: str) -> dict:
+    return {'message': message, 'progress': 0, 'status': 'error'}
+
+
+class _Channel:
+    __slots__ = ('state', 'events', 'cond', 'last_data', 'updated_at')
+
+    def __init__(self, lock: threading.Lock, history: int) -> None:
+        self.state: dict = {}
+        self.events: Deque[Tuple[int, dict]] = deque(maxlen=history)
+        self.cond = threading.Condition(lock)
+        self.last_data: Optional[dict] = None
+        self.updated_at = time.monotonic()
+
+    @property
+    def finished(self) -> bool:
+        return self.state.get('status') in FINAL_STATUSES
+
+
+class ProgressBus:
+    """Per-session progress channels; see the module docstring."""
+
+    # Longest wait before re-reading a channel (None: only when woken)
+    poll_interval: Optional[float] = None
+    # Channel reads block on I/O: asubscribe() runs them in the loop's executor
+    blocking_reads = False
+
+    def __init__(
+        self,
+        heartbeat: float = 15.0,
+        idle_timeout: float = 300.0,
+        history: int = 32,
+        ttl: float = 3600.0,
+        finished_ttl: float = 600.0,
+        max_entries: int = 1000,
+        sweep_interval: float = 60.0,
+    ) -> None:
+        """
+        heartbeat: seconds between keep-alives on a stream with no events.
+        idle_timeout: a stream without any event for this long ends with a
+        'Processing timeout' error.
+        history: events kept per channel for Last-Event-ID resume.
+        ttl / finished_ttl: seconds after the last update until a channel
+        expires, while processing / once complete or failed.
+        max_entries: channels kept at most; opening another evicts the oldest.
+        sweep_interval: seconds between sweeps of the background thread.
+        """
+        self.heartbeat = heartbeat
+        self.idle_timeout = idle_timeout
+        self.history = history
+        self.ttl = ttl
+        self.finished_ttl = finished_ttl
+        self.max_entries = max(1, int(max_entries))
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        # Insertion order = age: open() (re)inserts at the end
+        self._channels: Dict[str, _Channel] = {}
+        self._expired = 0
+        self._evicted = 0
+        self._listeners: Set[Callable[[], None]] = set()
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Event ids are unique across channels, so a stale Last-Event-ID from
+        # a replaced channel never hides its events
+        self._ids = itertools.count(1)
+
+    # ── publishing ──────────────────────────────────────────────────────────
+
+    def open(self, session_id: str, fields: dict) -> None:
+        self._ensure_sweeper()
+        with self._lock:
+            old = self._channels.pop(session_id, None)
+            if old is not None:
+                old.cond.notify_all()
+                self._notify()
+            while len(self._channels) >= self.max_entries:
+                oldest = next(iter(self._channels))
+                self._channels.pop(oldest).cond.notify_all()
+                self._notify()
+                self._evicted += 1
+            channel = _Channel(self._lock, self.history)
+            self._channels[session_id] = channel
+            self._merge_locked(channel, fields)
+
+    def update(self, session_id: str, fields: dict, if_active: bool = False) -> bool:
+        """
+        Merge fields into the session's state and publish the change.
+        Returns False (nothing merged) for an unknown session, or with
+        if_active for one that already completed or failed.
+        """
+        with self._lock:
+            channel = self._channels.get(session_id)
+            if channel is None or (if_active and channel.finished):
+                return False
+            self._merge_locked(channel, fields)
+            return True
+
+    def get(self, session_id: str) -> Optional[dict]:
+        """Copy of the session's current state, None if unknown."""
+        with self._lock:
+            channel = self._channels.get(session_id)
+            return dict(channel.state) if channel is not None else None
+
+    def discard(self, session_id: str) -> None:
+        with self._lock:
+            channel = self._channels.pop(session_id, None)
+            if channel is not None:
+                channel.cond.notify_all()
+                self._notify()
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def stats(self) -> dict:
+        with self._lock:
+            live = [channel.state.get('job_state') for channel in self._channels.values() if not channel.finished]
+            return self._stats(live, len(self._channels) - len(live), self._expired, self._evicted)
+
+    def _stats(self, live_job_states: List[Optional[str]], finished: int, expired: int, evicted: int) -> dict:
+        jobs = Counter(live_job_states)
+        return {
+            'live': len(live_job_states),
+            'finished': finished,
+            'expired': expired,
+            'evicted': evicted,
+            'jobs_queued': jobs[STATE_QUEUED],
+            'jobs_running': jobs[STATE_RUNNING],
+            'max_entries': self.max_entries,
+            'ttl_s': self.ttl,
+            'finished_ttl_s': self.finished_ttl,
+        }
+
+    def _merge_locked(self, channel: _Channel, fields: dict) -> None:
+        channel.state.update(fields)
+        channel.updated_at = time.monotonic()
+        data = self._event_data(channel.state)
+        if data == channel.last_data:
+            return
+        channel.last_data = data
+        channel.events.append((next(self._ids), data))
+        channel.cond.notify_all()
+        self._notify()
+
+    @staticmethod
+    def _event_data(state: dict) -> dict:
+        status = state.get('status', 'processing')
+        data = {
+            'message': state.get('message', ''),
+            'progress': state.get('progress', 0),
+            'status': status,
+            'job_state': state.get('job_state'),
+            'queue_position': state.get('queue_position', 0),
+        }
+        if status in FINAL_STATUSES:
+            if status == 'complete':
+                data['progress'] = 100
+            data['redirect'] = state.get('redirect')
+        return data
+
+    # ── expiry ──────────────────────────────────────────────────────────────
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop channels past their TTL; returns how many were dropped."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [
+                session_id for session_id, channel in self._channels.items()
+                if now - channel.updated_at >= (self.finished_ttl if channel.finished else self.ttl)
+            ]
+            for session_id in expired:
+                self._channels.pop(session_id).cond.notify_all()
+            self._expired += len(expired)
+            if expired:
+                self._notify()
+        return len(expired)
+
+    def close(self) -> None:
+        """Stop the background sweeper."""
+        self._stop.set()
+
+    def _ensure_sweeper(self) -> None:
+        if self._sweeper is not None or self._stop.is_set():
+            return
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_loop, name='progress-sweeper', daemon=True)
+                self._sweeper.start()
+
+    def _sweep_loop(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception('Progress sweep failed')
+
+    # ── subscribing ─────────────────────────────────────────────────────────
+    # subscribe() / asubscribe() read a channel through _token, _read, _wait and
+    # _finish, which SharedProgressBus implements on its SQLite tables.
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """Call `callback()` (from the publishing thread) after every change."""
+        self._listeners.add(callback)
+
+    def remove_listener(self, callback: Callable[[], None]) -> None:
+        self._listeners.discard(callback)
+
+    def _notify(self) -> None:
+        for callback in list(self._listeners):
+            callback()
+
+    def _token(self, session_id: str):
+        """Identifies the session's current channel; None if unknown."""
+        with self._lock:
+            return self._channels.get(session_id)
+
+    def _start_after(self, token, last_event_id: Optional[int]) -> int:
+        return last_event_id or 0
+
+    def _read(self, session_id: str, token, seen: int) -> Tuple[List[Tuple[int, dict]], bool]:
+        """Events after `seen`, and whether the channel is still the session's."""
+        with self._lock:
+            pending = [(eid, data) for eid, data in token.events if eid > seen]
+            return pending, self._channels.get(session_id) is token
+
+    def _wait(self, session_id: str, token, seen: int, timeout: float) -> None:
+        with self._lock:
+            if self._channels.get(session_id) is token and all(eid <= seen for eid, _ in token.events):
+                token.cond.wait(timeout)
+
+    def _finish(self, session_id: str, token, seen: int) -> None:
+        """Drop the channel once its final event was delivered."""
+        with self._lock:
+            if self._channels.get(session_id) is token:
+                del self._channels[session_id]
+
+    def subscribe(
+        self, session_id: str, last_event_id: Optional[int] = None
+    ) -> Iterator[Tuple[Optional[int], Optional[dict]]]:
+        """
+        Yield (event_id, data) for events after last_event_id as they are
+        published, (None, None) after each `heartbeat` seconds without one.
+        Ends after the final event (the channel is then discarded), when the
+        session is unknown, replaced, expired or evicted (one error event with
+        id None), or after idle_timeout without events.
+        """
+        token = self._token(session_id)
+        if token is None:
+            yield None, _error('Unknown or expired progress session')
+            return
+        seen = self._start_after(token, last_event_id)
+        idle_since = last_sent = time.monotonic()
+        while True:
+            pending, current = self._read(session_id, token, seen)
+            if pending:
+                idle_since = last_sent = time.monotonic()
+                for eid, data in pending:
+                    seen = eid
+                    yield eid, data
+                if pending[-1][1]['status'] in FINAL_STATUSES:
+                    self._finish(session_id, token, seen)
+                    return
+                continue
+            if not current:
+                yield None, _error('Progress session closed')
+                return
+            wait = self._idle_wait(idle_since, last_sent)
+            if wait is _GIVE_UP:
+                yield None, _error('Processing timeout')
+                self.discard(session_id)
+                return
+            if wait is None:
+                last_sent = time.monotonic()
+                yield None, None
+                continue
+            self._wait(session_id, token, seen, wait)
+
+    async def asubscribe(
+        self, session_id: str, last_event_id: Optional[int] = None
+    ) -> AsyncIterator[Tuple[Optional[int], Optional[dict]]]:
+        """
+        subscribe() for asyncio: the same events, but waiting on the running
+        event loop (woken by a listener) instead of blocking a thread, so one
+        loop can hold any number of open streams.  With blocking_reads the
+        channel reads run in the loop's default executor.
+        """
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+
+        def wake() -> None:
+            try:
+                loop.call_soon_threadsafe(changed.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+        self.add_listener(wake)
+        try:
+            token = await self._acall(self._token, session_id)
+            if token is None:
+                yield None, _error('Unknown or expired progress session')
+                return
+            seen = self._start_after(token, last_event_id)
+            idle_since = last_sent = time.monotonic()
+            while True:
+                changed.clear()
+                pending, current = await self._acall(self._read, session_id, token, seen)
+                if pending:
+                    idle_since = last_sent = time.monotonic()
+                    for eid, data in pending:
+                        seen = eid
+                        yield eid, data
+                    if pending[-1][1]['status'] in FINAL_STATUSES:
+                        await self._acall(self._finish, session_id, token, seen)
+                        return
+                    continue
+                if not current:
+                    yield None, _error('Progress session closed')
+                    return
+                wait = self._idle_wait(idle_since, last_sent)
+                if wait is _GIVE_UP:
+                    yield None, _error('Processing timeout')
+                    await self._acall(self.discard, session_id)
+                    return
+                if wait is None:
+                    last_sent = time.monotonic()
+                    yield None, None
+                    continue
+                try:
+                    await asyncio.wait_for(changed.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.remove_listener(wake)
+
+    async def _acall(self, func, *args):
+        """func(*args) from the event loop: directly, or in the executor with blocking_reads."""
+        if not self.blocking_reads:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def _idle_wait(self, idle_since: float, last_sent: float):
+        """Seconds to wait for the next event; None = send a heartbeat now, _GIVE_UP = idle timeout."""
+        now = time.monotonic()
+        if now - idle_since >= self.idle_timeout:
+            return _GIVE_UP
+        if now - last_sent >= self.heartbeat:
+            return None
+        wait = min(self.heartbeat - (now - last_sent), self.idle_timeout - (now - idle_since))
+        return wait if self.poll_interval is None else min(wait, self.poll_interval)
+
+
+class SharedProgressBus(ProgressBus):
+    """ProgressBus stored in a SQLite file shared by all server processes."""
+
+    blocking_reads = True
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS progress_channels (
+            session_id TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL,  -- id of the channel's first event
+            state TEXT NOT NULL,
+            last_data TEXT,
+            finished INTEGER NOT NULL DEFAULT 0,
+            job_state TEXT,
+            opened_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS progress_channels_opened ON progress_channels (opened_at);
+        CREATE TABLE IF NOT EXISTS progress_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS progress_events_session ON progress_events (session_id, id);
+        CREATE TABLE IF NOT EXISTS progress_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.25, **kwargs) -> None:
+        """path: SQLite file; other arguments as for ProgressBus."""
+        super().__init__(**kwargs)
+        self.path = path
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        # Woken by publishes of this process; other processes are polled
+        self._changed = threading.Condition()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db().executescript(self._SCHEMA)
+
+    # ── storage ─────────────────────────────────────────────────────────────
+
+    def _db(self) -> sqlite3.Connection:
+        """This thread's connection (a new one after fork)."""
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _notify(self) -> None:
+        with self._changed:
+            self._changed.notify_all()
+        super()._notify()
+
+    @staticmethod
+    def _count(db: sqlite3.Connection, name: str, n: int) -> None:
+        if n:
+            db.execute(
+                'INSERT INTO progress_counters (name, value) VALUES (?, ?) '
+                'ON CONFLICT (name) DO UPDATE SET value = value + excluded.value', (name, n)
+            )
+
+    def _drop(self, db: sqlite3.Connection, session_ids: List[str]) -> None:
+        for session_id in session_ids:
+            db.execute('DELETE FROM progress_channels WHERE session_id = ?', (session_id,))
+            db.execute('DELETE FROM progress_events WHERE session_id = ?', (session_id,))
+
+    def _merge(self, db: sqlite3.Connection, session_id: str, state: dict, last_data: Optional[str],
+               fields: dict, opened_at: Optional[float] = None) -> None:
+        """Merge fields into state, store the channel and append an event if the data changed."""
+        state.update(fields)
+        now = time.time()
+        data = json.dumps(self._event_data(state), sort_keys=True)
+        if data != last_data:
+            event_id = db.execute(
+                'INSERT INTO progress_events (session_id, data) VALUES (?, ?)', (session_id, data)
+            ).lastrowid
+            db.execute(
+                'DELETE FROM progress_events WHERE session_id = ? AND id NOT IN '
+                '(SELECT id FROM progress_events WHERE session_id = ? ORDER BY id DESC LIMIT ?)',
+                (session_id, session_id, self.history),
+            )
+        finished = int(state.get('status') in FINAL_STATUSES)
+        if opened_at is not None:
+            db.execute(
+                'INSERT INTO progress_channels (session_id, generation, state, last_data, finished, '
+                'job_state, opened_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (session_id, event_id, json.dumps(state), data, finished, state.get('job_state'), opened_at, now),
+            )
+        else:
+            db.execute(
+                'UPDATE progress_channels SET state = ?, last_data = ?, finished = ?, job_state = ?, '
+                'updated_at = ? WHERE session_id = ?',
+                (json.dumps(state), data, finished, state.get('job_state'), now, session_id),
+            )
+
+    # ── publishing ──────────────────────────────────────────────────────────
+
+    def open(self, session_id: str, fields: dict) -> None:
+        self._ensure_sweeper()
+        with self._transaction() as db:
+            self._drop(db, [session_id])
+            (count,) = db.execute('SELECT COUNT(*) FROM progress_channels').fetchone()
+            if count >= self.max_entries:
+                oldest = [row[0] for row in db.execute(
+                    'SELECT session_id FROM progress_channels ORDER BY opened_at LIMIT ?',
+                    (count - self.max_entries + 1,),
+                )]
+                self._drop(db, oldest)
+                self._count(db, 'evicted', len(oldest))
+            self._merge(db, session_id, {}, None, fields, opened_at=time.time())
+        self._notify()
+
+    def update(self, session_id: str, fields: dict, if_active: bool = False) -> bool:
+        with self._transaction() as db:
+            row = db.execute(
+                'SELECT state, last_data, finished FROM progress_channels WHERE session_id = ?', (session_id,)
+            ).fetchone()
+            if row is None or (if_active and row[2]):
+                return False
+            self._merge(db, session_id, json.loads(row[0]), row[1], fields)
+        self._notify()
+        return True
+
+    def get(self, session_id: str) -> Optional[dict]:
+        row = self._db().execute(
+            'SELECT state FROM progress_channels WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def discard(self, session_id: str) -> None:
+        with self._transaction() as db:
+            self._drop(db, [session_id])
+        self._notify()
+
+    def __len__(self) -> int:
+        return self._db().execute('SELECT COUNT(*) FROM progress_channels').fetchone()[0]
+
+    def stats(self) -> dict:
+        db = self._db()
+        rows = db.execute('SELECT finished, job_state FROM progress_channels').fetchall()
+        counters = dict(db.execute('SELECT name, value FROM progress_counters').fetchall())
+        live = [job_state for finished, job_state in rows if not finished]
+        stats = self._stats(live, len(rows) - len(live), counters.get('expired', 0), counters.get('evicted', 0))
+        stats['store'] = self.path
+        return stats
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        with self._transaction() as db:
+            expired = [row[0] for row in db.execute(
+                'SELECT session_id FROM progress_channels WHERE updated_at <= ? - '
+                'CASE WHEN finished THEN ? ELSE ? END',
+                (now, self.finished_ttl, self.ttl),
+            )]
+            self._drop(db, expired)
+            self._count(db, 'expired', len(expired))
+        if expired:
+            self._notify()
+        return len(expired)
+
+    # ── subscribing ─────────────────────────────────────────────────────────
+    # The channel token is its generation: a re-opened session gets a new one.
+
+    def _token(self, session_id: str):
+        row = self._db().execute(
+            'SELECT generation FROM progress_channels WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def _start_after(self, token, last_event_id: Optional[int]) -> int:
+        return max(last_event_id or 0, token - 1)
+
+    def _read(self, session_id: str, token, seen: int) -> Tuple[List[Tuple[int, dict]], bool]:
+        pending = [
+            (eid, json.loads(data)) for eid, data in self._db().execute(
+                'SELECT id, data FROM progress_events WHERE session_id = ? AND id > ? ORDER BY id',
+                (session_id, seen),
+            )
+        ]
+        return pending, pending != [] or self._token(session_id) == token
+
+    def _wait(self, session_id: str, token, seen: int, timeout: float) -> None:
+        with self._changed:
+            self._changed.wait(timeout)
+
+    def _finish(self, session_id: str, token, seen: int) -> None:
+        with self._transaction() as db:
+            if db.execute(
+                'DELETE FROM progress_channels WHERE session_id = ? AND generation = ?', (session_id, token)
+            ).rowcount:
+                db.execute('DELETE FROM progress_events WHERE session_id = ? AND id <= ?', (session_id, seen))
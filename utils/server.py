@@ -0,0 +1,110 @@
+"""
+utils/server.py — development and production serving
+
+    run_server(app, mode='dev' | 'production' | 'async', host, port, workers, threads,
+               progress_bus=None)
+
+'dev'         Flask's threaded development server (one process).
+'production'  gunicorn: `workers` processes (0 = one per CPU core), each with
+              `threads` request threads (gthread workers, so open /progress
+              streams do not hold a whole process).  A slow upload or review
+              request then occupies one thread while the other workers keep
+              serving, and throughput scales with cores.  Needs gunicorn and a
+              POSIX system; elsewhere the development server is used instead.
+'async'       uvicorn running asgi:application (utils/asgi.py): /progress
+              streams wait on the event loop instead of holding a thread, so
+              one process keeps hundreds of them open; other requests run in
+              `threads` threads.  `workers` processes, 0 = one.  One worker
+              serves `app` wrapped in AsyncApp in this process (pass the
+              app's `progress_bus`); more workers, or no progress_bus, make
+              uvicorn import asgi.py, which imports app.py once more under
+              `python app.py` (where the running module is __main__).  Needs
+              uvicorn (also on Windows); without it the development server is
+              used.
+
+Worker processes share no memory, so outside dev mode app.py keeps upload
+progress in a SQLite file (SharedProgressBus); extraction caches and review
+sessions already live on disk.
+"""
+
+import logging
+import os
+import sys
+
+try:
+    from gunicorn.app.base import BaseApplication
+    HAS_GUNICORN = sys.platform != 'win32'
+except ImportError:
+    HAS_GUNICORN = False
+
+try:
+    import uvicorn
+    HAS_UVICORN = True
+except ImportError:
+    HAS_UVICORN = False
+
+logger = logging.getLogger(__name__)
+
+SERVER_MODES = ('dev', 'production', 'async')
+
+
+def production_workers(workers: int = 0) -> int:
+    return max(1, int(workers) or os.cpu_count() or 1)
+
+
+if HAS_GUNICORN:
+    class _GunicornServer(BaseApplication):
+        """Runs an already imported WSGI app (forked into each worker)."""
+
+        def __init__(self, app, options: dict) -> None:
+            self.application = app
+            self.options = options
+            super().__init__()
+
+        def load_config(self) -> None:
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+
+def run_server(app, mode: str = 'dev', host: str = '0.0.0.0', port: int = 5000,
+               workers: int = 0, threads: int = 8, debug: bool = False, progress_bus=None) -> None:
+    """Serve `app` until interrupted; see the module docstring for the modes."""
+    if mode not in SERVER_MODES:
+        raise ValueError(f"Unknown server mode: {mode!r} (one of {SERVER_MODES})")
+    if mode == 'production':
+        if HAS_GUNICORN:
+            workers = production_workers(workers)
+            logger.info('Production server: %d workers x %d threads on %s:%d', workers, threads, host, port)
+            _GunicornServer(app, {
+                'bind': f'{host}:{port}',
+                'workers': workers,
+                'worker_class': 'gthread',
+                'threads': max(1, int(threads)),
+                # gthread workers heartbeat from their main thread, so long SSE
+                # streams are fine; this only restarts a worker that hangs
+                'timeout': 120,
+                'graceful_timeout': 30,
+                'accesslog': '-',
+            }).run()
+            return
+        logger.warning('Production mode needs gunicorn on Linux/macOS — using the development server')
+    elif mode == 'async':
+        if HAS_UVICORN:
+            workers = max(1, int(workers))
+            logger.info('Async server: %d workers on %s:%d', workers, host, port)
+            if workers == 1 and progress_bus is not None:
+                # Serve the app object we were given: importing asgi.py here
+                # would load app.py a second time when it runs as __main__
+                from .asgi import AsyncApp
+                target = AsyncApp(app, progress_bus, threads=threads)
+            else:
+                # Worker processes need an import string; each imports app.py
+                target = 'asgi:application'
+            uvicorn.run(target, host=host, port=port, workers=workers,
+                        timeout_graceful_shutdown=30)
+            return
+        logger.warning('Async mode needs uvicorn — using the development server')
+    app.run(host=host, port=port, debug=debug, use_reloader=debug, threaded=True)
@@ -0,0 +1,234 @@
+"""
+utils/sessions.py — active review-session bundles
+
+Every extraction gets a session bundle next to its cache file:
+
+    <active_folder>/<cache_id>/dmp_plan.json        sections of cache_<id>.json
+                               feedback.json        reviewer feedback per section
+                               metadata.json        researcher, call, timestamps
+                               source_upload.<ext>  copy of the uploaded document
+
+ensure_active_session() creates or refreshes a bundle from the cache file,
+keeping existing feedback and session metadata.  The web app (app.py) and
+batch_extract.py both use it; neither needs the other, so batch workers can
+build bundles without importing the Flask app.
+"""
+
+import json
+import os
+import re
+import shutil
+from datetime import datetime
+from typing import Optional, Tuple
+
+from werkzeug.utils import safe_join
+
+SECTION_IDS = ['1.1', '1.2', '2.1', '2.2', '3.1', '3.2',
+               '4.1', '4.2', '5.1', '5.2', '5.3', '5.4', '6.1', '6.2']
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+def load_json_file(file_path: str, default=None):
+    if not os.path.exists(file_path):
+        return {} if default is None else default
+
+    with open(file_path, 'r', encoding='utf-8') as file_handle:
+        return json.load(file_handle)
+
+
+def write_json_file(file_path: str, data) -> None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+    with open(file_path, 'w', encoding='utf-8') as file_handle:
+        json.dump(data, file_handle, ensure_ascii=False, indent=2)
+
+
+def sanitize_session_identifier(identifier) -> str:
+    normalized_identifier = str(identifier or '').strip()
+    if not SESSION_ID_PATTERN.fullmatch(normalized_identifier):
+        raise ValueError('Invalid session identifier')
+    return normalized_identifier
+
+
+def safe_join_session_path(root: str, identifier) -> str:
+    safe_identifier = sanitize_session_identifier(identifier)
+    root_path = os.path.abspath(root)
+    candidate_path = safe_join(root_path, safe_identifier)
+    if not candidate_path:
+        raise ValueError('Invalid session identifier')
+    candidate_path = os.path.abspath(candidate_path)
+    if os.path.commonpath([candidate_path, root_path]) != root_path:
+        raise ValueError('Invalid session identifier')
+    return candidate_path
+
+
+def cache_path(cache_folder: str, cache_id) -> str:
+    safe_cache_id = sanitize_session_identifier(cache_id)
+    path = safe_join(cache_folder, f"cache_{safe_cache_id}.json")
+    if not path:
+        raise ValueError('Invalid session identifier')
+    return path
+
+
+def active_session_paths(active_folder: str, cache_id) -> dict:
+    session_dir = safe_join_session_path(active_folder, cache_id)
+
+    return {
+        'session_dir': session_dir,
+        'dmp_path': os.path.join(session_dir, 'dmp_plan.json'),
+        'feedback_path': os.path.join(session_dir, 'feedback.json'),
+        'metadata_path': os.path.join(session_dir, 'metadata.json'),
+        'review_export_path': os.path.join(session_dir, 'review_export.json')
+    }
+
+
+def has_active_session(active_folder: str, cache_id) -> bool:
+    """True once ensure_active_session() has completed for cache_id."""
+    return os.path.exists(active_session_paths(active_folder, cache_id)['feedback_path'])
+
+
+def find_session_source_upload(session_dir: str) -> Tuple[Optional[str], Optional[str]]:
+    if not os.path.isdir(session_dir):
+        return None, None
+
+    for entry in os.listdir(session_dir):
+        if not entry.startswith('source_upload'):
+            continue
+
+        source_path = os.path.join(session_dir, entry)
+        if os.path.isfile(source_path):
+            return source_path, entry
+
+    return None, None
+
+
+def store_session_source_upload(session_dir: str, source_file_path: Optional[str], original_filename: str = '') -> Optional[str]:
+    if not source_file_path or not os.path.exists(source_file_path):
+        return None
+
+    _, previous_name = find_session_source_upload(session_dir)
+    if previous_name:
+        previous_path = os.path.join(session_dir, previous_name)
+        if os.path.abspath(previous_path) != os.path.abspath(source_file_path):
+            os.remove(previous_path)
+
+    extension = os.path.splitext(original_filename or source_file_path)[1].lower()
+    stored_filename = f"source_upload{extension}" if extension else 'source_upload'
+    stored_path = os.path.join(session_dir, stored_filename)
+
+    if os.path.abspath(source_file_path) != os.path.abspath(stored_path):
+        shutil.copy2(source_file_path, stored_path)
+
+    return stored_filename
+
+
+def load_cache_data(cache_folder: str, cache_id) -> Tuple[dict, str]:
+    path = cache_path(cache_folder, cache_id)
+    if not os.path.exists(path):
+        raise FileNotFoundError('Cache file not found')
+
+    return load_json_file(path), path
+
+
+def build_dmp_plan(cache_id, cache_data: dict) -> dict:
+    dmp_plan = {
+        'cache_id': cache_id,
+        'sections': {}
+    }
+
+    for section_id in SECTION_IDS:
+        if section_id in cache_data:
+            section_info = cache_data[section_id]
+            dmp_plan['sections'][section_id] = {
+                'section': section_info.get('section', ''),
+                'question': section_info.get('question', ''),
+                'content': '\n'.join(section_info.get('paragraphs', [])),
+                'tagged_paragraphs': section_info.get('tagged_paragraphs', [])
+            }
+
+    return dmp_plan
+
+
+def build_session_metadata(cache_id, extracted_metadata: dict, session_created_at: str, status: str = 'active', existing_session_name: str = '') -> dict:
+    return {
+        'cache_id': cache_id,
+        'status': status,
+        'session_created_at': session_created_at,
+        'last_updated': datetime.now().isoformat(),
+        'session_name': existing_session_name,
+        'researcher_surname': extracted_metadata.get('researcher_surname', ''),
+        'researcher_firstname': extracted_metadata.get('researcher_firstname', ''),
+        'competition_name': extracted_metadata.get('competition_name', ''),
+        'competition_edition': extracted_metadata.get('competition_edition', ''),
+        'creation_date': extracted_metadata.get('creation_date', ''),
+        'filename_original': extracted_metadata.get('filename_original', ''),
+        'source_cache_file': f"cache_{cache_id}.json",
+        'dmp_file': 'dmp_plan.json',
+        'feedback_file': 'feedback.json',
+        'review_export_file': 'review_export.json'
+    }
+
+
+def ensure_active_session(
+    cache_folder: str,
+    active_folder: str,
+    cache_id,
+    feedback_data=None,
+    compiled_feedback=None,
+    source_file_path: Optional[str] = None,
+    original_filename: str = '',
+) -> dict:
+    """Create or refresh the bundle of cache_id; returns its paths and JSON documents."""
+    cache_data, source_cache_path = load_cache_data(cache_folder, cache_id)
+    paths = active_session_paths(active_folder, cache_id)
+
+    os.makedirs(paths['session_dir'], exist_ok=True)
+
+    dmp_plan = build_dmp_plan(cache_id, cache_data)
+    write_json_file(paths['dmp_path'], dmp_plan)
+
+    existing_metadata = load_json_file(paths['metadata_path'], {})
+    session_created_at = existing_metadata.get('session_created_at', datetime.now().isoformat())
+    existing_session_name = existing_metadata.get('session_name', '')
+    extracted_metadata = cache_data.get('_metadata', {})
+    metadata_json = build_session_metadata(cache_id, extracted_metadata, session_created_at, existing_session_name=existing_session_name)
+    metadata_json['session_folder'] = paths['session_dir']
+    metadata_json['source_cache_path'] = source_cache_path
+
+    existing_source_path, existing_source_file = find_session_source_upload(paths['session_dir'])
+    if existing_source_path and existing_source_file:
+        metadata_json['source_upload_file'] = existing_source_file
+        metadata_json['source_upload_name'] = existing_metadata.get('source_upload_name') or existing_metadata.get('filename_original', '')
+
+    stored_source_file = store_session_source_upload(paths['session_dir'], source_file_path, original_filename)
+    if stored_source_file:
+        metadata_json['source_upload_file'] = stored_source_file
+        metadata_json['source_upload_name'] = original_filename or os.path.basename(source_file_path)
+
+    write_json_file(paths['metadata_path'], metadata_json)
+
+    feedback_json = load_json_file(paths['feedback_path'], {
+        'cache_id': cache_id,
+        'sections': {},
+        'compiled_feedback': '',
+        'last_saved': None
+    })
+
+    if feedback_data is not None:
+        feedback_json['sections'] = feedback_data
+        feedback_json['last_saved'] = datetime.now().isoformat()
+
+    if compiled_feedback is not None:
+        feedback_json['compiled_feedback'] = compiled_feedback
+        feedback_json['last_saved'] = datetime.now().isoformat()
+
+    feedback_json['cache_id'] = cache_id
+    write_json_file(paths['feedback_path'], feedback_json)
+
+    return {
+        'paths': paths,
+        'cache_data': cache_data,
+        'dmp_plan': dmp_plan,
+        'feedback': feedback_json,
+        'metadata': metadata_json
+    }